@@ -1,181 +1,627 @@
-import cv2
-import math
 import os
 import json
-import sys
-import numpy as np
-from PIL import Image, ImageDraw, ImageFont
-import groq
-import uvicorn
-import shutil
-
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
-from fastapi.staticfiles import StaticFiles
-from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional
+import asyncio
+import copy
+import functools
+import hmac
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
 
-from core.pose_analyzer import (
-    load_pose_model,
-    analyze_pose_with_model,
-    draw_measurements_on_image,
+import uvicorn
+from fastapi import (
+    APIRouter, FastAPI, File, UploadFile, HTTPException, Form, Header, WebSocket, WebSocketDisconnect,
 )
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from fastapi.middleware.cors import CORSMiddleware
+from typing import List, Optional
 
-app = FastAPI(title="Fitnexus AI Trainer API")
+# Only light modules are imported here. cv2, mediapipe and groq load on
+# first use (or when the pose pool starts), so `import api` stays cheap and
+# has no side effects beyond reading configuration.
+from core.image_store import ProcessedImageStore
+from core.landmarker_pool import LandmarkerPool, default_pool_size
+from core.model_tiers import DEFAULT_QUALITY, QUALITY_TIERS, TIERS, TierRouter, parse_tiers
+from core.result_cache import ResultCache, content_key
+from core.llm_router import LLMRouter
+from core.ingest import UploadRejected, read_upload
+from core.single_flight import SingleFlight
+from prometheus_client import Counter, Gauge, Histogram
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+from core.metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    DEFAULT_BUCKETS,
+    REGISTRY,
+    FunctionCounter,
+    record_stage,
+    render as render_metrics,
+    server_timing_header,
+    start_request_timings,
+    stop_request_timings,
+    timed,
+)
+from core.recommendation_cache import RecommendationCache
+from core.history import BUCKETS, DEFAULT_TREND_METRICS, MeasurementHistory
+from core.catalog import ExerciseCatalog, source_from_spec
+from core.recommender import (
+    known_equipment,
+    local_recommendations,
+    parse_equipment,
+    shortlist_exercise_ids,
 )
+from core.concurrency import (
+    AdmissionController,
+    QueueFullError,
+    create_worker_pool,
+    run_blocking,
+)
+
+router = APIRouter()
 
 from dotenv import load_dotenv
 load_dotenv(override=True)
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY") or "PASTE GROQ API KEY HERE"
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+_GROQ_KEY_PLACEHOLDERS = {
+    "PASTE GROQ API KEY HERE", "paste api key here", "gsk_VUI_LONG_THAY_KHOA_CUA_BAN",
+}
+_groq_client = None
+
+
+def groq_configured() -> bool:
+    return bool(GROQ_API_KEY) and GROQ_API_KEY not in _GROQ_KEY_PLACEHOLDERS
+
 
-if not GROQ_API_KEY or GROQ_API_KEY == "gsk_VUI_LONG_THAY_KHOA_CUA_BAN":
-    print("LỖI: Bạn chưa cấu hình khóa API cho GROQ.")
-    sys.exit(1)
+def get_groq_client():
+    """
+    AsyncGroq client, created on first use. Without a key this raises, and
+    get_ai_recommendations falls back to the local recommender.
+    """
+    global _groq_client
+    if _groq_client is None:
+        if not groq_configured():
+            raise RuntimeError("GROQ_API_KEY chưa được cấu hình.")
+        import groq
+        # Failover and retries are the LLM router's job, so the SDK does not
+        # retry on its own. GROQ_BASE_URL points at a mock server in tests.
+        _groq_client = groq.AsyncGroq(
+            api_key=GROQ_API_KEY,
+            base_url=os.getenv("GROQ_BASE_URL") or None,
+            max_retries=int(os.getenv("LLM_MAX_RETRIES") or 0),
+        )
+    return _groq_client
 
-groq_client = groq.Groq(api_key=GROQ_API_KEY)
+
+def set_llm_client(client):
+    """
+    Answer LLM calls with `client` instead of Groq: anything with an async
+    `chat.completions.create(messages=..., model=..., ...)` like AsyncGroq,
+    e.g. the local stub used for offline replay. None goes back to Groq.
+    """
+    global _groq_client
+    _groq_client = client
 
 GROQ_MODELS = [
     os.getenv("GROQ_MODEL") or "llama-3.3-70b-versatile",
     "llama-3.1-8b-instant",
 ]
 
-# ─── Exercise Database ────────────────────────────────────────────────────────
-# Single source of truth: (exercise_id, name_vi, name_en)
-# Derived from the exercises table. Keep this in sync with the DB.
-EXERCISE_DB = [
-    (1,   "Đẩy Ngực Ngang Thanh Đòn",                   "Barbell Bench Press"),
-    (2,   "Đẩy Ngực Ngang Tạ Tay",                       "Dumbbell Bench Press"),
-    (3,   "Hít Đất",                                      "Push Up"),
-    (16,  "Squat Với Tạ Đòn",                             "Barbell Squat"),
-    (21,  "Romanian Deadlift Với Tạ Đòn",                 "Barbell Romanian Deadlift"),
-    (39,  "Hip Thrust Với Tạ Đòn",                        "Barbell Hip Thrust"),
-    (40,  "Hít Xà Đơn",                                   "Pull Ups"),
-    (41,  "Kéo Xô Máy",                                   "Machine Pulldown"),
-    (42,  "Đẩy Tạ Đòn Qua Đầu",                          "Barbell Overhead Press"),
-    (43,  "Dang Tạ Tay Sang Bên",                         "Dumbbell Lateral Raise"),
-    (64,  "Cuốn Tạ Đòn",                                  "Barbell Curl"),
-    (65,  "Cuốn Tạ Đơn",                                  "Dumbbell Curl"),
-    (66,  "Đẩy Tạ Đơn Sau Đầu",                          "Dumbbell Seated Overhead Tricep Extension"),
-    (67,  "Đẩy Cáp Tay Sau V-Bar",                       "Machine Cable V Bar Push Downs"),
-    (68,  "Gập Bụng",                                     "Crunches"),
-    (69,  "Plank Với Bóng",                               "Medicine Ball Plank"),
-    (70,  "Cuốn Cổ Tay Tạ Đơn",                          "Dumbbell Wrist Curl"),
-    (71,  "Cuốn Cổ Tay Tạ Đòn",                          "Barbell Wrist Curl"),
-    (72,  "Nhón Bắp Chân Ngồi",                           "Seated Calf Raise"),
-    (73,  "Nhón Bắp Chân Với Máy Smith",                  "Smith Machine Calf Raise"),
-    (94,  "Đẩy Ngực Dốc Lên Thanh Đòn",                  "Incline Barbell Bench Press"),
-    (95,  "Chèo Tạ Đòn Cúi Người",                       "Barbell Bent Over Row"),
-    (96,  "Deadlift Với Tạ Đòn",                          "Barbell Deadlift"),
-    (97,  "Ép Ngực Với Cáp",                              "Cable Pec Fly"),
-    (98,  "Nâng Tạ Đơn Trước Mặt",                       "Dumbbell Front Raise"),
-    (99,  "Đạp Đùi Với Máy",                              "Machine Leg Press"),
-    (100, "Đá Đùi Với Máy",                               "Machine Leg Extension"),
-    (101, "Vặn Người Kiểu Nga",                           "Bodyweight Russian Twist"),
-    (102, "Kéo Cáp Cho Vai Sau",                          "Machine Face Pulls"),
-    (132, "Nhún Cầu Vai Thanh Đòn",                       "Barbell Shrugs"),
-    (133, "Cuốn Chân Nằm Với Máy",                        "Machine Lying Leg Curl"),
-    (134, "Đẩy Ngực Dốc Xuống Thanh Đòn",                "Barbell Decline Bench Press"),
-    (135, "Lunge Bước Đi",                                "Bodyweight Walking Lunges"),
-    (136, "Treo Người Nhấc Chân",                         "Bodyweight Hanging Leg Raise"),
-    (171, "Đẩy Tạ Đơn Qua Đầu Khi Ngồi",                "Dumbbell Seated Overhead Press"),
-    (172, "Dang Một Tay Với Cáp Thấp",                   "Cable Low Single Arm Lateral Raise"),
-    (173, "Hít Đất Pike Chân Trên Cao",                   "Elevated Pike Press"),
-    (174, "Ép Tạ Đơn Vai Sau Khi Ngồi",                  "Dumbbell Seated Rear Delt Fly"),
-    (175, "Kéo Cáp Một Tay Tập Xô (Lat Prayer)",         "Cable Single Arm Lat Prayer"),
-    (176, "Kéo Cáp Qua Chân (Pull Through)",              "Cable Pull Through"),
-    (177, "Hít Xà Ngược (Inverted Row)",                  "Inverted Row"),
-    (178, "Đẩy Ngực Dốc Lên Với Tạ Tay",                "Dumbbell Incline Bench Press"),
-    (179, "Ép Ngực Với Máy (Pec Deck)",                  "Machine Pec Fly"),
-    (180, "Nằm Dang Tạ Tay Tập Ngực",                    "Dumbbell Fly"),
-    (181, "Xà Kép Tập Ngực (Chest Dips)",                "Chest Dips"),
-    (182, "Cuốn Tạ Tay Kiểu Búa (Hammer Curl)",          "Dumbbell Hammer Curl"),
-    (183, "Chống Đẩy Sau Với Ghế (Bench Dips)",          "Bench Dips"),
-    (184, "Đá Tạ Tay Sau (Dumbbell Kickback)",           "Dumbbell Kickback"),
-    (185, "Cuốn Tạ Tập Trung (Concentration Curl)",      "Concentration Curl"),
-    (186, "Nằm Nhấc Chân (Leg Raises)",                  "Laying Leg Raises"),
-    (187, "Plank Cẳng Tay (Forearm Plank)",              "Forearm Plank"),
-    (188, "Nhón Bắp Chân Đứng Với Máy",                  "Machine Standing Calf Raises"),
-    (189, "Nhún Cầu Vai Với Tạ Tay",                     "Dumbbell Shrug"),
-    (190, "Kéo Tạ Đòn Thẳng Đứng (Upright Row)",        "Barbell Upright Row"),
-    (191, "Cuốn Cổ Tay Tạ Đòn Sau Lưng",                "Barbell Behind The Back Wrist Curl"),
-    (192, "Nằm Đẩy Tạ Đòn Sau Đầu (Skull Crusher)",     "Barbell Skull Crusher"),
-    (193, "Treo Người Co Gối (Hanging Knee Raises)",     "Hanging Knee Raises"),
-    (194, "Leo Núi Tại Chỗ (Mountain Climber)",          "Mountain Climber"),
-    (195, "Giữ Thân Hình Chuối (Hollow Hold)",           "Hollow Hold"),
-    (196, "Nhón Bắp Chân Với Tạ Ấm",                    "Kettlebell Calf Raise"),
-    (197, "Cuốn Tay Trước Với Cáp",                      "Cable Bicep Curl"),
-    (198, "Chống Xà Kép Tập Tay Sau",                    "Tricep Dips"),
-    (199, "Vung Tạ Ấm (Kettlebell Swing)",               "Kettlebell Swing"),
-    (200, "Squat Với Tạ Tay (Goblet Squat)",             "Dumbbell Goblet Squat"),
-    (201, "Kéo Cáp Ngồi (Seated Cable Row)",             "Seated Cable Row"),
-    (202, "Nằm Vớt Tạ (Dumbbell Pullover)",              "Dumbbell Pullover"),
-    (269, "Burpees (Nhảy Hít Đất)",                      "Burpees"),
-    (270, "Siêu Nhân (Superman)",                        "Superman"),
-    (271, "Cầu Mông (Glute Bridge)",                     "Bodyweight Glute Bridge"),
-    (272, "Đá Chân Sang Bên (Fire Hydrant)",             "Fire Hydrant"),
-    (413, "Gập Bụng Đạp Xe (Bicycle Crunches)",         "Bicycle Crunches"),
-    (414, "Kéo Cáp Chặt Gỗ (Cable Woodchop)",           "Cable Woodchop"),
-    (415, "Dang Tạ Tay Ngược (Reverse Fly)",             "Dumbbell Reverse Fly"),
-    (416, "Hít Đất Chân Cao (Decline Push-up)",          "Decline Push-ups"),
-    (417, "Ép Cáp Từ Cao Đến Thấp",                     "High-to-Low Cable Fly"),
-]
+# llm | hybrid | local — see get_ai_recommendations
+RECOMMENDER_MODE = (os.getenv("RECOMMENDER_MODE") or "llm").lower()
+
+# ─── Exercise catalogue ──────────────────────────────────────────────────────
+# EXERCISE_CATALOG: builtin (core/exercises.py, default), a pg_dump file
+# (../dump.sql), sqlite:///catalog.db (stand-in with the backend tables) or a
+# postgresql:// URL of the backend database. Loaded at startup and reloaded
+# when the source changes (checked every CATALOG_RELOAD_SEC, 0 = never).
+# Each request works on one snapshot, whose indexes make lookups dict hits.
+
+EXERCISE_CATALOG   = os.getenv("EXERCISE_CATALOG") or "builtin"
+CATALOG_RELOAD_SEC = float(os.getenv("CATALOG_RELOAD_SEC") or 30)
+
+exercise_catalog = ExerciseCatalog(
+    source_from_spec(EXERCISE_CATALOG), reload_interval_sec=CATALOG_RELOAD_SEC
+)
 
-# Build lookup maps for fast matching in frontend
-_VI_TO_ID  = {row[1]: row[0] for row in EXERCISE_DB}
-_EN_TO_ID  = {row[2]: row[0] for row in EXERCISE_DB}
-_ID_TO_ROW = {row[0]: row    for row in EXERCISE_DB}
+# The prompt lists candidates as 'ID|name_en' only; names in both languages
+# are restored from the catalogue by _finalize_recommendations. Each
+# classification gets a shortlist of the LLM_EXERCISE_SHORTLIST best-scoring
+# exercises (0 = whole catalogue), built once per catalogue snapshot.
+LLM_EXERCISE_SHORTLIST = int(os.getenv("LLM_EXERCISE_SHORTLIST") or 24)
 
-def _build_exercise_index_for_prompt() -> str:
-    """Return a numbered list of 'ID|name_vi|name_en' used inside the prompt."""
-    lines = []
-    for eid, name_vi, name_en in EXERCISE_DB:
-        lines.append(f"{eid}|{name_vi}|{name_en}")
-    return "\n".join(lines)
+
+def _exercise_index_for_prompt(catalog, shape_type=None, somatotype=None,
+                               equipment=None) -> str:
+    def build():
+        ids = shortlist_exercise_ids(
+            shape_type, somatotype, LLM_EXERCISE_SHORTLIST, catalog, equipment=equipment,
+        )
+        return "\n".join(f"{eid}|{catalog.get(eid)[2]}" for eid in ids)
+
+    return catalog.memo(
+        ("prompt_index", shape_type, somatotype, LLM_EXERCISE_SHORTLIST, equipment), build
+    )
+
+
+# ─── Metrics ─────────────────────────────────────────────────────────────────
+# Exposed on GET /metrics (Prometheus text format). Pipeline stages (ingest,
+# decode, detect, measure, draw, overlay, image_write) are timed where they
+# run, in aitrainer_stage_duration_seconds; the metrics below are the API's own.
+
+HTTP_REQUESTS = Counter(
+    "aitrainer_http_requests", "HTTP requests by route and status.", ("method", "route", "status"),
+    registry=REGISTRY,
+)
+HTTP_DURATION = Histogram(
+    "aitrainer_http_request_duration_seconds", "HTTP request latency by route.", ("route",),
+    buckets=DEFAULT_BUCKETS, registry=REGISTRY,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "aitrainer_http_requests_in_flight", "HTTP requests currently being served.",
+    registry=REGISTRY,
+)
+LLM_ATTEMPT_SECONDS = Histogram(
+    "aitrainer_llm_attempt_duration_seconds", "Duration of each LLM model attempt.",
+    ("model", "outcome"), buckets=DEFAULT_BUCKETS, registry=REGISTRY,
+)
+RECOMMENDATIONS = Counter(
+    "aitrainer_recommendations", "Recommendations served, by source.", ("source",),
+    registry=REGISTRY,
+)
+BODY_NOT_FOUND = Counter(
+    "aitrainer_body_not_found", "Analyses where no body was detected.", ("tier",),
+    registry=REGISTRY,
+)
+LLM_TOKENS = Counter(
+    "aitrainer_llm_tokens", "Tokens billed by the LLM for winning answers.", ("model", "kind"),
+    registry=REGISTRY,
+)
+RESULT_CACHE_LOOKUPS = Counter(
+    "aitrainer_result_cache_lookups", "Result cache lookups by outcome.", ("outcome",),
+    registry=REGISTRY,
+)
+
+# Server-Timing response header with the per-stage breakdown of a request:
+# off (default), on (every response) or request (only when the client sends
+# "X-Server-Timing: 1"). Streaming responses send headers before the stages
+# run, so only regular responses carry it.
+SERVER_TIMING = (os.getenv("SERVER_TIMING") or "off").lower()
 
 
 # ─── Groq helper ─────────────────────────────────────────────────────────────
+# GROQ_MODELS are queried through an LLMRouter: the next model is started
+# (hedged) when the current one has not answered after LLM_HEDGE_DELAY_SEC
+# (0 = all models at once, "off" = only on failure), timeouts adapt to each
+# model's observed p95 latency within [LLM_MIN_TIMEOUT_SEC, LLM_TIMEOUT_SEC],
+# and LLM_BREAKER_FAILURES consecutive failures bench a model for
+# LLM_BREAKER_COOLDOWN_SEC.
 
-def _groq_generate_json(prompt: str, timeout_sec: int = 120):
-    last_err = None
-    for model_name in GROQ_MODELS:
-        try:
-            chat_completion = groq_client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model=model_name,
-                response_format={"type": "json_object"},
-                timeout=timeout_sec,
-            )
-            return chat_completion.choices[0].message.content
-        except Exception as e:
-            print(f"[Groq] model {model_name} failed: {e}")
-            last_err = e
-            continue
-    raise last_err if last_err else RuntimeError("Groq API call failed")
+_hedge_delay = (os.getenv("LLM_HEDGE_DELAY_SEC") or "10").strip().lower()
+LLM_HEDGE_DELAY_SEC      = None if _hedge_delay == "off" else float(_hedge_delay)
+LLM_TIMEOUT_SEC          = float(os.getenv("LLM_TIMEOUT_SEC") or 120)
+LLM_MIN_TIMEOUT_SEC      = float(os.getenv("LLM_MIN_TIMEOUT_SEC") or 5)
+LLM_TIMEOUT_MULTIPLIER   = float(os.getenv("LLM_TIMEOUT_MULTIPLIER") or 3)
+LLM_BREAKER_FAILURES     = int(os.getenv("LLM_BREAKER_FAILURES") or 3)
+LLM_BREAKER_COOLDOWN_SEC = float(os.getenv("LLM_BREAKER_COOLDOWN_SEC") or 60)
+
+
+def _observe_llm_attempt(model_name, seconds, outcome):
+    record_stage(f"llm_{model_name}", seconds, LLM_ATTEMPT_SECONDS, (model_name, outcome))
+
+
+async def _groq_generate_json(prompt: str):
+    """
+    Returns (text, usage): the first valid JSON answer and the token usage
+    of the model that gave it ({"model", "prompt_tokens", "completion_tokens"}).
+    """
+    get_groq_client()  # no key: fail once instead of once per model
+    usages = {}
+
+    async def call(model_name, timeout):
+        chat_completion = await get_groq_client().chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=model_name,
+            response_format={"type": "json_object"},
+            timeout=timeout,
+        )
+        usages[model_name] = getattr(chat_completion, "usage", None)
+        return chat_completion.choices[0].message.content
+
+    text, model_name = await llm_router.generate(call, validate=_parse_json_response)
+    usage = {
+        "model"            : model_name,
+        "prompt_tokens"    : getattr(usages.get(model_name), "prompt_tokens", None),
+        "completion_tokens": getattr(usages.get(model_name), "completion_tokens", None),
+    }
+    for kind in ("prompt", "completion"):
+        if usage[f"{kind}_tokens"] is not None:
+            LLM_TOKENS.labels(model_name, kind).inc(usage[f"{kind}_tokens"])
+    return text, usage
+
+
+llm_router = LLMRouter(
+    GROQ_MODELS,
+    hedge_delay_sec=LLM_HEDGE_DELAY_SEC,
+    timeout_sec=LLM_TIMEOUT_SEC,
+    min_timeout_sec=LLM_MIN_TIMEOUT_SEC,
+    timeout_multiplier=LLM_TIMEOUT_MULTIPLIER,
+    failure_threshold=LLM_BREAKER_FAILURES,
+    cooldown_sec=LLM_BREAKER_COOLDOWN_SEC,
+    on_attempt=_observe_llm_attempt,
+)
+
+_LLM_FALLBACKS = FunctionCounter(
+    "aitrainer_llm_fallbacks",
+    "LLM fallbacks across GROQ_MODELS: hedge (next model started while waiting), "
+    "failover (after an error) or short_circuit (skipped, every circuit open).",
+    ("kind",),
+)
+_LLM_FALLBACKS.labels("hedge").set_function(lambda: llm_router.hedges)
+_LLM_FALLBACKS.labels("failover").set_function(lambda: llm_router.failovers)
+_LLM_FALLBACKS.labels("short_circuit").set_function(lambda: llm_router.short_circuits)
 
 
 # ─── Pose model ───────────────────────────────────────────────────────────────
 
-pose_model = load_pose_model()
+# One PoseLandmarker per worker: a landmarker is not safe for concurrent
+# detect() calls, so each inference checks one out of the pool.
+POSE_POOL_SIZE = int(os.getenv("POSE_POOL_SIZE") or default_pool_size())
+
+# Model tiers loaded side by side (one pool each). Only heavy by default, the
+# model deployments ship; lite and full are opt-in once their .task files are
+# in place. Requests pick one with quality=fast|balanced|accurate; when a
+# tier's p90 latency over the last POSE_SLO_WINDOW_SEC exceeds
+# POSE_LATENCY_SLO_MS, the next lighter tier answers instead (0 disables the
+# fallback). A quality whose tier is not configured is served by the nearest one.
+POSE_TIERS          = parse_tiers(os.getenv("POSE_TIERS") or "heavy")
+POSE_LATENCY_SLO_MS = float(os.getenv("POSE_LATENCY_SLO_MS") or 2000)
+POSE_SLO_WINDOW_SEC = float(os.getenv("POSE_SLO_WINDOW_SEC") or 30)
+
+# background (default): load on a thread at startup, serve /ready when done
+# blocking           : finish loading before the server accepts requests
+# lazy               : load on the first request that needs a landmarker
+MODEL_LOADING = (os.getenv("MODEL_LOADING") or "background").lower()
+
+# People detected per image in one inference pass. Every person is measured
+# (measurements["people"], one entry per person) and the largest by bounding
+# box (measurements["bbox"]) is the primary subject that known_height_cm and
+# the recommendation refer to; batch and live pick the same person.
+POSE_NUM_POSES = max(1, int(os.getenv("POSE_NUM_POSES") or 1))
+
+
+def _load_pose_model(tier, segmentation=True):
+    from core.pose_analyzer import load_pose_model
+    return load_pose_model(tier=tier, segmentation=segmentation, num_poses=POSE_NUM_POSES)
+
+
+def _warm_up_pose_model(pose_model):
+    from core.pose_analyzer import warm_up_pose_model
+    warm_up_pose_model(pose_model)
+
+
+pose_pools = {
+    tier: LandmarkerPool(
+        functools.partial(_load_pose_model, tier),
+        size=POSE_POOL_SIZE,
+        warmup=_warm_up_pose_model,
+        name=f"pose-{tier}",
+    )
+    for tier in POSE_TIERS
+}
+tier_router = TierRouter(pose_pools, slo_ms=POSE_LATENCY_SLO_MS, window_sec=POSE_SLO_WINDOW_SEC)
+
+# Landmarkers configured without segmentation masks, for requests that do not
+# draw the overlay (render=skeleton|none), batch and live. They load on first
+# use, so deployments that never need them pay nothing.
+POSE_MASK_FREE_POOL_SIZE = int(os.getenv("POSE_MASK_FREE_POOL_SIZE") or POSE_POOL_SIZE)
+
+mask_free_pools = {
+    tier: LandmarkerPool(
+        functools.partial(_load_pose_model, tier, segmentation=False),
+        size=POSE_MASK_FREE_POOL_SIZE,
+        warmup=_warm_up_pose_model,
+        name=f"pose-{tier}-nomask",
+    )
+    for tier in POSE_TIERS
+}
 
-os.makedirs("processed_images", exist_ok=True)
-app.mount("/processed", StaticFiles(directory="processed_images"), name="processed")
+# overlay : skeleton + measurement lines + segmentation overlay (default)
+# skeleton: no segmentation overlay
+# none    : measurements only, no annotated image
+RENDER_MODES = ("overlay", "skeleton", "none")
+
+# Shoulder / waist / hip widths: "landmarks" (joint distance x fixed factor)
+# or "silhouette" (measured on the segmentation mask). Silhouette widths need
+# the mask, so every single-image request then uses the mask pools; batch
+# stays on mask-free landmarkers and landmark widths.
+MEASUREMENT_WIDTHS = (
+    "silhouette" if (os.getenv("MEASUREMENT_WIDTHS") or "").lower() == "silhouette" else "landmarks"
+)
+
+# Pool serving the default quality; loaded first at startup.
+pose_pool = pose_pools[tier_router.tier_for(DEFAULT_QUALITY)]
+
+
+def _tier_for(quality: str) -> str:
+    try:
+        return tier_router.tier_for(quality)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _check_render(render: str) -> str:
+    if render not in RENDER_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"render must be one of {', '.join(RENDER_MODES)}, got {render!r}",
+        )
+    return render
+
+
+def _check_equipment(equipment: Optional[str]) -> Optional[str]:
+    # Slugs the catalogue does not know are refused here rather than carried
+    # into recommendation keys.
+    unknown = (parse_equipment(equipment) or frozenset()) - exercise_catalog.snapshot.equipment
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"unknown equipment {', '.join(sorted(unknown))}; known: "
+                   f"{', '.join(sorted(exercise_catalog.snapshot.equipment))}",
+        )
+    return equipment
+
+
+def _pool_for(tier: str, render: str) -> LandmarkerPool:
+    needs_mask = render == "overlay" or MEASUREMENT_WIDTHS == "silhouette"
+    return pose_pools[tier] if needs_mask else mask_free_pools[tier]
+
+
+# ─── Working resolution ──────────────────────────────────────────────────────
+# Uploads are decoded only as large as needed (IMREAD_REDUCED_* for JPEG),
+# inference runs on a copy capped at POSE_INPUT_MAX_SIDE and the annotated
+# image is rendered at ANNOTATION_MAX_SIDE. Landmarks are mapped back to the
+# original resolution, so measurements stay in original pixels. 0 = no limit.
+
+POSE_INPUT_MAX_SIDE  = int(os.getenv("POSE_INPUT_MAX_SIDE") or 1024)
+ANNOTATION_MAX_SIDE  = int(os.getenv("ANNOTATION_MAX_SIDE") or 1280)
+DECODE_MAX_SIDE      = (
+    max(POSE_INPUT_MAX_SIDE, ANNOTATION_MAX_SIDE)
+    if POSE_INPUT_MAX_SIDE and ANNOTATION_MAX_SIDE else None
+)
+
+
+def _analyze_pose(image, tier, render, original_size=None, known_height_cm=None):
+    from core.pose_analyzer import analyze_pose_with_model
+
+    with _pool_for(tier, render).lease() as pose_model:
+        return analyze_pose_with_model(
+            pose_model,
+            image,
+            known_height_cm=known_height_cm,
+            original_size=original_size,
+            inference_max_side=POSE_INPUT_MAX_SIDE or None,
+            output_max_side=ANNOTATION_MAX_SIDE or None,
+            # The decoded upload is not used after analysis.
+            render_inplace=True,
+            render=render,
+            width_method=MEASUREMENT_WIDTHS,
+        )
+
+
+def _decode_image(contents):
+    from core.image_io import decode_image
+
+    return decode_image(contents, DECODE_MAX_SIDE)
+
+
+# ─── Execution model ─────────────────────────────────────────────────────────
+# CPU-bound work (decode, pose inference, drawing, encoding) runs on a bounded
+# thread pool so the event loop stays free for other requests. Requests beyond
+# POSE_WORKERS + MAX_QUEUED_REQUESTS are rejected with 503.
+
+POSE_WORKERS        = int(os.getenv("POSE_WORKERS") or POSE_POOL_SIZE)
+MAX_QUEUED_REQUESTS = int(os.getenv("MAX_QUEUED_REQUESTS") or 16)
+
+pose_executor = create_worker_pool(POSE_WORKERS, "pose")
+io_executor   = create_worker_pool(4, "io")
+admission     = AdmissionController(POSE_WORKERS, MAX_QUEUED_REQUESTS)
+
+_ANALYSES = Gauge(
+    "aitrainer_analyses", "Admitted analysis requests by state.", ("state",),
+    registry=REGISTRY,
+)
+_ANALYSES.labels("active").set_function(lambda: admission.active)
+_ANALYSES.labels("queued").set_function(lambda: admission.queued)
+FunctionCounter(
+    "aitrainer_analyses_rejected", "Analysis requests rejected because the queue was full.",
+).set_function(lambda: admission.rejected)
+
+
+# ─── Upload ingestion ────────────────────────────────────────────────────────
+# Uploads are read in chunks into one buffer: the byte cap stops reading
+# early, the format is checked from the first bytes and the pixel count from
+# the header, all before anything is decoded.
+
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB") or 20) * 1024 * 1024)
+MAX_IMAGE_PIXELS = int(float(os.getenv("MAX_IMAGE_MEGAPIXELS") or 50) * 1_000_000)
+
+UPLOADS_REJECTED = Counter(
+    "aitrainer_uploads_rejected",
+    "Uploads refused before decoding, by HTTP status.",
+    ("status",),
+    registry=REGISTRY,
+)
+
+
+def _ingest(file: UploadFile):
+    # UploadFile.size is the size Starlette saw while parsing the form.
+    return read_upload(file.file, MAX_UPLOAD_BYTES, MAX_IMAGE_PIXELS, size_hint=file.size)
+
+
+async def _read_upload(file: UploadFile) -> bytearray:
+    """The upload's bytes, or HTTPException 400/413/415 without decoding."""
+    try:
+        with timed("ingest"):
+            upload = await run_blocking(io_executor, _ingest, file)
+    except UploadRejected as e:
+        UPLOADS_REJECTED.labels(e.status_code).inc()
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return upload.data
+
+
+# ─── Result cache ────────────────────────────────────────────────────────────
+# Repeat uploads of the same photo (retry, page refresh) skip pose inference.
+# Keyed on sha256(upload bytes) + known_height_cm.
+
+RESULT_CACHE_MAX_MB      = float(os.getenv("RESULT_CACHE_MAX_MB") or 256)
+RESULT_CACHE_DIR         = os.getenv("RESULT_CACHE_DIR") or None
+RESULT_CACHE_DISK_MAX_MB = float(os.getenv("RESULT_CACHE_DISK_MAX_MB") or 2048)
+
+result_cache = ResultCache(
+    max_bytes=int(RESULT_CACHE_MAX_MB * 1024 * 1024),
+    disk_dir=RESULT_CACHE_DIR,
+    disk_max_bytes=int(RESULT_CACHE_DISK_MAX_MB * 1024 * 1024),
+) if RESULT_CACHE_MAX_MB > 0 else None
+
+
+# ─── Single-flight ───────────────────────────────────────────────────────────
+# Concurrent requests with the same upload + parameters share one pose
+# computation; concurrent identical measurements share one recommendation
+# (followers get their own copy, since callers attach per-request fields).
+
+pose_flights = SingleFlight("pose")
+recommendation_flights = SingleFlight("recommendation", copy_result=True)
+
+_COALESCED = FunctionCounter(
+    "aitrainer_coalesced_requests",
+    "Requests that waited for an identical in-flight computation instead of running their own.",
+    ("stage",),
+)
+_COALESCED.labels("pose").set_function(lambda: pose_flights.coalesced)
+_COALESCED.labels("recommendation").set_function(lambda: recommendation_flights.coalesced)
+
+
+# ─── Processed image storage ─────────────────────────────────────────────────
+# Annotated images are named by upload hash + settings and encoded on a
+# background pool; the URL is returned before the file exists and
+# GET /processed/{name} waits for a pending write.
+
+PROCESSED_DIR            = os.getenv("PROCESSED_DIR") or "processed_images"
+PROCESSED_BASE_URL       = os.getenv("PROCESSED_BASE_URL") or "http://localhost:8000/processed"
+PROCESSED_FORMAT         = (os.getenv("PROCESSED_FORMAT") or "webp").lower()
+PROCESSED_QUALITY        = int(os.getenv("PROCESSED_QUALITY") or 85)
+PROCESSED_THUMBNAIL_SIDE = int(os.getenv("PROCESSED_THUMBNAIL_SIDE") or 0)
+PROCESSED_MAX_AGE_HOURS  = float(os.getenv("PROCESSED_MAX_AGE_HOURS") or 24 * 7)
+PROCESSED_MAX_MB         = float(os.getenv("PROCESSED_MAX_MB") or 1024)
+
+store_executor = create_worker_pool(int(os.getenv("PROCESSED_WORKERS") or 2), "store")
+
+image_store = ProcessedImageStore(
+    PROCESSED_DIR,
+    PROCESSED_BASE_URL,
+    store_executor,
+    fmt=PROCESSED_FORMAT,
+    quality=PROCESSED_QUALITY,
+    thumbnail_max_side=PROCESSED_THUMBNAIL_SIDE,
+    max_age_sec=PROCESSED_MAX_AGE_HOURS * 3600 or None,
+    max_bytes=int(PROCESSED_MAX_MB * 1024 * 1024) or None,
+    variant=str(ANNOTATION_MAX_SIDE),
+)
+
+Gauge(
+    "aitrainer_image_writes_pending", "Annotated images queued for encoding.",
+    registry=REGISTRY,
+).set_function(lambda: image_store.stats()["pending"])
+
+
+# ─── Recommendation cache ────────────────────────────────────────────────────
+# Similar bodies (same quantized ratios + classification) reuse a validated
+# recommendation instead of paying for another LLM call.
+
+RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE") or 512)
+RECOMMENDATION_CACHE_TTL  = float(os.getenv("RECOMMENDATION_CACHE_TTL") or 24 * 3600)
+RECOMMENDATION_CACHE_STEP = float(os.getenv("RECOMMENDATION_CACHE_STEP") or 0.05)
+
+recommendation_cache = RecommendationCache(
+    max_entries=RECOMMENDATION_CACHE_SIZE,
+    ttl=RECOMMENDATION_CACHE_TTL,
+    step=RECOMMENDATION_CACHE_STEP,
+) if RECOMMENDATION_CACHE_SIZE > 0 else None
+
+
+# ─── Measurement history ─────────────────────────────────────────────────────
+# Analyses sent with a user_id are appended to a per-user SQLite history
+# (MEASUREMENT_HISTORY, "off" disables it), so progress is served from stored
+# rows by GET /history/{user_id} and /history/{user_id}/trends instead of
+# re-analysing old photos. The same photo is recorded once per user.
+
+MEASUREMENT_HISTORY = os.getenv("MEASUREMENT_HISTORY") or "measurement_history.db"
+
+measurement_history = (
+    MeasurementHistory(MEASUREMENT_HISTORY)
+    if MEASUREMENT_HISTORY.lower() != "off" else None
+)
+
+# user_id is trusted only from the Fitnexus backend, which has authenticated
+# the user: the history routes and any analysis carrying user_id need the
+# X-Service-Token header to match AI_SERVICE_TOKEN. Unset, they are refused
+# (analyses without user_id are unaffected). Browsers cannot send the header:
+# CORS does not allow it.
+AI_SERVICE_TOKEN     = os.getenv("AI_SERVICE_TOKEN") or ""
+SERVICE_TOKEN_HEADER = "X-Service-Token"
+
+# Browser origins allowed by CORS (comma-separated, * = any). Requests
+# carry no cookies, so credentials are never allowed.
+CORS_ORIGINS = [o.strip() for o in (os.getenv("CORS_ORIGINS") or "*").split(",") if o.strip()]
+CORS_HEADERS = ["Accept", "Accept-Language", "Content-Language", "Content-Type", "Authorization"]
+
+
+def _require_service_token(token: Optional[str]):
+    if not (AI_SERVICE_TOKEN and token
+            and hmac.compare_digest(token.encode(), AI_SERVICE_TOKEN.encode())):
+        raise HTTPException(status_code=403, detail="Yêu cầu này chỉ dành cho máy chủ Fitnexus.")
+
+HISTORY_APPENDS = Counter(
+    "aitrainer_history_appends", "Measurement history writes by outcome.", ("outcome",),
+    registry=REGISTRY,
+)
+
+
+def _append_history(user_id, measurements, image_key, taken_at):
+    try:
+        row_id = measurement_history.append(user_id, measurements, image_key, ts=taken_at)
+    except Exception as e:
+        HISTORY_APPENDS.labels("error").inc()
+        print(f"[History] append failed for user {user_id}: {e}")
+        return
+    HISTORY_APPENDS.labels("duplicate" if row_id is None else "ok").inc()
+
+
+def _record_history(user_id, measurements, image_key, taken_at=None):
+    """Append in the background; the response does not wait for the write."""
+    if measurement_history is None or not user_id:
+        return
+    io_executor.submit(
+        _append_history, user_id, copy.deepcopy(measurements), image_key, taken_at
+    )
 
 
 # ─── AI recommendation function ──────────────────────────────────────────────
 
-def get_ai_recommendations(measurements_data: dict) -> dict:
+async def get_ai_recommendations(measurements_data: dict, equipment=None) -> dict:
     """
-    Call the LLM and return a recommendations dict whose `exercise_ids` field
-    contains only valid IDs from EXERCISE_DB.  The fields `exercises` (vi) and
-    `exercises_en` (en) are reconstructed from the DB after the LLM call so
+    Return a recommendations dict whose `exercise_ids` field contains only
+    valid IDs from the exercise catalogue.  The fields `exercises` (vi) and
+    `exercises_en` (en) are reconstructed from the catalogue afterwards so
     that the frontend matching step always succeeds.
+
+    RECOMMENDER_MODE selects who picks the exercises:
+      - "llm"    : the LLM picks IDs and writes the text (default).
+      - "hybrid" : the local recommender picks IDs, the LLM only writes text.
+      - "local"  : no network at all.
+    Whenever every model in GROQ_MODELS fails, the local recommender answers.
+    Answers that came from the LLM carry `llm_usage` (model + token counts).
+    `equipment` ("dumbbell, cable" or a list) restricts the picks to what the
+    user has, plus body-weight moves; None means a full gym.
     """
     if measurements_data.get("cm_measurements"):
         measurements = measurements_data["cm_measurements"]
@@ -184,7 +630,88 @@ def get_ai_recommendations(measurements_data: dict) -> dict:
         measurements = measurements_data.get("pixel_measurements", {})
         unit = "px"
 
-    exercise_index = _build_exercise_index_for_prompt()
+    catalog = exercise_catalog.snapshot
+    equipment = known_equipment(equipment, catalog)
+    if RECOMMENDER_MODE == "local":
+        return _finalize_recommendations(
+            local_recommendations(measurements_data, catalog, equipment), measurements, unit,
+            source="local", catalog=catalog,
+        )
+
+    cache_key = None
+    if recommendation_cache is not None:
+        cache_key = recommendation_cache.key_for(measurements_data, unit)
+        if cache_key is not None:
+            # A catalogue reload must not serve IDs picked from the old one.
+            cache_key = (*cache_key, str(catalog.version), _equipment_key(equipment))
+        cached = recommendation_cache.get(cache_key)
+        if cached is not None:
+            cached["measurements"] = measurements
+            cached["unit"]         = unit
+            RECOMMENDATIONS.labels("cache").inc()
+            return cached
+
+    # Concurrent requests that would share a cache entry (or, without one,
+    # carry identical measurements) share one LLM call.
+    flight_key = cache_key or (
+        json.dumps(measurements_data, sort_keys=True, default=str), unit, str(catalog.version),
+        _equipment_key(equipment),
+    )
+    recommendations = await recommendation_flights.run(
+        flight_key, _remote_recommendations,
+        measurements_data, measurements, unit, catalog, cache_key, equipment,
+    )
+    recommendations["measurements"] = measurements
+    recommendations["unit"]         = unit
+    return recommendations
+
+
+def _equipment_key(equipment):
+    return None if equipment is None else ",".join(sorted(equipment))
+
+
+async def _remote_recommendations(measurements_data: dict, measurements: dict, unit: str,
+                                  catalog, cache_key, equipment=None) -> dict:
+    try:
+        if RECOMMENDER_MODE == "hybrid":
+            recommendations = await _hybrid_recommendations(
+                measurements_data, measurements, unit, catalog, equipment
+            )
+            source = "hybrid"
+        else:
+            recommendations = await _llm_recommendations(
+                measurements_data, measurements, unit, catalog, equipment
+            )
+            source = "llm"
+    except Exception as e:
+        print(f"[AI] LLM unavailable, using local recommender: {e}")
+        return _finalize_recommendations(
+            local_recommendations(measurements_data, catalog, equipment), measurements, unit,
+            source="local", catalog=catalog,
+        )
+
+    recommendations = _finalize_recommendations(
+        recommendations, measurements, unit, source=source,
+        measurements_data=measurements_data, catalog=catalog, equipment=equipment,
+    )
+    if recommendation_cache is not None and recommendations["source"] == source:
+        recommendation_cache.put(cache_key, recommendations)
+    return recommendations
+
+
+def _parse_json_response(text_response: str) -> dict:
+    json_start = text_response.find("{")
+    json_end   = text_response.rfind("}") + 1
+    return json.loads(text_response[json_start:json_end])
+
+
+async def _llm_recommendations(measurements_data: dict, measurements: dict, unit: str,
+                               catalog, equipment=None) -> dict:
+    classes = measurements_data.get("classifications") or {}
+    # With an equipment list the candidates are only exercises the user can do.
+    exercise_index = _exercise_index_for_prompt(
+        catalog, classes.get("shape_type"), classes.get("somatotype"), equipment
+    )
 
     prompt = f"""
 You are a professional fitness coach. Analyze the body measurements and select the most suitable exercises.
@@ -196,19 +723,15 @@ BODY MEASUREMENTS ({unit}):
 - Height         : {measurements.get("height",         "N/A")}
 - Leg length     : {measurements.get("leg_length",     "N/A")}
 
-AVAILABLE EXERCISE DATABASE (format: exercise_id|name_vi|name_en):
+CANDIDATE EXERCISES (exercise_id|name):
 {exercise_index}
 
 TASK:
 1. Determine the body shape / somatotype from the measurements.
-2. Select EXACTLY 6 exercises that are most beneficial for this body type.
-3. You MUST only use exercise_ids that appear in the list above.
-4. Do NOT invent new exercise names. Copy the name_vi and name_en fields exactly.
+2. Select EXACTLY 6 exercises from the candidates that are most beneficial for this body type.
 
 RULES — violating these will break the application:
-- The `exercise_ids` array must contain exactly 6 integer IDs from the list above.
-- `exercises`    → copy the exact `name_vi` strings for those IDs (same order).
-- `exercises_en` → copy the exact `name_en` strings for those IDs (same order).
+- `exercise_ids` must contain exactly 6 integer IDs from the candidate list.
 - No extra text, no markdown, only valid JSON.
 
 REQUIRED JSON STRUCTURE:
@@ -219,27 +742,70 @@ REQUIRED JSON STRUCTURE:
   "body_analysis"     : "<2-3 sentence analysis in Vietnamese>",
   "title"             : "<plan title in Vietnamese>",
   "exercise_ids"      : [<id1>, <id2>, <id3>, <id4>, <id5>, <id6>],
-  "exercises"         : ["<exact name_vi 1>", "<exact name_vi 2>", "<exact name_vi 3>", "<exact name_vi 4>", "<exact name_vi 5>", "<exact name_vi 6>"],
-  "exercises_en"      : ["<exact name_en 1>", "<exact name_en 2>", "<exact name_en 3>", "<exact name_en 4>", "<exact name_en 5>", "<exact name_en 6>"],
   "nutrition_advice"  : "<brief nutrition tip in Vietnamese>",
   "lifestyle_tips"    : "<brief lifestyle tip in Vietnamese>",
   "estimated_timeline": "<e.g. 8-12 tuần>"
 }}
 """
 
-    try:
-        text_response = _groq_generate_json(prompt)
-        json_start = text_response.find("{")
-        json_end   = text_response.rfind("}") + 1
-        recommendations = json.loads(text_response[json_start:json_end])
-    except Exception as e:
-        print(f"[AI] Parse error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    text_response, usage = await _groq_generate_json(prompt)
+    recommendations = _parse_json_response(text_response)
+    recommendations["llm_usage"] = usage
+    return recommendations
+
+
+async def _hybrid_recommendations(measurements_data: dict, measurements: dict, unit: str,
+                                  catalog, equipment=None) -> dict:
+    """Local exercise selection; the LLM only writes the narrative fields."""
+    recommendations = local_recommendations(measurements_data, catalog, equipment)
+    chosen = "\n".join(
+        f"- {catalog.get(eid)[2]}" for eid in recommendations["exercise_ids"]
+    )
 
+    prompt = f"""
+You are a professional fitness coach. Write short commentary for this client.
+
+BODY MEASUREMENTS ({unit}):
+- Shoulder width : {measurements.get("shoulder_width", "N/A")}
+- Waist width    : {measurements.get("waist_width",    "N/A")}
+- Hip width      : {measurements.get("hip_width",      "N/A")}
+- Height         : {measurements.get("height",         "N/A")}
+- Leg length     : {measurements.get("leg_length",     "N/A")}
+
+CLASSIFICATION: shape_type={recommendations["shape_type"]}, somatotype={recommendations["somatotype"]}
+
+SELECTED EXERCISES:
+{chosen}
+
+Respond with only valid JSON, all text in Vietnamese:
+{{
+  "body_type"         : "<brief body shape label>",
+  "body_analysis"     : "<2-3 sentence analysis>",
+  "title"             : "<plan title>",
+  "nutrition_advice"  : "<brief nutrition tip>",
+  "lifestyle_tips"    : "<brief lifestyle tip>",
+  "estimated_timeline": "<e.g. 8-12 tuần>"
+}}
+"""
+
+    text_response, usage = await _groq_generate_json(prompt)
+    narrative = _parse_json_response(text_response)
+    for field in ("body_type", "body_analysis", "title",
+                  "nutrition_advice", "lifestyle_tips", "estimated_timeline"):
+        if narrative.get(field):
+            recommendations[field] = narrative[field]
+    recommendations["llm_usage"] = usage
+    return recommendations
+
+
+def _finalize_recommendations(recommendations: dict, measurements: dict, unit: str,
+                              source: str, measurements_data: dict = None,
+                              catalog=None, equipment=None) -> dict:
     # ── Validation + self-healing ─────────────────────────────────────────────
     # Re-derive exercises and exercises_en directly from the DB using the
     # returned IDs so that even if the LLM drifts on the text fields, the
     # frontend will always find an exact match.
+    catalog = catalog or exercise_catalog.snapshot
     raw_ids = recommendations.get("exercise_ids", [])
 
     validated_ids   = []
@@ -253,74 +819,730 @@ REQUIRED JSON STRUCTURE:
             print(f"[AI] Skipping non-integer id: {eid}")
             continue
 
-        row = _ID_TO_ROW.get(eid_int)
+        row = catalog.get(eid_int)
         if row is None:
-            print(f"[AI] ID {eid_int} not found in EXERCISE_DB — skipping")
+            print(f"[AI] ID {eid_int} not found in the exercise catalogue — skipping")
             continue
 
         validated_ids.append(eid_int)
         names_vi.append(row[1])
         names_en.append(row[2])
 
+    if len(validated_ids) == 0 and measurements_data is not None:
+        print("[AI] WARNING: No valid exercise IDs returned by the model — using local picks.")
+        validated_ids = local_recommendations(
+            measurements_data, catalog, equipment
+        )["exercise_ids"]
+        names_vi      = [catalog.get(eid)[1] for eid in validated_ids]
+        names_en      = [catalog.get(eid)[2] for eid in validated_ids]
+        source        = "local"
+
     # Overwrite whatever the LLM produced with authoritative DB values
     recommendations["exercise_ids"]  = validated_ids
     recommendations["exercises"]     = names_vi
     recommendations["exercises_en"]  = names_en
     recommendations["measurements"]  = measurements
     recommendations["unit"]          = unit
+    recommendations["source"]        = source
 
-    if len(validated_ids) == 0:
-        print("[AI] WARNING: No valid exercise IDs returned by the model.")
-
+    RECOMMENDATIONS.labels(source).inc()
     return recommendations
 
 
 # ─── Routes ───────────────────────────────────────────────────────────────────
 
-@app.post("/analyze-image/")
+def _busy_error(e: QueueFullError) -> HTTPException:
+    print(f"[API] Rejecting request: {e}")
+    return HTTPException(
+        status_code=503,
+        detail="Máy chủ đang bận, vui lòng thử lại sau.",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def _reserve_slot() -> AsyncExitStack:
+    """
+    Take an admission slot before a streamed response starts, so a full
+    server still answers 503. Hand it to _SlotStreamingResponse, which gives
+    it back even if the body never runs.
+    """
+    slot = AsyncExitStack()
+    try:
+        await slot.enter_async_context(admission.admit())
+    except QueueFullError as e:
+        raise _busy_error(e)
+    return slot
+
+
+class _SlotStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse holding a slot from _reserve_slot. The body may release
+    it earlier; this only guarantees it is released when the response ends,
+    including a client that disconnects before the first chunk (the body
+    generator is then never started, so its own finally never runs).
+    """
+
+    def __init__(self, content, slot: AsyncExitStack, **kwargs):
+        super().__init__(content, **kwargs)
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.slot.aclose()  # no-op if the body already released it
+
+
+@router.post("/analyze-image/")
 async def analyze_image(
     file: UploadFile = File(...),
     known_height_cm: Optional[float] = Form(None),
+    quality: str = Form(DEFAULT_QUALITY),
+    render: str = Form("overlay"),
+    user_id: Optional[str] = Form(None),
+    taken_at: Optional[float] = Form(None),
+    equipment: Optional[str] = Form(None),
+    service_token: Optional[str] = Header(None, alias=SERVICE_TOKEN_HEADER),
 ):
-    contents = await file.read()
-    np_arr   = np.frombuffer(contents, np.uint8)
-    image    = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+    """
+    render=skeleton skips the segmentation overlay, render=none returns
+    measurements only (processed_image_url is null); both run on landmarkers
+    that do not compute the segmentation mask.
+    With user_id (backend only, see AI_SERVICE_TOKEN) the measurements are
+    added to that user's history (see GET /history/{user_id}), dated taken_at
+    (unix seconds) or now.
+    equipment ("dumbbell, cable, ...") limits the exercises to what the user
+    has, plus body-weight moves; without it a full gym is assumed. Slugs the
+    exercise catalogue does not use are a 400.
+    """
+    tier = _tier_for(quality)
+    _check_render(render)
+    _check_equipment(equipment)
+    if user_id:
+        _require_service_token(service_token)
+    return await _analyze_image(
+        file, known_height_cm, tier, render, user_id=user_id, taken_at=taken_at,
+        equipment=equipment,
+    )
+
+
+async def _analyze_image(file: UploadFile, known_height_cm: Optional[float], tier: str,
+                         render: str, user_id: Optional[str] = None,
+                         taken_at: Optional[float] = None, equipment: Optional[str] = None):
+    contents = await _read_upload(file)
+
+    # The slot covers decode + inference only; the LLM call below waits on
+    # the network, not on a pose worker.
+    try:
+        async with admission.admit():
+            measurements, annotated_image, image_key = await _pose_stage(
+                contents, known_height_cm, tier, render
+            )
+    except QueueFullError as e:
+        raise _busy_error(e)
+    if measurements is None:
+        return {"success": False, "message": "Không tìm thấy cơ thể"}
+    _record_history(user_id, measurements, image_key, taken_at)
+
+    # Encoding runs in the background while the recommendation is fetched.
+    stored = {"url": None, "thumbnail_url": None}
+    if annotated_image is not None:
+        stored = image_store.save(image_key, annotated_image)
+
+    ai_recommendations = await get_ai_recommendations(measurements, equipment)
+
+    response_data = {
+        "success"                 : True,
+        "message"                 : "Thành công",
+        "analysis_data"           : ai_recommendations,
+        "measurements"            : measurements,
+        "processed_image_url"     : stored["url"],
+        "processed_thumbnail_url" : stored["thumbnail_url"],
+    }
+
+    return response_data
+
+
+@router.post("/analyze-image/stream")
+async def analyze_image_stream(
+    file: UploadFile = File(...),
+    known_height_cm: Optional[float] = Form(None),
+    quality: str = Form(DEFAULT_QUALITY),
+    render: str = Form("overlay"),
+    user_id: Optional[str] = Form(None),
+    taken_at: Optional[float] = Form(None),
+    equipment: Optional[str] = Form(None),
+    service_token: Optional[str] = Header(None, alias=SERVICE_TOKEN_HEADER),
+):
+    """
+    Same analysis as /analyze-image/, streamed as NDJSON so the UI can render
+    each part as soon as it exists:
+
+        {"event": "measurements", "measurements": {...}, "classifications": {...}}
+        {"event": "image",        "processed_image_url": "...", "processed_thumbnail_url": ...}
+        {"event": "analysis",     "analysis_data": {...}}
+        {"event": "done",         "success": true, "message": "..."}
+
+    With render=none there is no "image" event. user_id, taken_at and
+    equipment work as for /analyze-image/.
+    Failures after the stream has started arrive as
+    {"event": "error", "status": <code>, "detail": "..."}.
+    """
+    tier = _tier_for(quality)
+    _check_render(render)
+    _check_equipment(equipment)
+    if user_id:
+        _require_service_token(service_token)
+    # Read the upload now: FastAPI closes it once this handler returns.
+    contents = await _read_upload(file)
+
+    slot = await _reserve_slot()
+
+    async def events():
+        async for event in _analysis_events(
+            contents, known_height_cm, tier, render, user_id=user_id, taken_at=taken_at,
+            equipment=equipment, slot=slot,
+        ):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return _SlotStreamingResponse(events(), slot, media_type="application/x-ndjson")
+
+
+async def _analysis_events(contents: bytes, known_height_cm: Optional[float], tier: str,
+                           render: str, user_id: Optional[str] = None,
+                           taken_at: Optional[float] = None,
+                           equipment: Optional[str] = None,
+                           slot: Optional[AsyncExitStack] = None):
+    """
+    The events of one streamed analysis. `slot` holds the admission slot
+    taken before the response started; it is released as soon as the pose
+    stage is done, not when the client has read the whole stream.
+    """
+    try:
+        measurements, annotated_image, image_key = await _pose_stage(
+            contents, known_height_cm, tier, render
+        )
+    except HTTPException as e:
+        yield {"event": "error", "status": e.status_code, "detail": e.detail}
+        return
+    finally:
+        if slot is not None:
+            await slot.aclose()
+
+    if measurements is None:
+        yield {"event": "done", "success": False, "message": "Không tìm thấy cơ thể"}
+        return
+    _record_history(user_id, measurements, image_key, taken_at)
+
+    yield {
+        "event"          : "measurements",
+        "measurements"   : measurements,
+        "classifications": measurements.get("classifications", {}),
+    }
+
+    # The image URL is known before encoding finishes; the LLM call overlaps.
+    recommendations_task = asyncio.create_task(get_ai_recommendations(measurements, equipment))
+    try:
+        if annotated_image is not None:
+            stored = image_store.save(image_key, annotated_image)
+            yield {
+                "event"                  : "image",
+                "processed_image_url"    : stored["url"],
+                "processed_thumbnail_url": stored["thumbnail_url"],
+            }
+
+        ai_recommendations = await recommendations_task
+    except Exception as e:
+        yield {"event": "error", "status": 500, "detail": str(e)}
+        return
+    finally:
+        # Client went away or a stage failed: don't leave the LLM call running.
+        if not recommendations_task.done():
+            recommendations_task.cancel()
+
+    yield {"event": "analysis", "analysis_data": ai_recommendations}
+    yield {"event": "done", "success": True, "message": "Thành công"}
+
+
+# Batch detection runs on its own pool, so a large batch cannot take every
+# pose worker from single-image requests. Each chunk holds one admission slot
+# while it is detected and measured, and gives it back before recommendations.
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE") or 32)
+BATCH_WORKERS    = int(os.getenv("BATCH_WORKERS") or max(1, POSE_WORKERS // 2))
+
+batch_executor = create_worker_pool(BATCH_WORKERS, "batch")
+
+
+def _uploaded(data):
+    # detect_item loader: reports a rejected upload as that item's error.
+    if isinstance(data, Exception):
+        raise data
+    return data
+
+
+@router.post("/analyze-batch/")
+async def analyze_batch_images(
+    files: List[UploadFile] = File(...),
+    known_height_cm: Optional[float] = Form(None),
+    recommend: bool = Form(False),
+    quality: str = Form(DEFAULT_QUALITY),
+    equipment: Optional[str] = Form(None),
+):
+    """
+    Analyze many images in one request. Inference fans out over BATCH_WORKERS
+    threads and measurements are computed per chunk in one vectorized pass;
+    with several people in a photo the largest is measured. Streams one JSON
+    line per image, in upload order:
+
+        {"index": 0, "filename": "...", "success": true, "measurements": {...}}
+
+    With recommend=true each successful line also carries `analysis_data`
+    (picked for `equipment`, as for /analyze-image/).
+    The model tier is chosen once for the whole batch from `quality`.
+    """
+    from core.batch import detect_item, iter_chunks, measure_chunk
+
+    tier = _tier_for(quality)
+    _check_equipment(equipment)
+
+    # A rejected file becomes an error line for that index, not a failed batch.
+    uploads = []
+    for file in files:
+        try:
+            data = (await run_blocking(io_executor, _ingest, file)).data
+        except UploadRejected as e:
+            UPLOADS_REJECTED.labels(e.status_code).inc()
+            data = e
+        uploads.append((file.filename, data))
+
+    # The first chunk's slot is taken now, so a full server answers 503.
+    first_slot = await _reserve_slot()
+
+    async def measure(chunk, slot):
+        async with slot:
+            detected = await asyncio.gather(*[
+                run_blocking(
+                    batch_executor, detect_item, mask_free_pools[tier], name,
+                    functools.partial(_uploaded, data),
+                    max_side=POSE_INPUT_MAX_SIDE or None,
+                )
+                for name, data in chunk
+            ])
+            return await run_blocking(batch_executor, measure_chunk, detected, known_height_cm)
+
+    async def lines():
+        slot = first_slot
+        index = 0
+        for chunk in iter_chunks(uploads, BATCH_CHUNK_SIZE):
+            try:
+                results = await measure(chunk, slot or admission.admit())
+            except QueueFullError as e:
+                print(f"[API] Batch chunk rejected: {e}")
+                results = [
+                    {"key": name, "success": False,
+                     "message": "Máy chủ đang bận, vui lòng thử lại sau."}
+                    for name, _ in chunk
+                ]
+            slot = None
+            for result in results:
+                result["filename"] = result.pop("key")
+                result["model_tier"] = tier
+                if recommend and result["success"]:
+                    result["analysis_data"] = await get_ai_recommendations(
+                        result["measurements"], equipment
+                    )
+                yield json.dumps({"index": index, **result}, ensure_ascii=False) + "\n"
+                index += 1
+
+    return _SlotStreamingResponse(lines(), first_slot, media_type="application/x-ndjson")
+
+
+# ─── Measurement history routes ──────────────────────────────────────────────
+
+def _require_history():
+    if measurement_history is None:
+        raise HTTPException(status_code=404, detail="Lịch sử số đo chưa được bật.")
+    return measurement_history
+
+
+@router.get("/history/{user_id}")
+async def history_entries(user_id: str, since: Optional[float] = None,
+                          until: Optional[float] = None, limit: int = 100,
+                          service_token: Optional[str] = Header(None, alias=SERVICE_TOKEN_HEADER)):
+    """
+    Recorded analyses of a user with since <= ts < until (unix seconds),
+    oldest first; the newest `limit` (at most 1000) when there are more.
+    Backend only, like every history route (see AI_SERVICE_TOKEN).
+    """
+    _require_service_token(service_token)
+    history = _require_history()
+    entries = await run_blocking(
+        io_executor, history.entries, user_id, since, until, max(1, min(limit, 1000))
+    )
+    return {"user_id": user_id, "count": len(entries), "entries": entries}
+
+
+@router.get("/history/{user_id}/trends")
+async def history_trends(user_id: str, metrics: Optional[str] = None,
+                         since: Optional[float] = None, until: Optional[float] = None,
+                         bucket: Optional[str] = None,
+                         service_token: Optional[str] = Header(None, alias=SERVICE_TOKEN_HEADER)):
+    """
+    Trend series for a progress dashboard, from stored rows only:
+
+        {"user_id": ..., "bucket": "week",
+         "series": {"waist_hip_ratio": [{"t": "2026-W40", "value": 0.81, "n": 2}, ...]},
+         "summary": {"waist_hip_ratio": {"first": 0.84, "last": 0.81, "change": -0.03}}}
+
+    metrics: comma-separated (default shoulder_hip_ratio, waist_hip_ratio,
+    waist_width_cm, hip_width_cm); lengths are in cm and need known_height_cm.
+    bucket: day | week | month averages, or omitted for one point per analysis.
+    """
+    _require_service_token(service_token)
+    history = _require_history()
+    names = [m.strip() for m in metrics.split(",") if m.strip()] if metrics else DEFAULT_TREND_METRICS
+    if bucket is not None and bucket not in BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of {', '.join(BUCKETS)}")
+    try:
+        series = await run_blocking(
+            io_executor, history.trends, user_id, names, since, until, bucket
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    summary = {
+        metric: {
+            "first": points[0]["value"],
+            "last": points[-1]["value"],
+            "change": round(points[-1]["value"] - points[0]["value"], 4),
+        }
+        for metric, points in series.items() if points
+    }
+    return {"user_id": user_id, "bucket": bucket, "series": series, "summary": summary}
+
+
+# ─── Live frames ─────────────────────────────────────────────────────────────
+# Each WebSocket session owns a VIDEO-mode landmarker (tracking between
+# frames), so sessions are capped separately from one-shot requests.
+
+LIVE_MAX_SESSIONS = int(os.getenv("LIVE_MAX_SESSIONS") or 2)
+LIVE_SMOOTHING    = float(os.getenv("LIVE_SMOOTHING") or 0.3)
+
+live_admission = AdmissionController(LIVE_MAX_SESSIONS, 0)
+
+Gauge(
+    "aitrainer_live_sessions", "Open live WebSocket sessions.",
+    registry=REGISTRY,
+).set_function(lambda: live_admission.active)
+
+
+@router.websocket("/ws/live")
+async def live_stream(websocket: WebSocket, known_height_cm: Optional[float] = None,
+                      quality: str = DEFAULT_QUALITY):
+    """
+    Real-time analysis over a camera stream.
+
+    Client → server:
+      - binary message: one encoded frame (JPEG/PNG/WebP)
+      - text message  : JSON control, e.g. {"known_height_cm": 170} or {"reset": true}
+    Query parameters: known_height_cm, quality=fast|balanced|accurate.
+
+    Server → client, one per processed frame:
+        {"event": "frame", "frame": n, "timestamp_ms": t, "image_size": [w, h],
+         "landmarks": [[x, y, visibility], ...] | null,
+         "measurements": {...} | null, "inference_ms": ..., "dropped": k}
+
+    Only the newest frame is analysed: frames that arrive while inference is
+    running replace each other and are counted in `dropped`, so latency stays
+    bounded when the client sends faster than the model runs.
+    """
+    await websocket.accept()
+    if quality not in QUALITY_TIERS:
+        await websocket.close(code=1008, reason="invalid quality")
+        return
+    try:
+        async with live_admission.admit():
+            await _run_live_session(websocket, known_height_cm, QUALITY_TIERS[quality])
+    except QueueFullError as e:
+        print(f"[Live] Rejecting session: {e}")
+        await websocket.close(code=1013, reason="busy")
+
+
+async def _run_live_session(websocket: WebSocket, known_height_cm: Optional[float], tier: str):
+    from core.live import LiveSession
+
+    session = LiveSession(known_height_cm=known_height_cm, smoothing=LIVE_SMOOTHING, tier=tier)
+    try:
+        await run_blocking(pose_executor, session.open)
+    except Exception as e:
+        await websocket.send_json({"event": "error", "detail": str(e)})
+        await websocket.close(code=1011)
+        return
+
+    started = time.monotonic()
+    pending = {"frame": None, "dropped": 0}
+    frame_ready = asyncio.Event()
+
+    async def receive_frames():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes") is not None:
+                if pending["frame"] is not None:
+                    pending["dropped"] += 1
+                # Timestamp on arrival so tracking sees the real frame spacing.
+                pending["frame"] = (message["bytes"], int((time.monotonic() - started) * 1000))
+                frame_ready.set()
+            elif message.get("text"):
+                try:
+                    session.configure(json.loads(message["text"]))
+                except (ValueError, TypeError, AttributeError) as e:
+                    print(f"[Live] Ignoring control message: {e}")
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            waiter = asyncio.create_task(frame_ready.wait())
+            done, _ = await asyncio.wait({receiver, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                waiter.cancel()
+                break
+            frame_ready.clear()
+            (data, timestamp_ms), dropped = pending["frame"], pending["dropped"]
+            pending["frame"], pending["dropped"] = None, 0
+
+            try:
+                payload = await run_blocking(pose_executor, session.process, data, timestamp_ms)
+            except ValueError as e:
+                payload = {"event": "error", "detail": str(e)}
+            payload["dropped"] = dropped
+            await websocket.send_json(payload)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        receiver.cancel()
+        await run_blocking(pose_executor, session.close)
+
+
+async def _pose_stage(contents: bytes, known_height_cm: Optional[float], tier: str,
+                      render: str = "overlay"):
+    """
+    Decode + pose inference, served from the result cache when possible.
+    Returns (measurements, annotated_image, content key). measurements is None
+    when no body is found; annotated_image is also None for render="none".
+    measurements["model_tier"] names the tier that produced them.
+    """
+    cache_key = content_key(
+        contents, known_height_cm, tier, render, MEASUREMENT_WIDTHS, POSE_NUM_POSES
+    )
+    if result_cache is not None:
+        cached = await run_blocking(io_executor, result_cache.get, cache_key)
+        RESULT_CACHE_LOOKUPS.labels("hit" if cached is not None else "miss").inc()
+        if cached is not None:
+            return (*cached, cache_key)
+
+    # Identical uploads arriving together (double submit, several tabs)
+    # share one decode + inference. Each gets its own measurements dict, as
+    # from the result cache; the annotated image is only read.
+    measurements, annotated_image = await pose_flights.run(
+        cache_key, _compute_pose, contents, known_height_cm, tier, render, cache_key
+    )
+    return copy.deepcopy(measurements), annotated_image, cache_key
+
+
+async def _compute_pose(contents: bytes, known_height_cm: Optional[float], tier: str,
+                        render: str, cache_key: str):
+    image, original_size = await run_blocking(pose_executor, _decode_image, contents)
 
     if image is None:
         raise HTTPException(status_code=400, detail="Lỗi file ảnh.")
 
+    t0 = time.perf_counter()
     try:
-        annotated_image, ratio, measurements = analyze_pose_with_model(
-            pose_model, image, known_height_cm=known_height_cm
+        annotated_image, ratio, measurements = await run_blocking(
+            pose_executor, _analyze_pose, image, tier, render, original_size,
+            known_height_cm=known_height_cm,
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Includes the wait for a free landmarker: that is the load signal.
+        tier_router.record(tier, (time.perf_counter() - t0) * 1000)
 
-    if annotated_image is None or measurements is None:
-        return {"success": False, "message": "Không tìm thấy cơ thể"}
+    if measurements is None:
+        BODY_NOT_FOUND.labels(tier).inc()
+        return None, None
 
-    ai_recommendations = get_ai_recommendations(measurements)
+    measurements["model_tier"] = tier
 
-    response_data = {
-        "success"              : True,
-        "message"              : "Thành công",
-        "analysis_data"        : ai_recommendations,
-        "measurements"         : measurements,
-        "processed_image_url"  : None,
-    }
+    if result_cache is not None:
+        io_executor.submit(result_cache.put, cache_key, measurements, annotated_image)
 
-    output_filename = f"processed_{file.filename}"
-    output_path     = os.path.join("processed_images", output_filename)
-    cv2.imwrite(output_path, annotated_image)
-    response_data["processed_image_url"] = f"http://localhost:8000/processed/{output_filename}"
+    return measurements, annotated_image
 
-    return response_data
+
+@router.get("/processed/{name}")
+async def processed_image(name: str):
+    path = image_store.path_for(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    await image_store.wait(name)
+    if not await run_blocking(io_executor, os.path.isfile, path):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return FileResponse(path)
 
 
-@app.get("/")
+@router.get("/")
 async def root():
+    """Liveness: the process is up and the event loop answers."""
     return {"status": "online"}
 
 
+@router.get("/ready")
+async def ready():
+    """
+    Readiness: 200 once at least one landmarker (any tier) is loaded and
+    warmed up, 503 while the pools are still loading (or failed to load).
+    """
+    pools_health = {tier: pool.health() for tier, pool in pose_pools.items()}
+    body = {
+        "ready"     : any(h["ready"] for h in pools_health.values()),
+        "pose_pools": {
+            tier: {k: h[k] for k in ("state", "size", "loaded", "warmup_ms", "load_ms")}
+            for tier, h in pools_health.items()
+        },
+        "llm"       : groq_configured(),
+    }
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+
+def _tiers_health(pools: dict) -> dict:
+    # Tiers left out of POSE_TIERS are reported, but as absent: not a fault.
+    return {
+        tier: pools[tier].health() if tier in pools else {"state": "absent", "ready": False}
+        for tier in TIERS
+    }
+
+
+@router.get("/health")
+async def health():
+    """status is "degraded" while a configured tier is not ready."""
+    pools_health = {tier: pool.health() for tier, pool in pose_pools.items()}
+    return {
+        "status"    : "ok" if all(h["ready"] for h in pools_health.values()) else "degraded",
+        "pose_pools": _tiers_health(pose_pools),
+        "mask_free_pools": _tiers_health(mask_free_pools),
+        "tier_router": tier_router.stats(),
+        "admission": admission.stats(),
+        "live_sessions": live_admission.stats(),
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "image_store": image_store.stats(),
+        "llm": llm_router.stats(),
+        "exercise_catalog": exercise_catalog.stats(),
+        "single_flight": {
+            "pose": pose_flights.stats(),
+            "recommendation": recommendation_flights.stats(),
+        },
+        "recommendation_cache": (
+            recommendation_cache.stats() if recommendation_cache is not None else None
+        ),
+        "measurement_history": (
+            measurement_history.stats() if measurement_history is not None else None
+        ),
+    }
+
+
+@router.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of the counters, gauges and histograms."""
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
+class _MetricsMiddleware:
+    """
+    Counts and times every HTTP request by route template, tracks requests
+    in flight, and adds the Server-Timing header according to SERVER_TIMING.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        want_timing = SERVER_TIMING == "on" or (
+            SERVER_TIMING == "request" and headers.get(b"x-server-timing") == b"1"
+        )
+        timings, token = start_request_timings()
+        status = {"code": 500}
+        t0 = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if want_timing and timings:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"server-timing", server_timing_header(timings).encode("latin-1")),
+                    ]
+            await send(message)
+
+        try:
+            with HTTP_IN_FLIGHT.track_inprogress():
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            stop_request_timings(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUESTS.labels(scope["method"], route, status["code"]).inc()
+            HTTP_DURATION.labels(route).observe(time.perf_counter() - t0)
+
+
+@asynccontextmanager
+async def _lifespan(application: FastAPI):
+    if not groq_configured():
+        print("[API] GROQ_API_KEY chưa được cấu hình — dùng bộ gợi ý local.")
+    # Default tier first so it is ready soonest.
+    pools = [pose_pool] + [p for p in pose_pools.values() if p is not pose_pool]
+    if MODEL_LOADING == "blocking":
+        for pool in pools:
+            await run_blocking(io_executor, pool.start)
+    elif MODEL_LOADING != "lazy":
+        for pool in pools:
+            pool.start_background()
+    store_executor.submit(image_store.prune)
+    await run_blocking(io_executor, exercise_catalog.refresh)
+    catalog_watch = asyncio.create_task(exercise_catalog.watch(io_executor))
+    yield
+    catalog_watch.cancel()
+    for pool in [*pools, *mask_free_pools.values()]:
+        pool.close()
+    if measurement_history is not None:
+        measurement_history.close()
+
+
+def create_app() -> FastAPI:
+    """
+    Build the FastAPI application. Nothing heavy happens here: models load
+    in the lifespan hook according to MODEL_LOADING.
+    """
+    application = FastAPI(title="Fitnexus AI Trainer API", lifespan=_lifespan)
+    application.add_middleware(
+        CORSMiddleware,
+        allow_origins=CORS_ORIGINS,
+        allow_credentials=False,
+        allow_methods=["*"],
+        allow_headers=CORS_HEADERS,
+    )
+    application.add_middleware(_MetricsMiddleware)
+    application.include_router(router)
+    return application
+
+
+app = create_app()
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
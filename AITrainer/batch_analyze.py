@@ -0,0 +1,111 @@
+"""
+Bulk re-analysis of stored photos, streamed as JSONL.
+
+    python batch_analyze.py photos/ extra.jpg --height 170 --workers 4 -o report.jsonl
+
+Images are decoded and run through a pool of PoseLandmarkers in parallel;
+measurements for each chunk are computed in one vectorized NumPy pass.
+`--recommend local` adds rule-based exercise picks, `--recommend llm` calls
+the same Groq pipeline as the API (needs GROQ_API_KEY).
+"""
+import argparse
+import asyncio
+import functools
+import inspect
+import json
+import os
+import sys
+
+from core.batch import analyze_batch
+from core.concurrency import create_worker_pool
+from core.landmarker_pool import LandmarkerPool, default_pool_size
+from core.pose_analyzer import load_pose_model, warm_up_pose_model
+from core.recommender import local_recommendations
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+
+def iter_image_paths(inputs):
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def write_results(results, out, recommend=None):
+    """
+    Write one JSON line per result; returns (processed, found). `recommend`
+    may be sync or async. Everything runs in one event loop, so the API's
+    Groq client and router keep working across images.
+    """
+    processed = found = 0
+    for result in results:
+        result["file"] = result.pop("key")
+        if recommend is not None and result["success"]:
+            analysis = recommend(result["measurements"])
+            if inspect.isawaitable(analysis):
+                analysis = await analysis
+            result["analysis_data"] = analysis
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+        processed += 1
+        found += result["success"]
+    return processed, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("inputs", nargs="+", help="image files and/or directories")
+    parser.add_argument("--height", type=float, default=None, help="known_height_cm for every image")
+    parser.add_argument("--workers", type=int, default=default_pool_size())
+    parser.add_argument("--chunk-size", type=int, default=32)
+    parser.add_argument("--max-side", type=int, default=1024,
+                        help="longest image side used for inference (0 = full resolution)")
+    parser.add_argument("--recommend", choices=["none", "local", "llm"], default="none")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file (default: stdout)")
+    args = parser.parse_args()
+
+    if args.recommend == "llm":
+        # Reuses the API's pool, caches and Groq client.
+        import api
+        pose_pool = api.mask_free_pools[api.tier_router.tier_for(api.DEFAULT_QUALITY)].start()
+        recommend = api.get_ai_recommendations
+    else:
+        pose_pool = LandmarkerPool(
+            functools.partial(load_pose_model, segmentation=False),
+            size=args.workers,
+            warmup=warm_up_pose_model,
+        ).start()
+        recommend = local_recommendations if args.recommend == "local" else None
+
+    if not pose_pool.ready:
+        sys.exit("Pose model chưa được tải.")
+
+    executor = create_worker_pool(args.workers, "batch")
+    sources = ((path, lambda p=path: _read_bytes(p)) for path in iter_image_paths(args.inputs))
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+
+    try:
+        results = analyze_batch(
+            sources, pose_pool, executor, args.height, args.chunk_size, args.max_side or None
+        )
+        processed, found = asyncio.run(write_results(results, out, recommend))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        executor.shutdown()
+
+    print(f"[Batch] {processed} images, {found} with a detected body", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Synthetic pose fixtures for benchmarks: deterministic photos of a standing
+person, their 33 BlazePose landmarks and segmentation mask, generated from a
+seed. Nothing is downloaded and no model file is needed.
+
+SyntheticPoseModel stands in for a PoseLandmarker: detect() answers with the
+landmarks and mask of the fixture assigned to it, so analyze_pose_with_model
+runs its real measurement, drawing and overlay code on known inputs.
+"""
+import types
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+# Portrait phone photos plus one landscape frame, cycled by seed.
+SIZES = ((720, 1280), (1080, 1920), (1536, 2048), (3024, 4032), (1920, 1080))
+
+# Offsets in body heights from the body's centre line / top of the head.
+# Shoulder, hip and waist half-widths come from the fixture's build.
+_FACE = {
+    0: (0.0, 0.06), 1: (0.012, 0.05), 2: (0.02, 0.05), 3: (0.028, 0.05),
+    4: (-0.012, 0.05), 5: (-0.02, 0.05), 6: (-0.028, 0.05),
+    7: (0.045, 0.06), 8: (-0.045, 0.06), 9: (0.015, 0.085), 10: (-0.015, 0.085),
+}
+
+
+class Fixture:
+    """One synthetic photo: encoded bytes, normalized landmarks and the build behind them."""
+
+    def __init__(self, seed: int, width: int = None, height: int = None, photo: bool = True):
+        rng = np.random.default_rng(seed)
+        if width is None:
+            width, height = SIZES[seed % len(SIZES)]
+        self.name = f"synthetic_{seed:03d}_{width}x{height}"
+        self.seed = seed
+        self.size = (width, height)
+        self.shoulder = float(rng.uniform(0.09, 0.13))
+        self.hip = float(rng.uniform(0.07, 0.11))
+        self.waist = float(rng.uniform(0.75, 1.0)) * min(self.shoulder, self.hip)
+        self.body_h = float(rng.uniform(0.75, 0.9))
+        self.top = float(rng.uniform(0.03, 1.0 - self.body_h - 0.03))
+        self.cx = float(rng.uniform(0.4, 0.6))
+        self.landmarks = self._landmarks()
+        # Last draw from rng, so leaving the photo out keeps the same landmarks.
+        self.contents = self._photo(rng) if photo else None
+
+    def _point(self, dx, dy):
+        width, height = self.size
+        return self.cx + dx * self.body_h * height / width, self.top + dy * self.body_h
+
+    def _landmarks(self):
+        s, h = self.shoulder, self.hip
+        body = {
+            11: (s, 0.2), 12: (-s, 0.2),
+            13: (s + 0.03, 0.36), 14: (-s - 0.03, 0.36),
+            15: (s + 0.04, 0.5), 16: (-s - 0.04, 0.5),
+            17: (s + 0.05, 0.53), 18: (-s - 0.05, 0.53),
+            19: (s + 0.04, 0.54), 20: (-s - 0.04, 0.54),
+            21: (s + 0.03, 0.52), 22: (-s - 0.03, 0.52),
+            23: (h, 0.52), 24: (-h, 0.52),
+            25: (h - 0.01, 0.72), 26: (-h + 0.01, 0.72),
+            27: (h - 0.02, 0.92), 28: (-h + 0.02, 0.92),
+            29: (h - 0.02, 0.95), 30: (-h + 0.02, 0.95),
+            31: (h, 0.97), 32: (-h, 0.97),
+        }
+        offsets = {**_FACE, **body}
+        return np.array(
+            [(*self._point(*offsets[i]), 0.98) for i in range(33)], dtype=np.float64
+        )
+
+    def landmarks_px(self, width=None, height=None):
+        """[(x_px, y_px, visibility)] * 33 in a width x height frame (default: the photo)."""
+        width, height = (width, height) if width else self.size
+        lm = self.landmarks
+        return [(x * width, y * height, v) for x, y, v in lm]
+
+    def draw_silhouette(self, canvas, value):
+        """Fill the body outline into `canvas` (any resolution) with `value`."""
+        height, width = canvas.shape[:2]
+        pts = self.landmarks[:, :2] * (width, height)
+        thickness = max(2, int(0.035 * self.body_h * height))
+
+        def p(i):
+            return tuple(int(round(v)) for v in pts[i])
+
+        waist_y = pts[23, 1] + 0.55 * (pts[11, 1] - pts[23, 1])
+        waist_half = self.waist * self.body_h * height
+        centre = (pts[11, 0] + pts[12, 0]) / 2
+        torso = np.array([
+            p(11), p(12),
+            (int(centre - waist_half), int(waist_y)), p(24), p(23),
+            (int(centre + waist_half), int(waist_y)),
+        ], dtype=np.int32)
+        cv2.fillPoly(canvas, [torso], value)
+        for a, b in ((11, 13), (13, 15), (12, 14), (14, 16), (23, 25), (25, 27), (24, 26), (26, 28)):
+            cv2.line(canvas, p(a), p(b), value, thickness)
+        head = int(0.06 * self.body_h * height)
+        cv2.circle(canvas, p(0), head, value, -1)
+        cv2.line(canvas, p(0), (int(centre), int(pts[11, 1])), value, thickness * 2)
+        return canvas
+
+    def _photo(self, rng, quality=90):
+        width, height = self.size
+        # Gradient plus noise, so encoders and decoders do realistic work.
+        ramp = np.linspace(60, 190, height, dtype=np.float32)[:, None, None]
+        image = (ramp + rng.normal(0, 6, (height, width, 3))).clip(0, 255).astype(np.uint8)
+        self.draw_silhouette(image, (70, 90, 160))
+        ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return buf.tobytes()
+
+    def mask(self, width, height):
+        """Float32 segmentation mask at width x height, as MediaPipe returns it."""
+        return _mask(self, width, height)
+
+
+@lru_cache(maxsize=64)
+def _mask(fixture, width, height):
+    mask = np.zeros((height, width), dtype=np.uint8)
+    fixture.draw_silhouette(mask, 255)
+    return (mask.astype(np.float32) / 255.0)[..., None]
+
+
+def make_corpus(count: int, seed: int = 0):
+    return [Fixture(seed + i) for i in range(count)]
+
+
+class _Mask:
+    def __init__(self, array):
+        self._array = array
+
+    def numpy_view(self):
+        return self._array
+
+
+class SyntheticPoseModel:
+    """
+    PoseLandmarker stand-in. Assign `fixture` before each detect(); like a
+    pooled landmarker, one instance must not be shared between threads.
+    """
+
+    def __init__(self, segmentation=True):
+        self.segmentation = segmentation
+        self.fixture = None
+
+    def detect(self, mp_image):
+        height, width = mp_image.numpy_view().shape[:2]
+        lms = [
+            types.SimpleNamespace(x=x, y=y, visibility=v) for x, y, v in self.fixture.landmarks
+        ]
+        masks = [_Mask(self.fixture.mask(width, height))] if self.segmentation else None
+        return types.SimpleNamespace(pose_landmarks=[lms], segmentation_masks=masks)
+
+    def close(self):
+        pass
@@ -0,0 +1,75 @@
+"""
+In-process stand-in for the Groq client, for offline replay.
+
+StubLLMClient has the AsyncGroq surface the API uses
+(`await client.chat.completions.create(...)`) and answers instantly and
+deterministically from the prompt itself: the first six candidate IDs of
+the exercise index (the shortlist is ranked best first), the classification
+when the prompt states one, and placeholder text. Token usage is estimated
+at four characters per token so prompt changes show up in replay totals.
+
+Install it with api.set_llm_client(StubLLMClient()). replay.py accepts any
+other factory as --llm package.module:callable.
+"""
+import json
+import re
+import time
+import types
+import uuid
+
+_CANDIDATE = re.compile(r"^(\d+)\|", re.MULTILINE)
+_CLASSIFICATION = re.compile(r"CLASSIFICATION: shape_type=([^,\n]+), somatotype=(\S+)")
+
+
+def _estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class _Completions:
+    def __init__(self, client):
+        self._client = client
+
+    async def create(self, messages, model, **kwargs):
+        prompt = "\n".join(m["content"] for m in messages)
+        self._client.calls += 1
+        if self._client.keep_prompts:
+            self._client.prompts.append(prompt)
+        content = json.dumps(self._client.answer(prompt), ensure_ascii=False)
+        return types.SimpleNamespace(
+            id=f"chatcmpl-{uuid.uuid4().hex}",
+            created=int(time.time()),
+            model=model,
+            choices=[types.SimpleNamespace(
+                index=0,
+                message=types.SimpleNamespace(role="assistant", content=content),
+                finish_reason="stop",
+            )],
+            usage=types.SimpleNamespace(
+                prompt_tokens=_estimate_tokens(prompt),
+                completion_tokens=_estimate_tokens(content),
+            ),
+        )
+
+
+class StubLLMClient:
+    def __init__(self, keep_prompts=False):
+        self.chat = types.SimpleNamespace(completions=_Completions(self))
+        self.calls = 0
+        self.keep_prompts = keep_prompts
+        self.prompts = []
+
+    def answer(self, prompt):
+        """The JSON object returned for `prompt`; override to script other answers."""
+        stated = _CLASSIFICATION.search(prompt)
+        shape, somatotype = stated.groups() if stated else ("Rectangle", "Mesomorph")
+        return {
+            "body_type": "Mô phỏng",
+            "shape_type": shape,
+            "somatotype": somatotype,
+            "body_analysis": "Phản hồi mô phỏng cho chế độ replay.",
+            "title": "Kế hoạch mô phỏng",
+            "exercise_ids": [int(i) for i in _CANDIDATE.findall(prompt)[:6]],
+            "nutrition_advice": "Ăn đủ đạm.",
+            "lifestyle_tips": "Ngủ đủ giấc.",
+            "estimated_timeline": "8-12 tuần",
+        }
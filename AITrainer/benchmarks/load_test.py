@@ -0,0 +1,189 @@
+"""
+Load benchmark for POST /analyze-image/.
+
+Fires N concurrent uploads of an image (repeated for --rounds) against a
+running server and reports latency percentiles, throughput and the status code
+mix. While the uploads are in flight it also polls GET / so event-loop stalls
+show up as liveness latency.
+
+Every upload carries different bytes (the image plus a trailer the decoders
+ignore), so each one misses the result cache and nothing is coalesced: the
+numbers measure analysis. --same-image sends identical bytes instead, to
+measure the cached path. Result cache, coalescing and recommendation source
+counts from GET /metrics are reported with the results; similar bodies still
+share recommendation cache entries unless the server runs with
+RECOMMENDATION_CACHE_SIZE=0.
+
+Usage (server started separately with `uvicorn api:app`):
+
+    python benchmarks/load_test.py images/emhaibeo.jpeg -c 16 -r 4
+
+Requires `httpx` (pip install httpx) and prometheus_client.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from collections import Counter
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+# Counters read from /metrics before and after the run: report key ->
+# (sample name, label the counts are split by).
+CACHE_COUNTERS = {
+    "result_cache": ("aitrainer_result_cache_lookups_total", "outcome"),
+    "coalesced": ("aitrainer_coalesced_requests_total", "stage"),
+    "recommendations": ("aitrainer_recommendations_total", "source"),
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(latencies_ms):
+    if not latencies_ms:
+        return {"count": 0}
+    return {
+        "count": len(latencies_ms),
+        "p50_ms": round(percentile(latencies_ms, 50), 1),
+        "p90_ms": round(percentile(latencies_ms, 90), 1),
+        "p99_ms": round(percentile(latencies_ms, 99), 1),
+        "mean_ms": round(statistics.fmean(latencies_ms), 1),
+        "max_ms": round(max(latencies_ms), 1),
+    }
+
+
+def unique_payload(payload, n):
+    # Decoders stop at the image's end marker, so the trailer only changes
+    # the content hash the result cache and the pose single-flight key on.
+    return payload + b"\0load-test-%d" % n
+
+
+async def scrape_counters(client, url):
+    """{report key: Counter(label value -> count)} from GET /metrics, None if unavailable."""
+    try:
+        resp = await client.get(url)
+        resp.raise_for_status()
+    except httpx.HTTPError:
+        return None
+    wanted = {name: (key, label) for key, (name, label) in CACHE_COUNTERS.items()}
+    counts = {key: Counter() for key in CACHE_COUNTERS}
+    for family in text_string_to_metric_families(resp.text):
+        for sample in family.samples:
+            if sample.name in wanted:
+                key, label = wanted[sample.name]
+                counts[key][sample.labels.get(label, "")] += sample.value
+    return counts
+
+
+def counter_deltas(before, after):
+    if before is None or after is None:
+        return None
+    return {
+        key: {label: int(after[key][label] - before[key][label]) for label in after[key]}
+        for key in CACHE_COUNTERS
+    }
+
+
+async def upload_once(client, url, filename, payload, height):
+    data = {"known_height_cm": str(height)} if height else None
+    files = {"file": (filename, payload, "application/octet-stream")}
+    start = time.perf_counter()
+    try:
+        resp = await client.post(url, files=files, data=data)
+        status = resp.status_code
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    return status, (time.perf_counter() - start) * 1000.0
+
+
+async def poll_liveness(client, url, stop, samples):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            await client.get(url)
+            samples.append((time.perf_counter() - start) * 1000.0)
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.05)
+
+
+async def run(args):
+    with open(args.image, "rb") as f:
+        payload = f.read()
+    filename = os.path.basename(args.image)
+    base = args.url.rstrip("/")
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        stop = asyncio.Event()
+        liveness = []
+        before = await scrape_counters(client, base + "/metrics")
+        poller = asyncio.create_task(poll_liveness(client, base + "/", stop, liveness))
+
+        statuses = Counter()
+        ok_latencies = []
+        started = time.perf_counter()
+        for round_no in range(args.rounds):
+            results = await asyncio.gather(
+                *[
+                    upload_once(
+                        client, base + "/analyze-image/", filename,
+                        payload if args.same_image
+                        else unique_payload(payload, round_no * args.concurrency + i),
+                        args.height,
+                    )
+                    for i in range(args.concurrency)
+                ]
+            )
+            for status, latency in results:
+                statuses[str(status)] += 1
+                if status == 200:
+                    ok_latencies.append(latency)
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        await poller
+        after = await scrape_counters(client, base + "/metrics")
+
+    return {
+        "concurrency": args.concurrency,
+        "rounds": args.rounds,
+        "same_image": args.same_image,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(sum(statuses.values()) / elapsed, 2) if elapsed else None,
+        "status_codes": dict(statuses),
+        "analyze_latency": summarize(ok_latencies),
+        "liveness_latency": summarize(liveness),
+        "server_counters": counter_deltas(before, after),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("image", help="image file to upload")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("-r", "--rounds", type=int, default=3)
+    parser.add_argument("--height", type=float, default=None, help="known_height_cm")
+    parser.add_argument("--same-image", action="store_true",
+                        help="upload identical bytes every time (cache hits and coalescing)")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Local stand-in for the Groq chat-completions API.
+
+Answers POST /openai/v1/chat/completions with a valid recommendation JSON
+(six IDs from EXERCISE_DB) after a configurable per-model delay, and can
+fail or hang a share of the calls. Point the API at it to exercise hedging,
+adaptive timeouts and the circuit breaker without network access:
+
+    python benchmarks/mock_llm_server.py --port 9000 \\
+        --latency llama-3.3-70b-versatile=8 --latency llama-3.1-8b-instant=0.5 \\
+        --fail llama-3.3-70b-versatile=0.3
+
+    GROQ_API_KEY=mock GROQ_BASE_URL=http://127.0.0.1:9000 uvicorn api:app
+
+GET /stats returns the calls seen per model.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.exercises import EXERCISE_DB  # noqa: E402
+
+
+def _pairs(values, cast=float):
+    result = {}
+    for item in values or []:
+        model, _, value = item.partition("=")
+        result[model] = cast(value)
+    return result
+
+
+def _content(rng):
+    rows = rng.sample(EXERCISE_DB, 6)
+    return json.dumps({
+        "body_type": "Cân đối",
+        "shape_type": "Rectangle",
+        "somatotype": "Mesomorph",
+        "body_analysis": "Phản hồi mô phỏng từ mock LLM.",
+        "title": "Kế hoạch mô phỏng",
+        "exercise_ids": [r[0] for r in rows],
+        "exercises": [r[1] for r in rows],
+        "exercises_en": [r[2] for r in rows],
+        "nutrition_advice": "Ăn đủ đạm.",
+        "lifestyle_tips": "Ngủ đủ giấc.",
+        "estimated_timeline": "8-12 tuần",
+    }, ensure_ascii=False)
+
+
+def create_app(latency, fail, hang, default_latency, seed=None):
+    app = FastAPI(title="Mock LLM")
+    calls = Counter()
+    rng = random.Random(seed)
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "")
+        calls[model] += 1
+        if rng.random() < hang.get(model, 0.0):
+            await asyncio.sleep(3600)
+        await asyncio.sleep(latency.get(model, default_latency))
+        if rng.random() < fail.get(model, 0.0):
+            return JSONResponse(
+                {"error": {"message": f"mock failure for {model}", "type": "server_error"}},
+                status_code=503,
+            )
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": _content(rng)},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return dict(calls)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", action="append", metavar="MODEL=SEC",
+                        help="response delay for a model (repeatable)")
+    parser.add_argument("--default-latency", type=float, default=0.2)
+    parser.add_argument("--fail", action="append", metavar="MODEL=RATE",
+                        help="share of calls answered with HTTP 503")
+    parser.add_argument("--hang", action="append", metavar="MODEL=RATE",
+                        help="share of calls that never answer")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    app = create_app(
+        _pairs(args.latency), _pairs(args.fail), _pairs(args.hang),
+        args.default_latency, seed=args.seed,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""
+Benchmark and regression check for the one-shot analysis pipeline.
+
+Runs the same steps as POST /analyze-image/ (decode, pose detection,
+measurements, drawing, segmentation overlay, encoding the annotated image)
+over a fixed corpus and reports:
+
+- per-stage latency (p50 / p90 / mean), from the pipeline's own timed()
+  stages plus "analyze" (all of analyze_pose_with_model), "encode" and "total";
+- throughput at 1..N worker threads, each with its own pose model;
+- peak traced allocation per image (tracemalloc) and the process max RSS;
+- the measurements of every image, so heuristic changes show up as diffs.
+
+The default corpus is synthetic (benchmarks/fixtures.py) and runs on a stub
+pose model, so it needs neither network nor model files and its
+measurements are exactly reproducible. --model lite|full|heavy uses a real
+landmarker (detect then reflects inference cost); image paths replace the
+synthetic corpus and need a real model.
+
+    python benchmarks/pipeline_bench.py -n 8 -r 3 --workers 4 --json out.json
+    python benchmarks/pipeline_bench.py --baseline out.json --tolerance 0.25
+    python benchmarks/pipeline_bench.py --max-ms measure=5 --max-ms total=150
+
+Exits with status 1 when a check fails.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.image_io import decode_image  # noqa: E402
+from core.metrics import start_request_timings, stop_request_timings, timed  # noqa: E402
+from core.pose_analyzer import (  # noqa: E402
+    WIDTH_METHODS,
+    analyze_pose_with_model,
+    load_pose_model,
+    warm_up_pose_model,
+)
+
+from fixtures import SyntheticPoseModel, make_corpus  # noqa: E402
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+ENCODE_FORMATS = {"webp": cv2.IMWRITE_WEBP_QUALITY, "jpeg": cv2.IMWRITE_JPEG_QUALITY}
+# Config keys that determine the measurements; baselines are only compared
+# value for value when all of them match.
+MEASUREMENT_CONFIG = ("model", "widths", "height_cm", "pose_max_side", "seed", "images")
+STAGE_ORDER = ("decode", "detect", "measure", "draw", "overlay", "analyze", "encode", "total")
+
+
+class Item:
+    def __init__(self, name, contents, fixture=None):
+        self.name = name
+        self.contents = contents
+        self.fixture = fixture
+
+
+def load_items(inputs, count, seed):
+    if not inputs:
+        return [Item(f.name, f.contents, f) for f in make_corpus(count, seed)]
+    items = []
+    for path in inputs:
+        paths = (
+            [os.path.join(path, n) for n in sorted(os.listdir(path))]
+            if os.path.isdir(path) else [path]
+        )
+        for p in paths:
+            if os.path.splitext(p)[1].lower() in IMAGE_EXTENSIONS:
+                with open(p, "rb") as f:
+                    items.append(Item(os.path.basename(p), f.read()))
+    return items
+
+
+def new_model(args):
+    if args.model == "synthetic":
+        return SyntheticPoseModel(segmentation=args.render == "overlay" or args.widths == "silhouette")
+    model = load_pose_model(tier=args.model)
+    if model is None:
+        sys.exit(f"pose_landmarker_{args.model}.task not found next to api.py")
+    warm_up_pose_model(model)
+    return model
+
+
+def run_item(model, item, args):
+    """One analysis as the API runs it; returns (stage timings, measurements)."""
+    if item.fixture is not None:
+        model.fixture = item.fixture
+    timings, token = start_request_timings()
+    try:
+        t0 = time.perf_counter()
+        image, original_size = decode_image(item.contents, args.decode_max_side or None)
+        with timed("analyze"):
+            annotated, _, measurements = analyze_pose_with_model(
+                model,
+                image,
+                known_height_cm=args.height_cm,
+                original_size=original_size,
+                inference_max_side=args.pose_max_side or None,
+                output_max_side=args.annotation_max_side or None,
+                render_inplace=True,
+                render=args.render,
+                width_method=args.widths,
+            )
+        if annotated is not None:
+            with timed("encode"):
+                cv2.imencode(
+                    f".{args.format}".replace("jpeg", "jpg"), annotated,
+                    [ENCODE_FORMATS[args.format], args.quality],
+                )
+        timings.append(("total", time.perf_counter() - t0))
+    finally:
+        stop_request_timings(token)
+    return timings, measurements
+
+
+def run_workers(items, args, workers):
+    """corpus x repeats over `workers` threads; returns (wall seconds, timings, measurements)."""
+    models = [new_model(args) for _ in range(workers)]
+    jobs = [item for _ in range(args.repeats) for item in items]
+
+    def worker(index):
+        model, results = models[index], []
+        for item in jobs[index::workers]:
+            results.append((item.name, *run_item(model, item, args)))
+        return results
+
+    # Untimed pass: scratch buffers, decoder tables, page faults.
+    for item in items:
+        run_item(models[0], item, args)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        results = [r for chunk in pool.map(worker, range(workers)) for r in chunk]
+    wall = time.perf_counter() - t0
+    for model in models:
+        model.close()
+    return wall, results
+
+
+def peak_traced_mb(items, args):
+    model, peaks = new_model(args), []
+    run_item(model, items[0], args)
+    for item in items:
+        tracemalloc.start()
+        run_item(model, item, args)
+        peaks.append(tracemalloc.get_traced_memory()[1] / (1024 * 1024))
+        tracemalloc.stop()
+    model.close()
+    return max(peaks)
+
+
+def summarize(samples_ms):
+    ordered = sorted(samples_ms)
+    return {
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p90_ms": round(ordered[math.ceil(0.9 * len(ordered)) - 1], 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "n": len(ordered),
+    }
+
+
+def stage_stats(results):
+    per_stage = {}
+    for _, timings, _ in results:
+        totals = {}
+        for stage, seconds in timings:
+            totals[stage] = totals.get(stage, 0.0) + seconds * 1000
+        for stage, ms in totals.items():
+            per_stage.setdefault(stage, []).append(ms)
+    order = {s: i for i, s in enumerate(STAGE_ORDER)}
+    return {
+        stage: summarize(samples)
+        for stage, samples in sorted(per_stage.items(), key=lambda kv: order.get(kv[0], -1))
+    }
+
+
+def measurement_snapshot(results):
+    snapshot = {}
+    for name, _, measurements in results:
+        if name in snapshot:
+            continue
+        if measurements is None:
+            snapshot[name] = None
+            continue
+        snapshot[name] = {
+            "pixel_measurements": {
+                k: round(v, 4) for k, v in sorted(measurements["pixel_measurements"].items())
+            },
+            "cm_measurements": {
+                k: round(v, 4) for k, v in sorted(measurements["cm_measurements"].items())
+            },
+            "classifications": measurements.get("classifications", {}),
+        }
+    return snapshot
+
+
+def run(args):
+    items = load_items(args.inputs, args.count, args.seed)
+    if not items:
+        sys.exit("No images found.")
+    if args.inputs and args.model == "synthetic":
+        sys.exit("Image files need a real pose model: pass --model lite|full|heavy.")
+
+    report = {
+        "config": {
+            "model": args.model,
+            "images": len(items),
+            "repeats": args.repeats,
+            "render": args.render,
+            "widths": args.widths,
+            "height_cm": args.height_cm,
+            "seed": args.seed if not args.inputs else None,
+            "decode_max_side": args.decode_max_side,
+            "pose_max_side": args.pose_max_side,
+            "annotation_max_side": args.annotation_max_side,
+            "format": args.format,
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "throughput": {},
+    }
+    for workers in range(1, args.workers + 1):
+        wall, results = run_workers(items, args, workers)
+        totals = [sum(s for stage, s in t if stage == "total") * 1000 for _, t, _ in results]
+        report["throughput"][str(workers)] = {
+            "images_per_sec": round(len(results) / wall, 2),
+            "p50_total_ms": round(statistics.median(totals), 3),
+        }
+        if workers == 1:
+            # Uncontended latencies and the reference measurements.
+            report["stages"] = stage_stats(results)
+            report["measurements"] = measurement_snapshot(results)
+    report["memory"] = {
+        "peak_traced_mb": round(peak_traced_mb(items, args), 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    return report
+
+
+def print_report(report):
+    config = report["config"]
+    print(
+        f"{config['images']} images x {config['repeats']} runs, model={config['model']}, "
+        f"render={config['render']}, widths={config['widths']}\n"
+    )
+    print(f"{'stage':<10} {'p50 ms':>9} {'p90 ms':>9} {'mean ms':>9}")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<10} {s['p50_ms']:9.2f} {s['p90_ms']:9.2f} {s['mean_ms']:9.2f}")
+    print(f"\n{'workers':<10} {'images/s':>9} {'p50 ms':>9}")
+    for workers, t in report["throughput"].items():
+        print(f"{workers:<10} {t['images_per_sec']:9.2f} {t['p50_total_ms']:9.2f}")
+    memory = report["memory"]
+    print(f"\npeak traced {memory['peak_traced_mb']:.1f} MB per image, max RSS {memory['max_rss_mb']:.0f} MB")
+
+
+def _close(a, b, rel=1e-6):
+    return abs(a - b) <= rel * max(abs(a), abs(b), 1e-9)
+
+
+def compare_measurements(current, baseline):
+    failures = []
+    for name, base in baseline.items():
+        cur = current.get(name, "missing")
+        if base is None or cur is None or cur == "missing":
+            if cur != base:
+                failures.append(f"measurements[{name}]: {base!r} -> {cur!r}")
+            continue
+        for group in ("pixel_measurements", "cm_measurements"):
+            for key in sorted(set(base[group]) | set(cur[group])):
+                a, b = base[group].get(key), cur[group].get(key)
+                if a is None or b is None or not _close(a, b):
+                    failures.append(f"{name}.{group}.{key}: {a} -> {b}")
+        if cur["classifications"] != base["classifications"]:
+            failures.append(f"{name}.classifications: {base['classifications']} -> {cur['classifications']}")
+    return failures
+
+
+def check(report, baseline=None, tolerance=0.25, min_ms=0.5, max_ms=(), min_throughput=()):
+    """Regression failures as readable strings; empty when everything passes."""
+    failures = []
+    for stage, limit in max_ms:
+        value = report["stages"].get(stage, {}).get("p50_ms")
+        if value is None:
+            failures.append(f"stage {stage}: not measured")
+        elif value > limit:
+            failures.append(f"stage {stage}: p50 {value:.2f} ms > limit {limit:.2f} ms")
+    for workers, limit in min_throughput:
+        value = report["throughput"].get(str(workers), {}).get("images_per_sec")
+        if value is None:
+            failures.append(f"throughput at {workers} workers: not measured")
+        elif value < limit:
+            failures.append(f"throughput at {workers} workers: {value:.2f}/s < {limit:.2f}/s")
+    if baseline is None:
+        return failures
+
+    for stage, base in baseline.get("stages", {}).items():
+        cur = report["stages"].get(stage)
+        if cur is None:
+            continue
+        # Sub-millisecond stages are mostly noise; only flag real slowdowns.
+        if cur["p50_ms"] > base["p50_ms"] * (1 + tolerance) and cur["p50_ms"] - base["p50_ms"] > min_ms:
+            failures.append(f"stage {stage}: p50 {base['p50_ms']:.2f} -> {cur['p50_ms']:.2f} ms")
+    for workers, base in baseline.get("throughput", {}).items():
+        cur = report["throughput"].get(workers)
+        if cur and cur["images_per_sec"] < base["images_per_sec"] * (1 - tolerance):
+            failures.append(
+                f"throughput at {workers} workers: {base['images_per_sec']:.2f} -> "
+                f"{cur['images_per_sec']:.2f}/s"
+            )
+    base_peak = baseline.get("memory", {}).get("peak_traced_mb")
+    if base_peak and report["memory"]["peak_traced_mb"] > base_peak * (1 + tolerance):
+        failures.append(f"peak traced memory: {base_peak:.1f} -> {report['memory']['peak_traced_mb']:.1f} MB")
+    base_config = baseline.get("config", {})
+    if all(base_config.get(k) == report["config"].get(k) for k in MEASUREMENT_CONFIG):
+        failures.extend(compare_measurements(report["measurements"], baseline.get("measurements", {})))
+    else:
+        print("\nBaseline measured with different settings; measurements not compared.")
+    return failures
+
+
+def _limits(values, cast):
+    limits = []
+    for item in values or []:
+        key, _, value = item.partition("=")
+        limits.append((cast(key), float(value)))
+    return limits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("inputs", nargs="*", help="image files and/or directories (default: synthetic corpus)")
+    parser.add_argument("-n", "--count", type=int, default=8, help="synthetic images")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-r", "--repeats", type=int, default=3, help="timed runs per image")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="largest worker count")
+    parser.add_argument("--model", default="synthetic", choices=("synthetic", "lite", "full", "heavy"))
+    parser.add_argument("--render", default="overlay", choices=("overlay", "skeleton", "none"))
+    parser.add_argument("--widths", default="landmarks", choices=WIDTH_METHODS)
+    parser.add_argument("--height-cm", type=float, default=170.0, help="known height (0 = none)")
+    parser.add_argument("--decode-max-side", type=int, default=1280)
+    parser.add_argument("--pose-max-side", type=int, default=1024)
+    parser.add_argument("--annotation-max-side", type=int, default=1280)
+    parser.add_argument("--format", default="webp", choices=tuple(ENCODE_FORMATS))
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--json", metavar="PATH", help="write the report as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative slowdown / throughput or memory change vs baseline")
+    parser.add_argument("--min-ms", type=float, default=0.5,
+                        help="ignore stage slowdowns smaller than this vs baseline")
+    parser.add_argument("--max-ms", action="append", metavar="STAGE=MS",
+                        help="absolute p50 limit for a stage (repeatable)")
+    parser.add_argument("--min-throughput", action="append", metavar="WORKERS=IPS",
+                        help="minimum images/s at a worker count (repeatable)")
+    args = parser.parse_args()
+    args.height_cm = args.height_cm or None
+
+    report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    failures = check(
+        report, baseline, args.tolerance, args.min_ms,
+        _limits(args.max_ms, str), _limits(args.min_throughput, int),
+    )
+    if failures:
+        print("\nREGRESSIONS:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    if baseline is not None or args.max_ms or args.min_throughput:
+        print("\nAll checks passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Offline replay: re-run measurements and recommendations on recorded detections.
+
+`record` runs pose detection once and saves every image's landmarks_px and
+segmentation mask to one .npz (core/recording.py). `run` feeds those
+recordings through _calculate_measurements_from_landmarks and
+get_ai_recommendations without a model, a GPU or the network: the LLM is
+the in-process StubLLMClient (benchmarks/llm_stub.py) or any client factory
+given as --llm package.module:callable. Heuristic, prompt and recommender
+changes can then be checked on thousands of real detections in seconds.
+
+    python benchmarks/replay.py record photos/*.jpg --model full -o rec.npz
+    python benchmarks/replay.py record --synthetic 1000 -o rec.npz
+    python benchmarks/replay.py run rec.npz --out before.jsonl
+    python benchmarks/replay.py run rec.npz --widths silhouette --baseline before.jsonl
+
+`run` prints throughput, classification and source counts and the
+estimated prompt tokens; with --baseline it lists the cases whose
+classification, exercise IDs or measurements changed and exits with status 1
+when --fail-on-diff is given and any did.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import math
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.pose_analyzer import WIDTH_METHODS  # noqa: E402
+from core.recording import RecordingWriter, load_recordings  # noqa: E402
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+# Synthetic masks are drawn at this long side; MediaPipe's are at pose input size.
+SYNTHETIC_MASK_SIDE = 256
+
+
+# ─── record ──────────────────────────────────────────────────────────────────
+
+def _image_paths(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def record_images(writer, paths, model_tier, known_height_cm, pose_max_side):
+    from core.image_io import decode_image, fit_max_side
+    from core.pose_analyzer import detect_poses, load_pose_model, rank_people
+
+    model = load_pose_model(tier=model_tier)
+    try:
+        for path in _image_paths(paths):
+            with open(path, "rb") as f:
+                # As the API decodes: reduced, with the original size for the landmarks.
+                image, size = decode_image(f.read(), pose_max_side)
+            if image is None:
+                print(f"  skip {path}: not an image")
+                continue
+            width, height = size
+            small = fit_max_side(image, pose_max_side)
+            people, result = detect_poses(model, small, output_size=(width, height))
+            if not people:
+                print(f"  skip {path}: no body detected")
+                continue
+            # The largest person, as the API measures it; masks share the order.
+            primary = rank_people(people)[0][0]
+            masks = getattr(result, "segmentation_masks", None)
+            writer.add(
+                os.path.basename(path), people[primary], (width, height),
+                segmentation_mask=masks[primary] if masks else None,
+                known_height_cm=known_height_cm,
+            )
+    finally:
+        model.close()
+
+
+def record_synthetic(writer, count, seed, with_masks):
+    import numpy as np
+    from fixtures import Fixture
+
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        fixture = Fixture(seed + i, photo=False)
+        width, height = fixture.size
+        scale = SYNTHETIC_MASK_SIDE / max(width, height)
+        mask = (
+            fixture.mask(round(width * scale), round(height * scale)) if with_masks else None
+        )
+        # Every other case has a known height, so both branches are covered.
+        known = float(rng.uniform(150, 190)) if i % 2 else None
+        writer.add(fixture.name, fixture.landmarks_px(), fixture.size, mask, known)
+
+
+def cmd_record(args):
+    writer = RecordingWriter()
+    started = time.perf_counter()
+    if args.synthetic:
+        record_synthetic(writer, args.synthetic, args.seed, not args.no_masks)
+    elif args.images:
+        record_images(writer, args.images, args.model, args.height_cm, args.pose_max_side)
+    else:
+        sys.exit("record: give image paths or --synthetic N")
+    writer.save(args.output)
+    print(f"Recorded {len(writer)} detections to {args.output} "
+          f"({os.path.getsize(args.output) / 1e6:.1f} MB, {time.perf_counter() - started:.1f} s)")
+
+
+# ─── run ─────────────────────────────────────────────────────────────────────
+
+def _load_factory(spec):
+    if spec == "stub":
+        from llm_stub import StubLLMClient
+        return StubLLMClient
+    module, _, attr = spec.partition(":")
+    if not attr:
+        sys.exit(f"--llm: expected 'stub' or package.module:callable, got {spec!r}")
+    return getattr(importlib.import_module(module), attr)
+
+
+def _case(rec, measurements, recommendations):
+    usage = recommendations.get("llm_usage") or {}
+    return {
+        "name"           : rec.name,
+        "classifications": measurements.get("classifications") or {},
+        "cm_measurements": measurements.get("cm_measurements") or {},
+        "px_measurements": measurements.get("pixel_measurements") or {},
+        "source"         : recommendations.get("source"),
+        "exercise_ids"   : recommendations.get("exercise_ids") or [],
+        "prompt_tokens"  : usage.get("prompt_tokens"),
+    }
+
+
+async def replay(recordings, width_method, concurrency):
+    import api
+    from core.pose_analyzer import _calculate_measurements_from_landmarks
+
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(rec):
+        width, height = rec.size
+        measurements = _calculate_measurements_from_landmarks(
+            rec.landmarks_px(), width, height,
+            segmentation_mask=rec.segmentation_mask(),
+            known_height_cm=rec.known_height_cm,
+            width_method=width_method,
+        )
+        async with gate:
+            recommendations = await api.get_ai_recommendations(measurements)
+        return _case(rec, measurements, recommendations)
+
+    return await asyncio.gather(*(one(rec) for rec in recordings))
+
+
+def _changed(before, after, tolerance):
+    """Names of the fields that differ between two cases."""
+    fields = [key for key in ("classifications", "exercise_ids") if before.get(key) != after.get(key)]
+    for key in ("cm_measurements", "px_measurements"):
+        old, new = before.get(key) or {}, after.get(key) or {}
+        for metric in sorted(set(old) | set(new)):
+            a, b = old.get(metric), new.get(metric)
+            if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+                if math.isclose(a, b, rel_tol=tolerance, abs_tol=1e-6):
+                    continue
+            elif a == b:
+                continue
+            fields.append(f"{key[:2]}.{metric}")
+    return fields
+
+
+def compare(baseline_path, cases, tolerance):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {case["name"]: case for case in map(json.loads, f)}
+    diffs = []
+    for case in cases:
+        before = baseline.get(case["name"])
+        if before is None:
+            continue
+        fields = _changed(before, case, tolerance)
+        if fields:
+            diffs.append((case["name"], fields))
+    missing = len(set(baseline) - {case["name"] for case in cases})
+    print(f"\nBaseline {baseline_path}: {len(diffs)} of {len(cases)} cases changed"
+          + (f", {missing} baseline cases not replayed" if missing else ""))
+    for name, fields in diffs[:20]:
+        print(f"  {name}: {', '.join(fields)}")
+    if len(diffs) > 20:
+        print(f"  ... and {len(diffs) - 20} more")
+    return diffs
+
+
+def summarize(cases, elapsed, client):
+    shapes = Counter(case["classifications"].get("shape_type") for case in cases)
+    somatotypes = Counter(case["classifications"].get("somatotype") for case in cases)
+    sources = Counter(case["source"] for case in cases)
+    tokens = [case["prompt_tokens"] for case in cases if case["prompt_tokens"]]
+    print(f"Replayed {len(cases)} cases in {elapsed:.2f} s "
+          f"({len(cases) / elapsed if elapsed else 0:.0f} cases/s)")
+    print(f"  shape_type : {dict(shapes.most_common())}")
+    print(f"  somatotype : {dict(somatotypes.most_common())}")
+    print(f"  source     : {dict(sources.most_common())}")
+    if tokens:
+        print(f"  prompt tokens (est.): {sum(tokens)} total, {sum(tokens) / len(tokens):.0f} per call")
+    calls = getattr(client, "calls", None)
+    if calls is not None:
+        print(f"  LLM calls  : {calls}")
+
+
+def cmd_run(args):
+    # Settings api reads at import time.
+    if not args.cache:
+        os.environ["RECOMMENDATION_CACHE_SIZE"] = "0"
+    os.environ["RECOMMENDER_MODE"] = args.mode
+    import api
+
+    client = _load_factory(args.llm)()
+    api.set_llm_client(client)
+
+    recordings = load_recordings(args.recordings)
+    if args.limit:
+        recordings = recordings[:args.limit]
+    started = time.perf_counter()
+    cases = asyncio.run(replay(recordings, args.widths, args.concurrency))
+    elapsed = time.perf_counter() - started
+
+    summarize(cases, elapsed, client)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for case in cases:
+                f.write(json.dumps(case, ensure_ascii=False) + "\n")
+        print(f"Wrote {args.out}")
+    if args.baseline:
+        diffs = compare(args.baseline, cases, args.tolerance)
+        if diffs and args.fail_on_diff:
+            sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="save detections for replay")
+    record.add_argument("images", nargs="*", help="image files or directories")
+    record.add_argument("-o", "--output", default="recordings.npz")
+    record.add_argument("--synthetic", type=int, metavar="N",
+                        help="record N synthetic fixtures instead of images")
+    record.add_argument("--seed", type=int, default=0)
+    record.add_argument("--no-masks", action="store_true",
+                        help="synthetic: leave out segmentation masks")
+    record.add_argument("--model", default="full", choices=("lite", "full", "heavy"))
+    record.add_argument("--height-cm", type=float, default=None,
+                        help="known height stored with every recorded image")
+    record.add_argument("--pose-max-side", type=int, default=1280)
+    record.set_defaults(func=cmd_record)
+
+    run = commands.add_parser("run", help="replay recordings")
+    run.add_argument("recordings")
+    run.add_argument("--widths", default="landmarks", choices=WIDTH_METHODS)
+    run.add_argument("--mode", default="llm", choices=("llm", "hybrid", "local"),
+                     help="RECOMMENDER_MODE for the replay (default llm)")
+    run.add_argument("--llm", default="stub",
+                     help="'stub' or package.module:callable returning an AsyncGroq-like client")
+    run.add_argument("--cache", action="store_true",
+                     help="keep the recommendation cache on (off by default so every case is answered)")
+    run.add_argument("--concurrency", type=int, default=32)
+    run.add_argument("--limit", type=int, default=None)
+    run.add_argument("--out", help="write one JSON line per case")
+    run.add_argument("--baseline", help="JSONL from an earlier --out to diff against")
+    run.add_argument("--tolerance", type=float, default=1e-6,
+                     help="relative tolerance for measurement diffs")
+    run.add_argument("--fail-on-diff", action="store_true")
+    run.set_defaults(func=cmd_run)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Import-time and cold-start benchmark for the API.
+
+Import time: fresh interpreters run `import api` (-n times) and report how
+long the import took and whether cv2 / mediapipe / groq were pulled in.
+
+Cold start: starts `uvicorn api:app` and measures time until GET / answers
+(liveness) and until GET /ready returns 200 (models loaded and warmed up).
+
+    python benchmarks/startup_bench.py -n 5 --cold-starts 3 --loading background
+
+No third-party dependencies beyond what the API itself needs.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+IMPORT_PROBE = (
+    "import sys, time, json; t = time.perf_counter(); import api; "
+    "print(json.dumps({'ms': (time.perf_counter() - t) * 1000, "
+    "'heavy': [m for m in ('cv2', 'mediapipe', 'groq', 'PIL') if m in sys.modules]}))"
+)
+
+
+def measure_import(runs):
+    samples, heavy = [], set()
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_PROBE], cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        samples.append(result["ms"])
+        heavy.update(result["heavy"])
+    return samples, sorted(heavy)
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None
+
+
+def measure_cold_start(port, loading, timeout):
+    env = dict(os.environ, MODEL_LOADING=loading)
+    base = f"http://127.0.0.1:{port}"
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    live_ms = ready_ms = None
+    try:
+        while time.perf_counter() - t0 < timeout and proc.poll() is None:
+            if live_ms is None and _get(base + "/") == 200:
+                live_ms = (time.perf_counter() - t0) * 1000
+            if live_ms is not None and _get(base + "/ready") == 200:
+                ready_ms = (time.perf_counter() - t0) * 1000
+                break
+            time.sleep(0.02)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return live_ms, ready_ms
+
+
+def fmt(samples):
+    samples = [s for s in samples if s is not None]
+    if not samples:
+        return "n/a"
+    return f"median {statistics.median(samples):8.1f} ms  min {min(samples):8.1f} ms  ({len(samples)} runs)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--imports", type=int, default=5)
+    parser.add_argument("--cold-starts", type=int, default=3)
+    parser.add_argument("--loading", choices=["background", "blocking", "lazy"], default="background")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    samples, heavy = measure_import(args.imports)
+    print(f"import api      : {fmt(samples)}")
+    print(f"heavy modules   : {', '.join(heavy) or 'none'}")
+
+    lives, readies = [], []
+    for _ in range(args.cold_starts):
+        live_ms, ready_ms = measure_cold_start(args.port, args.loading, args.timeout)
+        lives.append(live_ms)
+        readies.append(ready_ms)
+    print(f"cold start live : {fmt(lives)}  [MODEL_LOADING={args.loading}]")
+    print(f"cold start ready: {fmt(readies)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Accuracy-vs-latency benchmark for the pose model tiers.
+
+Runs every tier (lite / full / heavy) over a fixed image set and reports,
+per tier: median and p90 inference latency, detection rate, mean landmark
+error against the heavy model (as % of the image diagonal, visible points
+only), mean relative error of each pixel measurement, and how often the
+shape / somatotype classification agrees with heavy.
+
+    python benchmarks/tier_bench.py images/ -r 5 --max-side 1024
+
+Needs the pose_landmarker_{lite,full,heavy}.task files next to api.py.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.image_io import decode_image, fit_max_side  # noqa: E402
+from core.model_tiers import TIERS  # noqa: E402
+from core.pose_analyzer import (  # noqa: E402
+    _calculate_measurements_from_landmarks,
+    detect_pose,
+    load_pose_model,
+    warm_up_pose_model,
+)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+REFERENCE_TIER = "heavy"
+
+
+def load_corpus(inputs, max_side):
+    corpus = []
+    for path in inputs:
+        paths = (
+            [os.path.join(path, n) for n in sorted(os.listdir(path))]
+            if os.path.isdir(path) else [path]
+        )
+        for p in paths:
+            if os.path.splitext(p)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+            with open(p, "rb") as f:
+                image, size = decode_image(f.read(), max_side)
+            if image is not None:
+                corpus.append((os.path.basename(p), fit_max_side(image, max_side), size))
+    return corpus
+
+
+def run_tier(tier, corpus, repeats):
+    model = load_pose_model(tier=tier)
+    if model is None:
+        return None
+    warm_up_pose_model(model)
+    latencies, outputs = [], {}
+    try:
+        for name, image, size in corpus:
+            for _ in range(repeats):
+                t0 = time.perf_counter()
+                landmarks_px, _ = detect_pose(model, image, output_size=size)
+                latencies.append((time.perf_counter() - t0) * 1000)
+            if landmarks_px is not None:
+                measurements = _calculate_measurements_from_landmarks(landmarks_px, *size)
+                outputs[name] = (np.asarray(landmarks_px), measurements, size)
+    finally:
+        model.close()
+    return latencies, outputs
+
+
+def compare(outputs, reference):
+    lm_errors, rel_errors, agree = [], {}, {"shape_type": [], "somatotype": []}
+    for name, (lm, measurements, size) in outputs.items():
+        if name not in reference:
+            continue
+        ref_lm, ref_m, _ = reference[name]
+        visible = (lm[:, 2] > 0.5) & (ref_lm[:, 2] > 0.5)
+        if visible.any():
+            diag = float(np.hypot(*size))
+            err = np.hypot(*(lm[visible, :2] - ref_lm[visible, :2]).T) / diag * 100
+            lm_errors.append(float(err.mean()))
+        for key, ref_value in ref_m["pixel_measurements"].items():
+            value = measurements["pixel_measurements"].get(key)
+            if value is not None and ref_value:
+                rel_errors.setdefault(key, []).append(abs(value - ref_value) / abs(ref_value) * 100)
+        for key in agree:
+            agree[key].append(
+                measurements["classifications"].get(key) == ref_m["classifications"].get(key)
+            )
+    return lm_errors, rel_errors, agree
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("inputs", nargs="*", default=["images"], help="image files and/or directories")
+    parser.add_argument("-r", "--repeats", type=int, default=3, help="timed runs per image")
+    parser.add_argument("--max-side", type=int, default=1024, help="inference resolution (0 = full)")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.inputs, args.max_side or None)
+    if not corpus:
+        sys.exit("No images found.")
+    print(f"{len(corpus)} images, {args.repeats} timed runs each\n")
+
+    results = {}
+    for tier in TIERS:
+        result = run_tier(tier, corpus, args.repeats)
+        if result is None:
+            print(f"{tier}: model file missing, skipped")
+            continue
+        results[tier] = result
+
+    reference = results.get(REFERENCE_TIER, (None, {}))[1]
+    for tier, (latencies, outputs) in results.items():
+        ordered = sorted(latencies)
+        print(
+            f"{tier:<6} median {statistics.median(ordered):7.1f} ms"
+            f"  p90 {ordered[int(0.9 * (len(ordered) - 1))]:7.1f} ms"
+            f"  detected {len(outputs)}/{len(corpus)}"
+        )
+        if tier == REFERENCE_TIER or not reference:
+            continue
+        lm_errors, rel_errors, agree = compare(outputs, reference)
+        if lm_errors:
+            print(f"       landmark error vs {REFERENCE_TIER}: {statistics.fmean(lm_errors):.2f}% of diagonal")
+        for key, errors in sorted(rel_errors.items()):
+            print(f"       {key:<20} {statistics.fmean(errors):6.2f}% mean relative error")
+        for key, matches in agree.items():
+            if matches:
+                print(f"       {key:<20} {sum(matches)}/{len(matches)} agree")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+# core/batch.py
+# Batch analysis: parallel decode + inference, vectorized measurements over (N, 33, 3).
+import numpy as np
+
+from core.image_io import decode_image, fit_max_side
+from core.pose_analyzer import PoseLandmark, _classify_measurements, detect_pose
+
+NUM_LANDMARKS = 33
+RATIO_KEYS = ("shoulder_hip_ratio", "waist_hip_ratio")
+
+
+def decode_and_detect(pose_pool, data: bytes, max_side: int = None):
+    """
+    Decode one image and run pose detection with a pooled landmarker.
+    With `max_side`, decoding and inference run at that resolution and the
+    landmarks are mapped back to original pixels.
+    Returns (landmarks (33, 3) float64 array or None, (width, height)) and
+    raises ValueError when the bytes are not an image.
+    """
+    image, (width, height) = decode_image(data, max_side)
+    if image is None:
+        raise ValueError("Lỗi file ảnh.")
+    image = fit_max_side(image, max_side)
+    with pose_pool.lease() as pose_model:
+        landmarks_px, _ = detect_pose(pose_model, image, output_size=(width, height))
+    if landmarks_px is None:
+        return None, (width, height)
+    return np.asarray(landmarks_px, dtype=np.float64), (width, height)
+
+
+def calculate_measurements_batch(landmarks, known_heights_cm=None, width_overrides=None):
+    """
+    Vectorized equivalent of _calculate_measurements_from_landmarks.
+
+    landmarks       : (N, 33, 3) array of (x_px, y_px, visibility).
+    known_heights_cm: None, a scalar, or a length-N sequence (None/NaN = unknown).
+    width_overrides : None or a length-N sequence of measure_widths() results,
+                      the equivalent of width_method="silhouette".
+    Returns a list of N measurement dicts with the same keys and values as the
+    per-image function.
+    """
+    lm = np.asarray(landmarks, dtype=np.float64)
+    if lm.ndim != 3 or lm.shape[1:] != (NUM_LANDMARKS, 3):
+        raise ValueError(f"expected (N, 33, 3) landmarks, got {lm.shape}")
+    n = lm.shape[0]
+    if n == 0:
+        return []
+
+    heights = np.full(n, np.nan)
+    if known_heights_cm is not None:
+        if np.isscalar(known_heights_cm):
+            heights[:] = known_heights_cm
+        else:
+            heights[:] = [np.nan if h is None else h for h in known_heights_cm]
+
+    x, y, vis = lm[..., 0], lm[..., 1], lm[..., 2]
+
+    def pt(idx):
+        return x[:, idx], y[:, idx], vis[:, idx]
+
+    ls_x, ls_y, ls_c = pt(PoseLandmark.LEFT_SHOULDER)
+    rs_x, rs_y, rs_c = pt(PoseLandmark.RIGHT_SHOULDER)
+    lh_x, lh_y, lh_c = pt(PoseLandmark.LEFT_HIP)
+    rh_x, rh_y, rh_c = pt(PoseLandmark.RIGHT_HIP)
+    la_x, la_y, la_c = pt(PoseLandmark.LEFT_ANKLE)
+    ra_x, ra_y, ra_c = pt(PoseLandmark.RIGHT_ANKLE)
+    nose_y, nose_c = y[:, PoseLandmark.NOSE], vis[:, PoseLandmark.NOSE]
+
+    shoulder_ok = np.minimum(ls_c, rs_c) >= 0.5
+    hip_ok = np.minimum(lh_c, rh_c) >= 0.5
+    waist_ok = shoulder_ok & hip_ok
+    leg_ok = hip_ok & (np.minimum(la_c, ra_c) >= 0.5)
+
+    # 1-2. Shoulder / hip widths and widened draw points
+    shoulder_w = np.abs(ls_x - rs_x) * 1.3
+    s_cx = (ls_x + rs_x) / 2
+    hip_w = np.abs(lh_x - rh_x) * 1.38
+    h_cx = (lh_x + rh_x) / 2
+
+    # 3. Waist (45% from hip to shoulder)
+    lw_x = lh_x + 0.45 * (ls_x - lh_x)
+    lw_y = lh_y + 0.45 * (ls_y - lh_y)
+    rw_x = rh_x + 0.45 * (rs_x - rh_x)
+    rw_y = rh_y + 0.45 * (rs_y - rh_y)
+    waist_w = np.abs(lw_x - rw_x) * 1.25
+    w_cx = (lw_x + rw_x) / 2
+
+    # 3b. Silhouette widths replace the estimates before ratios are taken
+    overrides = list(width_overrides) if width_overrides is not None else [{}] * n
+    widths = {"shoulder_width": shoulder_w, "hip_width": hip_w, "waist_width": waist_w}
+    for i, measured in enumerate(overrides):
+        for key, (width_px, _) in measured.items():
+            widths[key][i] = width_px
+
+    # 4. Height from visible landmarks, head top estimated from the nose
+    visible = vis > 0.5
+    height_ok = visible.sum(axis=1) > 5
+    min_y = np.where(visible, y, np.inf).min(axis=1)
+    max_y = np.where(visible, y, -np.inf).max(axis=1)
+    min_y = np.where(nose_c > 0.5, nose_y - np.abs(ls_x - rs_x) * 0.4, min_y)
+    height_px = max_y - min_y
+
+    # 5. Leg length
+    mid_hip_y = (lh_y + rh_y) / 2
+    mid_ankle_y = (la_y + ra_y) / 2
+    leg_len = np.abs(mid_ankle_y - mid_hip_y)
+
+    # 6. Ratios
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shr = shoulder_w / hip_w
+        whr = waist_w / hip_w
+        scale = heights / height_px
+
+    results = []
+    for i in range(n):
+        px = {}
+        flags = {}
+        draw = {}
+
+        flags["shoulder_width"] = bool(shoulder_ok[i])
+        if shoulder_ok[i]:
+            px["shoulder_width"] = float(shoulder_w[i])
+            draw["shoulder"] = (
+                (float(s_cx[i] + (ls_x[i] - s_cx[i]) * 1.3), float(ls_y[i])),
+                (float(s_cx[i] + (rs_x[i] - s_cx[i]) * 1.3), float(rs_y[i])),
+            )
+        flags["hip_width"] = bool(hip_ok[i])
+        if hip_ok[i]:
+            px["hip_width"] = float(hip_w[i])
+            draw["hip"] = (
+                (float(h_cx[i] + (lh_x[i] - h_cx[i]) * 1.38), float(lh_y[i])),
+                (float(h_cx[i] + (rh_x[i] - h_cx[i]) * 1.38), float(rh_y[i])),
+            )
+        flags["waist_width"] = bool(waist_ok[i])
+        if waist_ok[i]:
+            px["waist_width"] = float(waist_w[i])
+            draw["waist"] = (
+                (float(w_cx[i] + (lw_x[i] - w_cx[i]) * 1.25), float(lw_y[i])),
+                (float(w_cx[i] + (rw_x[i] - w_cx[i]) * 1.25), float(rw_y[i])),
+            )
+        flags["height"] = bool(height_ok[i])
+        if height_ok[i]:
+            px["height"] = float(height_px[i])
+        flags["leg_length"] = bool(leg_ok[i])
+        if leg_ok[i]:
+            px["leg_length"] = float(leg_len[i])
+            draw["leg"] = (
+                (float(h_cx[i]), float(mid_hip_y[i])),
+                (float((la_x[i] + ra_x[i]) / 2), float(mid_ankle_y[i])),
+            )
+        source = {key: "landmarks" for key in widths if flags[key]}
+        for key, (width_px, points) in overrides[i].items():
+            px[key] = float(width_px)
+            draw[key.split("_")[0]] = points
+            source[key] = "silhouette"
+        if shoulder_ok[i] and hip_ok[i]:
+            px["shoulder_hip_ratio"] = float(shr[i])
+        if waist_ok[i]:
+            px["waist_hip_ratio"] = float(whr[i])
+
+        measurements = {
+            "pixel_measurements": px,
+            "cm_measurements": {},
+            "scale_cm_per_px": None,
+            "confidence_flags": flags,
+            "width_source": source,
+            "draw_points": draw,
+        }
+
+        # 7. cm conversion
+        if heights[i] > 0 and height_ok[i] and np.isfinite(scale[i]):
+            measurements["scale_cm_per_px"] = float(scale[i])
+            measurements["cm_measurements"] = {
+                k: v * float(scale[i]) for k, v in px.items() if k not in RATIO_KEYS
+            }
+
+        # 8. Classification: per person, same rules as the single-image path
+        measurements["classifications"] = _classify_measurements(px, source)
+
+        results.append(measurements)
+    return results
+
+
+def iter_chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def detect_item(pose_pool, key, load, max_side=None):
+    """decode_and_detect() for one source; returns (key, output, error message)."""
+    try:
+        return key, decode_and_detect(pose_pool, load(), max_side), None
+    except Exception as e:
+        return key, None, str(e)
+
+
+def measure_chunk(detected, known_height_cm=None):
+    """Turn detect_item() outputs into result dicts with one vectorized pass."""
+    found = [(i, out[0]) for i, (_, out, _) in enumerate(detected) if out and out[0] is not None]
+    measured = calculate_measurements_batch(
+        np.stack([lm for _, lm in found]) if found else np.empty((0, NUM_LANDMARKS, 3)),
+        known_height_cm,
+    )
+    by_index = {i: m for (i, _), m in zip(found, measured)}
+
+    results = []
+    for i, (key, out, error) in enumerate(detected):
+        if error is not None:
+            results.append({"key": key, "success": False, "message": error})
+        elif i not in by_index:
+            results.append({"key": key, "success": False, "message": "Không tìm thấy cơ thể"})
+        else:
+            results.append({
+                "key": key,
+                "success": True,
+                "image_size": list(out[1]),
+                "measurements": by_index[i],
+            })
+    return results
+
+
+def analyze_batch(sources, pose_pool, executor, known_height_cm=None, chunk_size=32,
+                  max_side=None):
+    """
+    Analyze many images. `sources` yields (key, load_bytes) pairs; decoding and
+    inference run on `executor`, measurements are computed per chunk in one
+    vectorized pass. `max_side` caps the inference resolution (see
+    decode_and_detect). Yields one result dict per source, in input order.
+    """
+    for chunk in iter_chunks(sources, chunk_size):
+        detected = list(executor.map(lambda src: detect_item(pose_pool, *src, max_side), chunk))
+        yield from measure_chunk(detected, known_height_cm)
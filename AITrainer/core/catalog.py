@@ -0,0 +1,385 @@
+# core/catalog.py
+# Exercise catalogue loaded from the backend database, indexed, hot-reloadable.
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from core.exercises import EXERCISE_DB, EXERCISE_TAGS
+
+# Backend muscle_groups slugs -> the recommender's muscle groups. The backend
+# tracks sub-groups (mid-chest, lats, ...); the recommender weighs the parent.
+MUSCLE_GROUP_SLUGS = {
+    "chest": "chest", "upper-chest": "chest", "mid-chest": "chest", "lower-chest": "chest",
+    "back": "back", "lats": "back", "lower-back": "back",
+    "traps": "traps",
+    "shoulders": "shoulders", "anterior-delts": "shoulders",
+    "lateral-delts": "shoulders", "posterior-delts": "shoulders",
+    "biceps": "biceps", "triceps": "triceps", "forearms": "forearms",
+    "core": "core", "abs": "core", "obliques": "core",
+    "quads": "quads", "hamstrings": "hamstrings", "glutes": "glutes", "calves": "calves",
+}
+
+
+class CatalogSnapshot:
+    """
+    One immutable version of the catalogue.
+
+    rows are (exercise_id, name_vi, name_en) in catalogue order, tags map
+    exercise_id -> (muscle group, equipment) and `equipment` is every
+    equipment slug the tags use. Lookups by ID, by either name
+    (case-insensitive) and by muscle group are dict hits. memo() caches data
+    derived from this version (prompt index, shortlists); a reload produces
+    a new snapshot, so nothing derived from the old one leaks through.
+    """
+
+    def __init__(self, rows, tags, version=None, source="builtin"):
+        self.rows = tuple(rows)
+        self.tags = {eid: tags.get(eid, (None, None)) for eid, _, _ in self.rows}
+        self.equipment = frozenset(needs for _, needs in self.tags.values() if needs)
+        self.version = version
+        self.source = source
+        self.loaded_at = time.time()
+        self.by_id = {row[0]: row for row in self.rows}
+        self.by_name = {}
+        self.by_group = {}
+        for eid, name_vi, name_en in self.rows:
+            for name in (name_vi, name_en):
+                if name:
+                    self.by_name.setdefault(name.casefold(), eid)
+            group = self.tags[eid][0]
+            self.by_group.setdefault(group, []).append(eid)
+        self.by_group = {g: tuple(ids) for g, ids in self.by_group.items()}
+        self._memo = {}
+        self._memo_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, eid):
+        return eid in self.by_id
+
+    def get(self, eid):
+        return self.by_id.get(eid)
+
+    def find(self, name):
+        """Exercise ID for a Vietnamese or English name, or None."""
+        return self.by_name.get((name or "").casefold())
+
+    def ids_for_group(self, group):
+        return self.by_group.get(group, ())
+
+    def memo(self, key, factory):
+        with self._memo_lock:
+            if key in self._memo:
+                return self._memo[key]
+        value = factory()
+        with self._memo_lock:
+            return self._memo.setdefault(key, value)
+
+
+def _merge_tags(rows, primary_slugs, equipment):
+    """
+    Curated EXERCISE_TAGS win; other exercises get their group from the first
+    primary muscle in the database and the first listed equipment.
+    """
+    tags = {}
+    for eid, _, _ in rows:
+        if eid in EXERCISE_TAGS:
+            tags[eid] = EXERCISE_TAGS[eid]
+            continue
+        group = next(
+            (MUSCLE_GROUP_SLUGS[s] for s in primary_slugs.get(eid, ()) if s in MUSCLE_GROUP_SLUGS),
+            None,
+        )
+        items = [e.strip() for e in (equipment.get(eid) or "").split(",") if e.strip()]
+        tags[eid] = (group, items[0] if items else None)
+    return tags
+
+
+# ─── Sources ─────────────────────────────────────────────────────────────────
+# A source has version() (cheap change marker) and load() -> (rows, tags).
+
+
+class BuiltinSource:
+    """The list shipped in core/exercises.py."""
+
+    name = "builtin"
+
+    def version(self):
+        return "builtin"
+
+    def load(self):
+        return list(EXERCISE_DB), dict(EXERCISE_TAGS)
+
+
+_COPY_HEADER = re.compile(r"^COPY (?:public\.)?(\w+) \(([^)]*)\) FROM stdin;$")
+_COPY_ESCAPES = {"t": "\t", "n": "\n", "r": "\r", "\\": "\\"}
+_TABLES = ("exercises", "exercise_muscle_group", "muscle_groups")
+
+
+def _unescape_copy(field):
+    if field == "\\N":
+        return None
+    if "\\" not in field:
+        return field
+    return re.sub(r"\\(.)", lambda m: _COPY_ESCAPES.get(m.group(1), m.group(1)), field)
+
+
+def read_sql_dump(path, tables=_TABLES):
+    """{table: [row dict]} from the COPY blocks of a pg_dump plain-text file."""
+    data, current, columns = {}, None, None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if current is None:
+                m = _COPY_HEADER.match(line)
+                if m and m.group(1) in tables:
+                    current, columns = m.group(1), [c.strip() for c in m.group(2).split(",")]
+                    data[current] = []
+                continue
+            if line == "\\.":
+                current = None
+                continue
+            data[current].append(dict(zip(columns, map(_unescape_copy, line.split("\t")))))
+    return data
+
+
+def _is_true(value):
+    return value in (True, 1, "t", "true", "1")
+
+
+def _catalog_from_tables(exercises, links, groups):
+    slugs = {int(g["muscle_group_id"]): g["slug"] for g in groups}
+    primary = {}
+    for link in sorted(links, key=lambda r: int(r.get("id") or 0)):
+        if link["impact_level"] == "primary":
+            slug = slugs.get(int(link["muscle_group_id"]))
+            primary.setdefault(int(link["exercise_id"]), []).append(slug)
+    rows, equipment = [], {}
+    for ex in sorted(exercises, key=lambda r: int(r["exercise_id"])):
+        if not _is_true(ex.get("is_public", True)):
+            continue
+        eid = int(ex["exercise_id"])
+        rows.append((eid, ex["name"], ex["name_en"] or ex["name"]))
+        equipment[eid] = ex.get("equipment_needed")
+    return rows, _merge_tags(rows, primary, equipment)
+
+
+class SqlDumpSource:
+    """A pg_dump plain-text file such as the repository's dump.sql."""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = f"dump:{path}"
+
+    def version(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def load(self):
+        data = read_sql_dump(self.path)
+        return _catalog_from_tables(
+            data.get("exercises", []),
+            data.get("exercise_muscle_group", []),
+            data.get("muscle_groups", []),
+        )
+
+
+class DatabaseSource:
+    """
+    Live tables over a DB-API connection: the backend's PostgreSQL, or a
+    SQLite file with the same three tables as a stand-in. `connect` returns
+    a new connection; one is opened per version()/load() call.
+    """
+
+    EXERCISES = (
+        "SELECT exercise_id, name, name_en, equipment_needed, is_public FROM exercises"
+    )
+    LINKS = "SELECT id, exercise_id, muscle_group_id, impact_level FROM exercise_muscle_group"
+    GROUPS = "SELECT muscle_group_id, slug FROM muscle_groups"
+    VERSION = (
+        "SELECT (SELECT count(*) FROM exercises), (SELECT max(updated_at) FROM exercises),"
+        " (SELECT count(*) FROM exercise_muscle_group)"
+    )
+
+    def __init__(self, connect, name):
+        self.connect = connect
+        self.name = name
+
+    def _query(self, *statements):
+        conn = self.connect()
+        try:
+            results = []
+            for sql in statements:
+                cur = conn.cursor()
+                cur.execute(sql)
+                columns = [d[0] for d in cur.description]
+                results.append([dict(zip(columns, row)) for row in cur.fetchall()])
+            return results
+        finally:
+            conn.close()
+
+    def version(self):
+        (row,) = self._query(self.VERSION)[0]
+        return tuple(str(v) for v in row.values())
+
+    def load(self):
+        return _catalog_from_tables(*self._query(self.EXERCISES, self.LINKS, self.GROUPS))
+
+
+def source_from_spec(spec):
+    """
+    EXERCISE_CATALOG value -> source:
+      builtin (or empty)          the list in core/exercises.py
+      path/to/dump.sql            pg_dump plain-text file
+      sqlite:///path/catalog.db   SQLite stand-in with the backend tables
+      postgresql://user@host/db   backend database (needs psycopg)
+    """
+    spec = (spec or "builtin").strip()
+    if spec == "builtin":
+        return BuiltinSource()
+    if spec.startswith("sqlite:///"):
+        path = spec[len("sqlite:///"):]
+        return DatabaseSource(lambda: sqlite3.connect(path), f"sqlite:{path}")
+    if spec.startswith(("postgres://", "postgresql://")):
+        # Checked here, at startup, rather than on the first reload.
+        try:
+            import psycopg
+        except ImportError as exc:
+            raise ValueError(
+                "EXERCISE_CATALOG is a postgresql:// URL but psycopg is not "
+                "installed (pip install 'psycopg[binary]')"
+            ) from exc
+        return DatabaseSource(lambda: psycopg.connect(spec), "postgresql")
+    if spec.endswith(".sql"):
+        return SqlDumpSource(spec)
+    raise ValueError(f"unsupported exercise catalog {spec!r}")
+
+
+def write_sqlite(dump_path, sqlite_path):
+    """Copy the catalogue tables of a SQL dump into a SQLite file (test stand-in)."""
+    data = read_sql_dump(dump_path)
+    conn = sqlite3.connect(sqlite_path)
+    try:
+        conn.executescript(
+            """
+            DROP TABLE IF EXISTS exercises;
+            DROP TABLE IF EXISTS exercise_muscle_group;
+            DROP TABLE IF EXISTS muscle_groups;
+            CREATE TABLE exercises (exercise_id INTEGER PRIMARY KEY, name TEXT, name_en TEXT,
+                                    equipment_needed TEXT, is_public INTEGER, updated_at TEXT);
+            CREATE TABLE exercise_muscle_group (id INTEGER PRIMARY KEY, exercise_id INTEGER,
+                                                muscle_group_id INTEGER, impact_level TEXT);
+            CREATE TABLE muscle_groups (muscle_group_id INTEGER PRIMARY KEY, slug TEXT);
+            """
+        )
+        conn.executemany(
+            "INSERT INTO exercises VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (int(r["exercise_id"]), r["name"], r["name_en"], r["equipment_needed"],
+                 int(_is_true(r["is_public"])), r["updated_at"])
+                for r in data.get("exercises", [])
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO exercise_muscle_group VALUES (?, ?, ?, ?)",
+            [
+                (int(r["id"]), int(r["exercise_id"]), int(r["muscle_group_id"]), r["impact_level"])
+                for r in data.get("exercise_muscle_group", [])
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO muscle_groups VALUES (?, ?)",
+            [(int(r["muscle_group_id"]), r["slug"]) for r in data.get("muscle_groups", [])],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# ─── Catalogue ───────────────────────────────────────────────────────────────
+
+BUILTIN = CatalogSnapshot(EXERCISE_DB, EXERCISE_TAGS, version="builtin")
+
+
+class ExerciseCatalog:
+    """
+    Holds the current CatalogSnapshot of a source. refresh() reloads when
+    the source's version marker changed and swaps the snapshot in one
+    assignment, so readers never see a half-built index. watch() polls
+    every `reload_interval_sec`. A failed or empty load keeps the previous
+    snapshot (the built-in list until the first successful load).
+    """
+
+    def __init__(self, source, reload_interval_sec: float = 30.0):
+        self.source = source
+        self.reload_interval_sec = reload_interval_sec
+        self.snapshot = BUILTIN
+        self.reloads = 0
+        self.errors = 0
+        self.last_error = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload if the source changed; returns True when a new snapshot was installed."""
+        with self._lock:
+            try:
+                version = self.source.version()
+                if not force and version == self._version:
+                    return False
+                rows, tags = self.source.load()
+                if not rows:
+                    raise ValueError("catalog source returned no exercises")
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                print(f"[Catalog] loading {self.source.name} failed: {e}")
+                return False
+            self.snapshot = CatalogSnapshot(rows, tags, version=version, source=self.source.name)
+            self._version = version
+            self.reloads += 1
+            self.last_error = None
+            return True
+
+    async def watch(self, executor=None):
+        """
+        Poll the source on `executor` until cancelled. Returns at once when
+        reload_interval_sec <= 0 or the source is the built-in list.
+        """
+        if self.reload_interval_sec <= 0 or isinstance(self.source, BuiltinSource):
+            return
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval_sec)
+            if await loop.run_in_executor(executor, self.refresh):
+                print(f"[Catalog] reloaded {len(self.snapshot)} exercises from {self.source.name}")
+
+    def stats(self) -> dict:
+        snapshot = self.snapshot
+        return {
+            "source": self.source.name,
+            "exercises": len(snapshot),
+            "muscle_groups": len(snapshot.by_group),
+            "version": str(snapshot.version),
+            "loaded_at": snapshot.loaded_at,
+            "reloads": self.reloads,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the SQLite catalogue stand-in from a SQL dump.")
+    parser.add_argument("dump", help="pg_dump plain-text file, e.g. ../dump.sql")
+    parser.add_argument("sqlite", help="SQLite file to (re)create")
+    args = parser.parse_args()
+    write_sqlite(args.dump, args.sqlite)
+    catalog = ExerciseCatalog(source_from_spec(f"sqlite:///{args.sqlite}"))
+    catalog.refresh()
+    print(catalog.stats())
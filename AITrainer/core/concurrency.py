@@ -0,0 +1,90 @@
+# core/concurrency.py
+# Execution model for the API: bounded admission + worker pool offloading.
+import asyncio
+import contextvars
+import functools
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    """Raised when a request arrives while every slot and queue position is taken."""
+
+
+class AdmissionController:
+    """
+    Bounds how many analyses run at once and how many may wait.
+
+    At most `max_active` requests hold a slot; up to `max_queued` more wait for
+    one. Anything beyond that is rejected immediately with QueueFullError so
+    the caller can answer 503 instead of piling work onto the event loop.
+    """
+
+    def __init__(self, max_active: int, max_queued: int):
+        if max_active < 1:
+            raise ValueError("max_active must be >= 1")
+        self.max_active = max_active
+        self.max_queued = max(0, max_queued)
+        self._slots = asyncio.Semaphore(max_active)
+        self._in_flight = 0
+        self._active = 0
+        self.rejected = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return self._in_flight - self._active
+
+    @asynccontextmanager
+    async def admit(self):
+        if self._in_flight >= self.max_active + self.max_queued:
+            self.rejected += 1
+            raise QueueFullError(
+                f"{self._in_flight} requests in flight "
+                f"(limit {self.max_active} active + {self.max_queued} queued)"
+            )
+        self._in_flight += 1
+        try:
+            async with self._slots:
+                self._active += 1
+                try:
+                    yield
+                finally:
+                    self._active -= 1
+        finally:
+            self._in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "max_active": self.max_active,
+            "max_queued": self.max_queued,
+            "active": self.active,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
+
+
+def create_worker_pool(max_workers: int, name: str) -> ThreadPoolExecutor:
+    """
+    Thread pool for CPU-bound work. OpenCV and the MediaPipe runtime release
+    the GIL inside native code, so threads give real parallelism here without
+    the pickling cost of shipping full-size images to another process.
+    """
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+
+async def run_blocking(executor, fn, *args, **kwargs):
+    """
+    Run `fn(*args, **kwargs)` on `executor` without blocking the event loop.
+    The caller's context variables (per-request timings) carry over.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(ctx.run, fn, *args, **kwargs))
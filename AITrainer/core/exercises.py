@@ -0,0 +1,167 @@
+# core/exercises.py
+# Exercise catalogue shared by the LLM prompt and the local recommender.
+
+# ─── Exercise Database ────────────────────────────────────────────────────────
+# (exercise_id, name_vi, name_en), derived from the exercises table. This is
+# the built-in fallback; set EXERCISE_CATALOG to load the live catalogue
+# through core/catalog.py instead.
+EXERCISE_DB = [
+    (1,   "Đẩy Ngực Ngang Thanh Đòn",                   "Barbell Bench Press"),
+    (2,   "Đẩy Ngực Ngang Tạ Tay",                       "Dumbbell Bench Press"),
+    (3,   "Hít Đất",                                      "Push Up"),
+    (16,  "Squat Với Tạ Đòn",                             "Barbell Squat"),
+    (21,  "Romanian Deadlift Với Tạ Đòn",                 "Barbell Romanian Deadlift"),
+    (39,  "Hip Thrust Với Tạ Đòn",                        "Barbell Hip Thrust"),
+    (40,  "Hít Xà Đơn",                                   "Pull Ups"),
+    (41,  "Kéo Xô Máy",                                   "Machine Pulldown"),
+    (42,  "Đẩy Tạ Đòn Qua Đầu",                          "Barbell Overhead Press"),
+    (43,  "Dang Tạ Tay Sang Bên",                         "Dumbbell Lateral Raise"),
+    (64,  "Cuốn Tạ Đòn",                                  "Barbell Curl"),
+    (65,  "Cuốn Tạ Đơn",                                  "Dumbbell Curl"),
+    (66,  "Đẩy Tạ Đơn Sau Đầu",                          "Dumbbell Seated Overhead Tricep Extension"),
+    (67,  "Đẩy Cáp Tay Sau V-Bar",                       "Machine Cable V Bar Push Downs"),
+    (68,  "Gập Bụng",                                     "Crunches"),
+    (69,  "Plank Với Bóng",                               "Medicine Ball Plank"),
+    (70,  "Cuốn Cổ Tay Tạ Đơn",                          "Dumbbell Wrist Curl"),
+    (71,  "Cuốn Cổ Tay Tạ Đòn",                          "Barbell Wrist Curl"),
+    (72,  "Nhón Bắp Chân Ngồi",                           "Seated Calf Raise"),
+    (73,  "Nhón Bắp Chân Với Máy Smith",                  "Smith Machine Calf Raise"),
+    (94,  "Đẩy Ngực Dốc Lên Thanh Đòn",                  "Incline Barbell Bench Press"),
+    (95,  "Chèo Tạ Đòn Cúi Người",                       "Barbell Bent Over Row"),
+    (96,  "Deadlift Với Tạ Đòn",                          "Barbell Deadlift"),
+    (97,  "Ép Ngực Với Cáp",                              "Cable Pec Fly"),
+    (98,  "Nâng Tạ Đơn Trước Mặt",                       "Dumbbell Front Raise"),
+    (99,  "Đạp Đùi Với Máy",                              "Machine Leg Press"),
+    (100, "Đá Đùi Với Máy",                               "Machine Leg Extension"),
+    (101, "Vặn Người Kiểu Nga",                           "Bodyweight Russian Twist"),
+    (102, "Kéo Cáp Cho Vai Sau",                          "Machine Face Pulls"),
+    (132, "Nhún Cầu Vai Thanh Đòn",                       "Barbell Shrugs"),
+    (133, "Cuốn Chân Nằm Với Máy",                        "Machine Lying Leg Curl"),
+    (134, "Đẩy Ngực Dốc Xuống Thanh Đòn",                "Barbell Decline Bench Press"),
+    (135, "Lunge Bước Đi",                                "Bodyweight Walking Lunges"),
+    (136, "Treo Người Nhấc Chân",                         "Bodyweight Hanging Leg Raise"),
+    (171, "Đẩy Tạ Đơn Qua Đầu Khi Ngồi",                "Dumbbell Seated Overhead Press"),
+    (172, "Dang Một Tay Với Cáp Thấp",                   "Cable Low Single Arm Lateral Raise"),
+    (173, "Hít Đất Pike Chân Trên Cao",                   "Elevated Pike Press"),
+    (174, "Ép Tạ Đơn Vai Sau Khi Ngồi",                  "Dumbbell Seated Rear Delt Fly"),
+    (175, "Kéo Cáp Một Tay Tập Xô (Lat Prayer)",         "Cable Single Arm Lat Prayer"),
+    (176, "Kéo Cáp Qua Chân (Pull Through)",              "Cable Pull Through"),
+    (177, "Hít Xà Ngược (Inverted Row)",                  "Inverted Row"),
+    (178, "Đẩy Ngực Dốc Lên Với Tạ Tay",                "Dumbbell Incline Bench Press"),
+    (179, "Ép Ngực Với Máy (Pec Deck)",                  "Machine Pec Fly"),
+    (180, "Nằm Dang Tạ Tay Tập Ngực",                    "Dumbbell Fly"),
+    (181, "Xà Kép Tập Ngực (Chest Dips)",                "Chest Dips"),
+    (182, "Cuốn Tạ Tay Kiểu Búa (Hammer Curl)",          "Dumbbell Hammer Curl"),
+    (183, "Chống Đẩy Sau Với Ghế (Bench Dips)",          "Bench Dips"),
+    (184, "Đá Tạ Tay Sau (Dumbbell Kickback)",           "Dumbbell Kickback"),
+    (185, "Cuốn Tạ Tập Trung (Concentration Curl)",      "Concentration Curl"),
+    (186, "Nằm Nhấc Chân (Leg Raises)",                  "Laying Leg Raises"),
+    (187, "Plank Cẳng Tay (Forearm Plank)",              "Forearm Plank"),
+    (188, "Nhón Bắp Chân Đứng Với Máy",                  "Machine Standing Calf Raises"),
+    (189, "Nhún Cầu Vai Với Tạ Tay",                     "Dumbbell Shrug"),
+    (190, "Kéo Tạ Đòn Thẳng Đứng (Upright Row)",        "Barbell Upright Row"),
+    (191, "Cuốn Cổ Tay Tạ Đòn Sau Lưng",                "Barbell Behind The Back Wrist Curl"),
+    (192, "Nằm Đẩy Tạ Đòn Sau Đầu (Skull Crusher)",     "Barbell Skull Crusher"),
+    (193, "Treo Người Co Gối (Hanging Knee Raises)",     "Hanging Knee Raises"),
+    (194, "Leo Núi Tại Chỗ (Mountain Climber)",          "Mountain Climber"),
+    (195, "Giữ Thân Hình Chuối (Hollow Hold)",           "Hollow Hold"),
+    (196, "Nhón Bắp Chân Với Tạ Ấm",                    "Kettlebell Calf Raise"),
+    (197, "Cuốn Tay Trước Với Cáp",                      "Cable Bicep Curl"),
+    (198, "Chống Xà Kép Tập Tay Sau",                    "Tricep Dips"),
+    (199, "Vung Tạ Ấm (Kettlebell Swing)",               "Kettlebell Swing"),
+    (200, "Squat Với Tạ Tay (Goblet Squat)",             "Dumbbell Goblet Squat"),
+    (201, "Kéo Cáp Ngồi (Seated Cable Row)",             "Seated Cable Row"),
+    (202, "Nằm Vớt Tạ (Dumbbell Pullover)",              "Dumbbell Pullover"),
+    (269, "Burpees (Nhảy Hít Đất)",                      "Burpees"),
+    (270, "Siêu Nhân (Superman)",                        "Superman"),
+    (271, "Cầu Mông (Glute Bridge)",                     "Bodyweight Glute Bridge"),
+    (272, "Đá Chân Sang Bên (Fire Hydrant)",             "Fire Hydrant"),
+    (413, "Gập Bụng Đạp Xe (Bicycle Crunches)",         "Bicycle Crunches"),
+    (414, "Kéo Cáp Chặt Gỗ (Cable Woodchop)",           "Cable Woodchop"),
+    (415, "Dang Tạ Tay Ngược (Reverse Fly)",             "Dumbbell Reverse Fly"),
+    (416, "Hít Đất Chân Cao (Decline Push-up)",          "Decline Push-ups"),
+    (417, "Ép Cáp Từ Cao Đến Thấp",                     "High-to-Low Cable Fly"),
+]
+
+# ─── Exercise tags ────────────────────────────────────────────────────────────
+# exercise_id -> (primary muscle group slug, equipment). Slugs follow the
+# muscle_groups table; "full-body" marks conditioning moves.
+EXERCISE_TAGS = {
+    1:   ("chest",      "barbell"),
+    2:   ("chest",      "dumbbell"),
+    3:   ("chest",      "body-weight"),
+    16:  ("quads",      "barbell"),
+    21:  ("hamstrings", "barbell"),
+    39:  ("glutes",     "barbell"),
+    40:  ("back",       "body-weight"),
+    41:  ("back",       "machine"),
+    42:  ("shoulders",  "barbell"),
+    43:  ("shoulders",  "dumbbell"),
+    64:  ("biceps",     "barbell"),
+    65:  ("biceps",     "dumbbell"),
+    66:  ("triceps",    "dumbbell"),
+    67:  ("triceps",    "cable"),
+    68:  ("core",       "body-weight"),
+    69:  ("core",       "medicine-ball"),
+    70:  ("forearms",   "dumbbell"),
+    71:  ("forearms",   "barbell"),
+    72:  ("calves",     "machine"),
+    73:  ("calves",     "smith-machine"),
+    94:  ("chest",      "barbell"),
+    95:  ("back",       "barbell"),
+    96:  ("back",       "barbell"),
+    97:  ("chest",      "cable"),
+    98:  ("shoulders",  "dumbbell"),
+    99:  ("quads",      "machine"),
+    100: ("quads",      "machine"),
+    101: ("core",       "body-weight"),
+    102: ("shoulders",  "cable"),
+    132: ("traps",      "barbell"),
+    133: ("hamstrings", "machine"),
+    134: ("chest",      "barbell"),
+    135: ("quads",      "body-weight"),
+    136: ("core",       "body-weight"),
+    171: ("shoulders",  "dumbbell"),
+    172: ("shoulders",  "cable"),
+    173: ("shoulders",  "body-weight"),
+    174: ("shoulders",  "dumbbell"),
+    175: ("back",       "cable"),
+    176: ("glutes",     "cable"),
+    177: ("back",       "body-weight"),
+    178: ("chest",      "dumbbell"),
+    179: ("chest",      "machine"),
+    180: ("chest",      "dumbbell"),
+    181: ("chest",      "body-weight"),
+    182: ("biceps",     "dumbbell"),
+    183: ("triceps",    "body-weight"),
+    184: ("triceps",    "dumbbell"),
+    185: ("biceps",     "dumbbell"),
+    186: ("core",       "body-weight"),
+    187: ("core",       "body-weight"),
+    188: ("calves",     "machine"),
+    189: ("traps",      "dumbbell"),
+    190: ("shoulders",  "barbell"),
+    191: ("forearms",   "barbell"),
+    192: ("triceps",    "barbell"),
+    193: ("core",       "body-weight"),
+    194: ("full-body",  "body-weight"),
+    195: ("core",       "body-weight"),
+    196: ("calves",     "kettlebell"),
+    197: ("biceps",     "cable"),
+    198: ("triceps",    "body-weight"),
+    199: ("full-body",  "kettlebell"),
+    200: ("quads",      "dumbbell"),
+    201: ("back",       "cable"),
+    202: ("back",       "dumbbell"),
+    269: ("full-body",  "body-weight"),
+    270: ("back",       "body-weight"),
+    271: ("glutes",     "body-weight"),
+    272: ("glutes",     "body-weight"),
+    413: ("core",       "body-weight"),
+    414: ("core",       "cable"),
+    415: ("shoulders",  "dumbbell"),
+    416: ("chest",      "body-weight"),
+    417: ("chest",      "cable"),
+}
+
+ID_TO_ROW = {row[0]: row for row in EXERCISE_DB}
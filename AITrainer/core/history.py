@@ -0,0 +1,210 @@
+# core/history.py
+# Append-only per-user measurement history in SQLite, with trend queries.
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Measurements kept as columns, so range and trend queries never parse JSON.
+LENGTH_KEYS = ("shoulder_width", "hip_width", "waist_width", "height", "leg_length")
+RATIO_KEYS = ("shoulder_hip_ratio", "waist_hip_ratio")
+
+# Trend metric -> column. Pixel lengths depend on camera distance and are not
+# comparable between photos, so lengths trend in cm only; ratios are scale-free.
+TREND_METRICS = {
+    **{key: key for key in RATIO_KEYS},
+    **{f"{key}_cm": f"{key}_cm" for key in LENGTH_KEYS},
+}
+DEFAULT_TREND_METRICS = ("shoulder_hip_ratio", "waist_hip_ratio", "waist_width_cm", "hip_width_cm")
+
+# strftime() formats of the trend buckets (UTC).
+BUCKETS = {"day": "%Y-%m-%d", "week": "%Y-W%W", "month": "%Y-%m"}
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS measurements (
+    id          INTEGER PRIMARY KEY,
+    user_id     TEXT NOT NULL,
+    ts          REAL NOT NULL,
+    image_key   TEXT,
+    model_tier  TEXT,
+    scale_cm_per_px REAL,
+    {", ".join(f"{key}_px REAL" for key in LENGTH_KEYS)},
+    {", ".join(f"{key}_cm REAL" for key in LENGTH_KEYS)},
+    {", ".join(f"{key} REAL" for key in RATIO_KEYS)},
+    shape_type  TEXT,
+    somatotype  TEXT,
+    extra       TEXT
+);
+CREATE INDEX IF NOT EXISTS measurements_user_ts ON measurements (user_id, ts);
+CREATE UNIQUE INDEX IF NOT EXISTS measurements_user_image
+    ON measurements (user_id, image_key) WHERE image_key IS NOT NULL;
+"""
+
+_COLUMNS = (
+    "user_id", "ts", "image_key", "model_tier", "scale_cm_per_px",
+    *(f"{key}_px" for key in LENGTH_KEYS),
+    *(f"{key}_cm" for key in LENGTH_KEYS),
+    *RATIO_KEYS,
+    "shape_type", "somatotype", "extra",
+)
+
+
+def _float(value):
+    return None if value is None else float(value)
+
+
+class MeasurementHistory:
+    """
+    One row per analysis: timestamp, pixel and cm measurements, ratios and
+    classifications as columns, the rest of the classification dict in
+    `extra` (JSON). Rows are only ever inserted; the (user_id, image_key)
+    unique index makes re-submitting the same photo a no-op, so retries and
+    double submits do not add fake data points.
+
+    The connection opens on first use. Calls are blocking; the API runs them
+    on its io executor.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self.appended = 0
+        self.duplicates = 0
+
+    def _connection(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def append(self, user_id: str, measurements: dict, image_key: str = None,
+               ts: float = None):
+        """Record one analysis; returns the row id, or None for a photo already recorded."""
+        px = measurements.get("pixel_measurements") or {}
+        cm = measurements.get("cm_measurements") or {}
+        classes = dict(measurements.get("classifications") or {})
+        row = (
+            str(user_id), time.time() if ts is None else float(ts), image_key,
+            measurements.get("model_tier"), _float(measurements.get("scale_cm_per_px")),
+            *(_float(px.get(key)) for key in LENGTH_KEYS),
+            *(_float(cm.get(key)) for key in LENGTH_KEYS),
+            *(_float(px.get(key)) for key in RATIO_KEYS),
+            classes.pop("shape_type", None), classes.pop("somatotype", None),
+            json.dumps(classes, ensure_ascii=False) if classes else None,
+        )
+        sql = (
+            f"INSERT OR IGNORE INTO measurements ({', '.join(_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(_COLUMNS))})"
+        )
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute(sql, row)
+            if not cursor.rowcount:
+                self.duplicates += 1
+                return None
+            self.appended += 1
+            return cursor.lastrowid
+
+    def entries(self, user_id: str, since: float = None, until: float = None,
+                limit: int = 100) -> list:
+        """Rows of `user_id` with since <= ts < until, oldest first, as measurement dicts."""
+        where, params = self._range(user_id, since, until)
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT * FROM (SELECT * FROM measurements WHERE {where} "
+                f"ORDER BY ts DESC LIMIT ?) ORDER BY ts",
+                (*params, int(limit)),
+            ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def trends(self, user_id: str, metrics=DEFAULT_TREND_METRICS, since: float = None,
+               until: float = None, bucket: str = None) -> dict:
+        """
+        {metric: [{"t": ..., "value": ..., "n": ...}, ...]} in time order.
+        Without `bucket` every analysis is a point (t = unix seconds); with
+        day | week | month, points are averaged per bucket (t = bucket label).
+        Analyses that lack a metric (no known height, low confidence) are
+        skipped for that metric.
+        """
+        unknown = [m for m in metrics if m not in TREND_METRICS]
+        if unknown:
+            raise ValueError(f"unknown metrics: {', '.join(unknown)}")
+        if bucket is not None and bucket not in BUCKETS:
+            raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+        where, params = self._range(user_id, since, until)
+
+        series = {}
+        with self._lock:
+            conn = self._connection()
+            for metric in metrics:
+                column = TREND_METRICS[metric]
+                if bucket is None:
+                    sql = (
+                        f"SELECT ts AS t, {column} AS value, 1 AS n FROM measurements "
+                        f"WHERE {where} AND {column} IS NOT NULL ORDER BY ts"
+                    )
+                    bucket_params = ()
+                else:
+                    sql = (
+                        f"SELECT strftime(?, ts, 'unixepoch') AS t, AVG({column}) AS value, "
+                        f"COUNT(*) AS n, MIN(ts) AS first_ts FROM measurements "
+                        f"WHERE {where} AND {column} IS NOT NULL GROUP BY t ORDER BY first_ts"
+                    )
+                    bucket_params = (BUCKETS[bucket],)
+                rows = conn.execute(sql, (*bucket_params, *params)).fetchall()
+                series[metric] = [
+                    {"t": row["t"], "value": round(row["value"], 4), "n": row["n"]}
+                    for row in rows
+                ]
+        return series
+
+    @staticmethod
+    def _range(user_id, since, until):
+        where, params = ["user_id = ?"], [str(user_id)]
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(float(since))
+        if until is not None:
+            where.append("ts < ?")
+            params.append(float(until))
+        return " AND ".join(where), params
+
+    @staticmethod
+    def _entry(row) -> dict:
+        classifications = json.loads(row["extra"]) if row["extra"] else {}
+        for key in ("shape_type", "somatotype"):
+            if row[key] is not None:
+                classifications[key] = row[key]
+        return {
+            "id": row["id"],
+            "ts": row["ts"],
+            "model_tier": row["model_tier"],
+            "scale_cm_per_px": row["scale_cm_per_px"],
+            "pixel_measurements": {
+                **{k: row[f"{k}_px"] for k in LENGTH_KEYS if row[f"{k}_px"] is not None},
+                **{k: row[k] for k in RATIO_KEYS if row[k] is not None},
+            },
+            "cm_measurements": {
+                k: row[f"{k}_cm"] for k in LENGTH_KEYS if row[f"{k}_cm"] is not None
+            },
+            "classifications": classifications,
+        }
+
+    def stats(self) -> dict:
+        return {"path": self.path, "appended": self.appended, "duplicates": self.duplicates}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,66 @@
+# core/image_io.py
+# Decoding uploads at the resolution the pipeline actually needs.
+import cv2
+import numpy as np
+
+from core.ingest import UploadRejected, image_size
+from core.metrics import timed
+
+# IMREAD_REDUCED_* flags, largest reduction first. For JPEG the reduction
+# happens inside the DCT decoder, so the full-size bitmap is never allocated.
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+def _probe_size(contents):
+    """(width, height) from the image header only, or None if unreadable."""
+    try:
+        return image_size(contents)
+    except UploadRejected:
+        return None
+
+
+def decode_image(contents, max_side: int = None):
+    """
+    Decode an upload so that its longer side is at least `max_side` but no
+    more than needed. Returns (image, original_size) where original_size is
+    the (width, height) of the full-resolution, EXIF-oriented image, or
+    (None, None) when the bytes are not an image. `contents` may be bytes or
+    the bytearray from read_upload(); either is decoded in place.
+    """
+    np_arr = np.frombuffer(contents, np.uint8)
+    size = _probe_size(contents) if max_side else None
+
+    flag, factor = cv2.IMREAD_COLOR, 1
+    if size is not None:
+        for f, reduced_flag in _REDUCED_FLAGS:
+            if -(-max(size) // f) >= max_side:
+                flag, factor = reduced_flag, f
+                break
+
+    with timed("decode"):
+        image = cv2.imdecode(np_arr, flag)
+    if image is None:
+        return None, None
+    height, width = image.shape[:2]
+    if factor == 1:
+        return image, (width, height)
+
+    orig_w, orig_h = size
+    # imdecode applies EXIF orientation, the header size does not.
+    if (width > height) != (orig_w > orig_h) and orig_w != orig_h:
+        orig_w, orig_h = orig_h, orig_w
+    return image, (orig_w, orig_h)
+
+
+def fit_max_side(image, max_side: int = None):
+    """Downscale (never upscale) so the longer side is at most `max_side`."""
+    height, width = image.shape[:2]
+    if not max_side or max(width, height) <= max_side:
+        return image
+    scale = max_side / max(width, height)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
@@ -0,0 +1,211 @@
+# core/image_store.py
+# Content-addressed storage of annotated images, encoded off the response path.
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+
+from core.metrics import timed
+
+# Extension and cv2 imwrite flag name; cv2 itself is imported on first write.
+_FORMATS = {
+    "webp": (".webp", "IMWRITE_WEBP_QUALITY"),
+    "jpeg": (".jpg", "IMWRITE_JPEG_QUALITY"),
+    "png": (".png", "IMWRITE_PNG_COMPRESSION"),
+}
+
+# Only files named by this store are subject to retention.
+_STORED_NAME = re.compile(r"^[0-9a-f]{24}(_thumb)?\.(webp|jpg|png)$")
+
+
+class ProcessedImageStore:
+    """
+    Writes annotated images to `directory` and serves their URLs.
+
+    Names come from the analysis content key plus the encoding settings, so
+    identical uploads share one file and two users uploading `photo.jpg` no
+    longer overwrite each other. save() returns URLs immediately; encoding
+    and the write run on `executor`, and wait() lets the file route hold a
+    request until a pending write has landed.
+
+    Retention: files older than `max_age_sec` are removed, then the oldest
+    go until the directory is under `max_bytes`. prune() runs at startup and
+    every `prune_every` writes.
+    """
+
+    def __init__(self, directory: str, base_url: str, executor, fmt: str = "webp",
+                 quality: int = 85, thumbnail_max_side: int = 0, max_age_sec: float = None,
+                 max_bytes: int = None, variant: str = "", prune_every: int = 50):
+        if fmt not in _FORMATS:
+            raise ValueError(f"unsupported image format {fmt!r} (use {', '.join(_FORMATS)})")
+        self.directory = directory
+        self.base_url = base_url.rstrip("/")
+        self.fmt = fmt
+        self.quality = quality
+        self.thumbnail_max_side = thumbnail_max_side
+        self.max_age_sec = max_age_sec
+        self.max_bytes = max_bytes
+        self.variant = variant
+        self.prune_every = prune_every
+        self._executor = executor
+        self._ext, self._flag = _FORMATS[fmt]
+        # PNG takes a 0-9 compression level; quality maps onto it inversely.
+        self._level = quality if fmt != "png" else max(0, min(9, (100 - quality) // 10))
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self.writes = 0
+        self.reuses = 0
+        self.pruned = 0
+        self.errors = 0
+        # Created on the first write, so importing the API leaves no trace.
+        self._directory_ready = False
+
+    def name_for(self, key: str, thumbnail: bool = False) -> str:
+        # Every setting that changes the bytes on disk: a config change must
+        # not serve files written under the old one.
+        raw = f"{key}|{self.fmt}|{self.quality}|{self.thumbnail_max_side}|{self.variant}"
+        digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24]
+        return f"{digest}{'_thumb' if thumbnail else ''}{self._ext}"
+
+    def url_for(self, name: str) -> str:
+        return f"{self.base_url}/{name}"
+
+    def save(self, key: str, image) -> dict:
+        """Schedule `image` for writing; returns {"url", "thumbnail_url"}."""
+        name = self.name_for(key)
+        thumb = self.name_for(key, thumbnail=True) if self.thumbnail_max_side else None
+        with self._lock:
+            if name not in self._pending:
+                self._pending[name] = self._executor.submit(self._write, name, thumb, image)
+                if thumb:
+                    self._pending[thumb] = self._pending[name]
+        return {
+            "url": self.url_for(name),
+            "thumbnail_url": self.url_for(thumb) if thumb else None,
+        }
+
+    async def wait(self, name: str):
+        """Wait for a pending write of `name`, if any."""
+        with self._lock:
+            future = self._pending.get(name)
+        if future is not None:
+            try:
+                await asyncio.wrap_future(future)
+            except Exception:
+                pass
+
+    def path_for(self, name: str):
+        """Filesystem path of a stored file, or None for names outside the directory."""
+        if not name or name != os.path.basename(name) or name.startswith("."):
+            return None
+        return os.path.join(self.directory, name)
+
+    def _write(self, name, thumb, image):
+        try:
+            path = os.path.join(self.directory, name)
+            thumb_path = os.path.join(self.directory, thumb) if thumb else None
+            if os.path.exists(path) and (thumb_path is None or os.path.exists(thumb_path)):
+                # Same upload and settings: keep the file, refresh its age.
+                for p in (path, thumb_path):
+                    if p:
+                        self._touch(p)
+                with self._lock:
+                    self.reuses += 1
+                return
+            if not self._directory_ready:
+                os.makedirs(self.directory, exist_ok=True)
+                self._directory_ready = True
+            self._encode_to(path, image)
+            if thumb_path:
+                from core.image_io import fit_max_side
+
+                self._encode_to(thumb_path, fit_max_side(image, self.thumbnail_max_side))
+            with self._lock:
+                self.writes += 1
+                self._writes_since_prune += 1
+                due = self.prune_every and self._writes_since_prune >= self.prune_every
+                if due:
+                    self._writes_since_prune = 0
+            if due:
+                self.prune()
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print(f"[Store] writing {name} failed: {e}")
+        finally:
+            with self._lock:
+                self._pending.pop(name, None)
+                if thumb:
+                    self._pending.pop(thumb, None)
+
+    def _encode_to(self, path, image):
+        with timed("image_write"):
+            self._encode_file(path, image)
+
+    def _encode_file(self, path, image):
+        import cv2
+
+        ok, buf = cv2.imencode(self._ext, image, [getattr(cv2, self._flag), int(self._level)])
+        if not ok:
+            raise ValueError(f"could not encode {self._ext}")
+        # Write then rename so readers never see a half-written file.
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(buf.tobytes())
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _touch(path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def prune(self):
+        """Apply the retention policy; returns the number of files removed."""
+        if not self.max_age_sec and not self.max_bytes:
+            return 0
+        now = time.time()
+        files = []
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return 0  # nothing written yet
+        for entry in entries:
+            if entry.is_file() and _STORED_NAME.match(entry.name):
+                st = entry.stat()
+                files.append((st.st_mtime, st.st_size, entry.path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+
+        removed = 0
+        for mtime, size, path in files:
+            expired = self.max_age_sec and now - mtime > self.max_age_sec
+            over = self.max_bytes and total > self.max_bytes
+            if not expired and not over:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        with self._lock:
+            self.pruned += removed
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "format": self.fmt,
+                "quality": self.quality,
+                "thumbnail_max_side": self.thumbnail_max_side,
+                "pending": len({id(f) for f in self._pending.values()}),
+                "writes": self.writes,
+                "reuses": self.reuses,
+                "pruned": self.pruned,
+                "errors": self.errors,
+            }
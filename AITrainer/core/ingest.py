@@ -0,0 +1,194 @@
+# core/ingest.py
+# Reading uploads into one buffer, rejecting oversized or non-image data early.
+import struct
+
+# Magic bytes of the formats cv2.imdecode is built with here.
+_SIGNATURES = (
+    ("jpeg", 0, b"\xff\xd8\xff"),
+    ("png", 0, b"\x89PNG\r\n\x1a\n"),
+    ("webp", 8, b"WEBP"),
+    ("bmp", 0, b"BM"),
+)
+SNIFF_BYTES = 12
+
+# JPEG start-of-frame markers (baseline, progressive, lossless, arithmetic).
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Markers without a length field.
+_JPEG_STANDALONE = {0x01, *range(0xD0, 0xD9)}
+
+
+class UploadRejected(ValueError):
+    """An upload refused before decoding; status_code is the HTTP status to answer with."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _corrupt():
+    return UploadRejected(400, "Lỗi file ảnh.")
+
+
+def _unsupported():
+    return UploadRejected(415, "Định dạng ảnh không được hỗ trợ (JPEG, PNG, WebP, BMP).")
+
+
+def _too_many_bytes(max_bytes):
+    return UploadRejected(413, f"Ảnh quá lớn (tối đa {max_bytes / (1024 * 1024):g} MB).")
+
+
+def _check_pixels(size, max_pixels):
+    if max_pixels and size[0] * size[1] > max_pixels:
+        raise UploadRejected(
+            413, f"Ảnh quá lớn ({size[0]}x{size[1]}, tối đa {max_pixels / 1_000_000:g} MP)."
+        )
+
+
+def sniff_format(data, end: int = None):
+    """'jpeg' | 'png' | 'webp' | 'bmp' from the first SNIFF_BYTES bytes, else None."""
+    end = len(data) if end is None else end
+    for name, offset, magic in _SIGNATURES:
+        if end >= offset + len(magic) and data[offset:offset + len(magic)] == magic:
+            if name == "webp" and data[0:4] != b"RIFF":
+                continue
+            return name
+    return None
+
+
+def _png_size(data, end):
+    if end < 24 or data[12:16] != b"IHDR":
+        return None
+    return struct.unpack_from(">II", data, 16)
+
+
+def _bmp_size(data, end):
+    if end < 26:
+        return None
+    if struct.unpack_from("<I", data, 14)[0] == 12:  # OS/2 BITMAPCOREHEADER
+        return struct.unpack_from("<HH", data, 18)
+    width, height = struct.unpack_from("<ii", data, 18)
+    return abs(width), abs(height)
+
+
+def _webp_size(data, end):
+    if end < 30:
+        return None
+    chunk = data[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack_from("<HH", data, 26)
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        bits = struct.unpack_from("<I", data, 21)[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return width, height
+    raise _corrupt()
+
+
+def _jpeg_size(data, end):
+    # Walk the marker segments (EXIF, ICC, ...) up to the start-of-frame.
+    i = 2
+    while i + 4 <= end:
+        if data[i] != 0xFF:
+            raise _corrupt()
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker in _JPEG_STANDALONE:
+            i += 2
+            continue
+        if marker in _JPEG_SOF:
+            if i + 9 > end:
+                return None
+            height, width = struct.unpack_from(">HH", data, i + 5)
+            return width, height
+        if marker == 0xDA:  # start of scan before any frame header
+            raise _corrupt()
+        i += 2 + struct.unpack_from(">H", data, i + 2)[0]
+    return None
+
+
+_SIZE_READERS = {"jpeg": _jpeg_size, "png": _png_size, "webp": _webp_size, "bmp": _bmp_size}
+
+
+def image_size(data, end: int = None, fmt: str = None):
+    """
+    (width, height) from the image header, without decoding; None while
+    `data[:end]` is too short to tell. Raises UploadRejected for data that is
+    not a supported image. Like PIL's Image.size, EXIF orientation is ignored.
+    """
+    end = len(data) if end is None else end
+    fmt = fmt or sniff_format(data, end)
+    if fmt is None:
+        raise _unsupported()
+    return _SIZE_READERS[fmt](data, end)
+
+
+class Upload:
+    """An upload read by read_upload(): the bytes plus what the header told us."""
+
+    __slots__ = ("data", "format", "size")
+
+    def __init__(self, data: bytearray, fmt: str, size):
+        self.data = data
+        self.format = fmt
+        self.size = size
+
+
+def read_upload(fileobj, max_bytes: int, max_pixels: int = None, size_hint: int = None,
+                chunk_size: int = 256 * 1024) -> Upload:
+    """
+    Read a binary file object into a single bytearray, checking as it goes:
+    more than `max_bytes` (413), an unsupported format (415, from the first
+    bytes), a header announcing more than `max_pixels` pixels (413), or a
+    header that never yields a size (400). With `size_hint` (the declared
+    upload size) the buffer is allocated once and filled with readinto();
+    np.frombuffer(upload.data) then decodes it without another copy.
+    """
+    if size_hint is not None and size_hint > max_bytes:
+        raise _too_many_bytes(max_bytes)
+    # One byte past the cap is enough to know the upload is too large.
+    limit = max_bytes + 1
+    buf = bytearray(min(size_hint + 1 if size_hint else chunk_size, limit))
+    readinto = getattr(fileobj, "readinto", None)
+    pos, fmt, size = 0, None, None
+
+    while True:
+        if pos == len(buf):
+            if len(buf) >= limit:
+                raise _too_many_bytes(max_bytes)
+            buf.extend(bytes(min(max(len(buf), chunk_size), limit - len(buf))))
+        want = min(chunk_size, len(buf) - pos)
+        if readinto is not None:
+            with memoryview(buf) as view, view[pos:pos + want] as target:
+                n = readinto(target)
+        else:
+            chunk = fileobj.read(want)
+            n = len(chunk)
+            buf[pos:pos + n] = chunk
+        if not n:
+            break
+        pos += n
+
+        if fmt is None and pos >= SNIFF_BYTES:
+            fmt = sniff_format(buf, pos)
+            if fmt is None:
+                raise _unsupported()
+        if fmt is not None and size is None:
+            size = image_size(buf, pos, fmt)
+            if size is not None:
+                _check_pixels(size, max_pixels)
+
+    del buf[pos:]
+    if size is None:
+        # Shorter than SNIFF_BYTES, or the header never completed.
+        size = image_size(buf, pos, fmt)
+        if size is None:
+            raise _corrupt()
+        _check_pixels(size, max_pixels)
+    if not all(size):
+        raise _corrupt()
+    return Upload(buf, fmt, size)
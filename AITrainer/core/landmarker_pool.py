@@ -0,0 +1,169 @@
+# core/landmarker_pool.py
+# Pool of independent PoseLandmarker instances so inference scales with cores.
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+def default_pool_size() -> int:
+    return max(1, os.cpu_count() or 1)
+
+
+class LandmarkerPool:
+    """
+    Fixed-size pool of landmarkers built by `factory`.
+
+    A PoseLandmarker in IMAGE mode is not safe for concurrent detect() calls,
+    so each worker checks out an instance for the duration of one inference
+    and returns it afterwards. `warmup` (optional) is run once per instance
+    at startup so the first real request does not pay graph initialisation.
+
+    Loading is lazy: start() loads synchronously, start_background() on a
+    daemon thread, and the first checkout() starts loading if neither was
+    called. checkout() waits while instances are still loading.
+    State: idle -> loading -> ready | failed, and closed after close().
+    """
+
+    def __init__(self, factory, size: int = None, warmup=None, name: str = "pose"):
+        self.name = name
+        self.size = size or default_pool_size()
+        self._factory = factory
+        self._warmup = warmup
+        self._idle = queue.LifoQueue()
+        self._instances = []
+        self._lock = threading.Lock()
+        self._checkouts = 0
+        self._errors = 0
+        self._last_error = None
+        self._wait_total = 0.0
+        self._warmup_ms = []
+        self._state = "idle"
+        self._load_ms = None
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def _begin_loading(self) -> bool:
+        with self._lock:
+            if self._state != "idle":
+                return False
+            self._state = "loading"
+            return True
+
+    def start(self):
+        if self._begin_loading():
+            self._load()
+        return self
+
+    def start_background(self):
+        if self._begin_loading():
+            threading.Thread(target=self._load, name=f"{self.name}-loader", daemon=True).start()
+        return self
+
+    def _load(self):
+        t_start = time.perf_counter()
+        for _ in range(self.size):
+            try:
+                instance = self._factory()
+            except Exception as e:
+                print(f"[Pool:{self.name}] loading failed: {e}")
+                self._last_error = str(e)
+                break
+            if instance is None:
+                # Missing model file etc. — load_pose_model already logged why.
+                break
+            if self._warmup is not None:
+                t0 = time.perf_counter()
+                try:
+                    self._warmup(instance)
+                except Exception as e:
+                    print(f"[Pool:{self.name}] warm-up failed: {e}")
+                    self._last_error = str(e)
+                self._warmup_ms.append(round((time.perf_counter() - t0) * 1000, 1))
+            self._instances.append(instance)
+            self._idle.put(instance)
+        with self._lock:
+            self._load_ms = round((time.perf_counter() - t_start) * 1000, 1)
+            self._state = "ready" if self._instances else "failed"
+        print(f"[Pool:{self.name}] {len(self._instances)}/{self.size} landmarkers ready")
+
+    @property
+    def ready(self) -> bool:
+        return len(self._instances) > 0
+
+    def checkout(self, timeout: float = None):
+        if self._state == "idle":
+            self.start_background()
+        t0 = time.perf_counter()
+        deadline = None if timeout is None else t0 + timeout
+        while True:
+            if self._state in ("failed", "closed"):
+                raise RuntimeError("Pose model chưa được tải.")
+            # Short slices while loading so a failed load is noticed.
+            wait = 0.25 if self._state == "loading" else None
+            if deadline is not None:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise TimeoutError(f"No {self.name} landmarker available after {timeout}s")
+                wait = remaining if wait is None else min(wait, remaining)
+            try:
+                instance = self._idle.get(timeout=wait)
+                break
+            except queue.Empty:
+                continue
+        with self._lock:
+            self._checkouts += 1
+            self._wait_total += time.perf_counter() - t0
+        return instance
+
+    def checkin(self, instance):
+        self._idle.put(instance)
+
+    @contextmanager
+    def lease(self, timeout: float = None):
+        """Context manager around checkout()/checkin() that records failures."""
+        instance = self.checkout(timeout)
+        try:
+            yield instance
+        except Exception as e:
+            with self._lock:
+                self._errors += 1
+                self._last_error = str(e)
+            raise
+        finally:
+            self.checkin(instance)
+
+    def health(self) -> dict:
+        with self._lock:
+            checkouts = self._checkouts
+            avg_wait = self._wait_total / checkouts if checkouts else 0.0
+            available = self._idle.qsize()
+            return {
+                "ready": self.ready,
+                "state": self._state,
+                "size": self.size,
+                "loaded": len(self._instances),
+                "available": available,
+                "in_use": len(self._instances) - available,
+                "checkouts": checkouts,
+                "avg_wait_ms": round(avg_wait * 1000, 2),
+                "errors": self._errors,
+                "last_error": self._last_error,
+                "warmup_ms": list(self._warmup_ms),
+                "load_ms": self._load_ms,
+            }
+
+    def close(self):
+        for instance in self._instances:
+            close = getattr(instance, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception:
+                    pass
+        self._instances = []
+        self._idle = queue.LifoQueue()
+        self._state = "closed"
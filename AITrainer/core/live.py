@@ -0,0 +1,159 @@
+# core/live.py
+# Live-frame analysis: one VIDEO-mode landmarker per session + measurement smoothing.
+import time
+
+import cv2
+import numpy as np
+from mediapipe.tasks.python import vision as mp_vision
+
+from core.pose_analyzer import (
+    _calculate_measurements_from_landmarks,
+    _classify_measurements,
+    detect_pose,
+    load_pose_model,
+)
+
+RATIO_KEYS = ("shoulder_hip_ratio", "waist_hip_ratio")
+
+
+class MeasurementSmoother:
+    """
+    Exponential moving average over the pixel measurements of consecutive
+    frames. Ratios, cm values and classifications are re-derived from the
+    smoothed lengths so they stay consistent with each other.
+
+    alpha is the weight of the newest frame (1.0 disables smoothing). A key
+    missing from a frame (low confidence) is dropped rather than carried over,
+    and a gap longer than `reset_after_sec` starts the average afresh.
+    """
+
+    def __init__(self, alpha: float = 0.3, reset_after_sec: float = 1.0):
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.reset_after_sec = reset_after_sec
+        self._state = {}
+        self._last_ts = None
+
+    def reset(self):
+        self._state = {}
+        self._last_ts = None
+
+    def update(self, measurements: dict, timestamp_ms: int, known_height_cm=None) -> dict:
+        if self._last_ts is not None and timestamp_ms - self._last_ts > self.reset_after_sec * 1000:
+            self._state = {}
+        self._last_ts = timestamp_ms
+
+        raw = measurements["pixel_measurements"]
+        state = {}
+        for key, value in raw.items():
+            if key in RATIO_KEYS:
+                continue
+            prev = self._state.get(key)
+            state[key] = value if prev is None else prev + self.alpha * (value - prev)
+        self._state = state
+
+        px = dict(state)
+        if "shoulder_hip_ratio" in raw:
+            px["shoulder_hip_ratio"] = px["shoulder_width"] / px["hip_width"]
+        if "waist_hip_ratio" in raw:
+            px["waist_hip_ratio"] = px["waist_width"] / px["hip_width"]
+
+        smoothed = dict(measurements)
+        smoothed["pixel_measurements"] = px
+        smoothed["cm_measurements"] = {}
+        smoothed["scale_cm_per_px"] = None
+        if known_height_cm and px.get("height"):
+            scale = known_height_cm / px["height"]
+            smoothed["scale_cm_per_px"] = float(scale)
+            smoothed["cm_measurements"] = {
+                k: v * scale for k, v in px.items() if k not in RATIO_KEYS
+            }
+        try:
+            smoothed["classifications"] = _classify_measurements(
+                px, smoothed.get("width_source")
+            )
+        except Exception:
+            smoothed["classifications"] = {}
+        return smoothed
+
+
+class LiveSession:
+    """
+    State for one camera stream. A VIDEO-mode landmarker tracks the person
+    between frames, so only the first frame (or one after the track is lost)
+    pays the full detector cost. The landmarker keeps per-stream timestamps,
+    which is why each session owns one instead of leasing from the pool.
+
+    Not thread-safe: the caller feeds frames one at a time.
+    """
+
+    def __init__(self, known_height_cm=None, smoothing: float = 0.3, tier: str = "heavy"):
+        self.known_height_cm = known_height_cm
+        self.tier = tier
+        self.smoother = MeasurementSmoother(alpha=smoothing)
+        self.frames = 0
+        self._landmarker = None
+        self._last_ts = -1
+
+    def open(self):
+        self._landmarker = load_pose_model(
+            running_mode=mp_vision.RunningMode.VIDEO, tier=self.tier, segmentation=False
+        )
+        if self._landmarker is None:
+            raise RuntimeError("Pose model chưa được tải.")
+        return self
+
+    def configure(self, options: dict):
+        """Apply a client control message: known_height_cm and/or reset."""
+        if "known_height_cm" in options:
+            height = options["known_height_cm"]
+            self.known_height_cm = float(height) if height else None
+        if options.get("reset"):
+            self.smoother.reset()
+
+    def process(self, data: bytes, timestamp_ms: int) -> dict:
+        """
+        Decode one encoded frame and return the per-frame payload. Raises
+        ValueError when the bytes are not an image.
+        """
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("Lỗi file ảnh.")
+        height, width = image.shape[:2]
+
+        # detect_for_video requires strictly increasing timestamps.
+        timestamp_ms = max(int(timestamp_ms), self._last_ts + 1)
+        self._last_ts = timestamp_ms
+        self.frames += 1
+
+        t0 = time.perf_counter()
+        landmarks_px, _ = detect_pose(self._landmarker, image, timestamp_ms=timestamp_ms)
+        payload = {
+            "event": "frame",
+            "frame": self.frames,
+            "timestamp_ms": timestamp_ms,
+            "image_size": [width, height],
+            "landmarks": None,
+            "measurements": None,
+        }
+        if landmarks_px is not None:
+            measurements = _calculate_measurements_from_landmarks(
+                landmarks_px, width, height, known_height_cm=self.known_height_cm
+            )
+            payload["landmarks"] = [
+                [round(x, 1), round(y, 1), round(vis, 3)] for x, y, vis in landmarks_px
+            ]
+            payload["measurements"] = self.smoother.update(
+                measurements, timestamp_ms, self.known_height_cm
+            )
+        payload["inference_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        return payload
+
+    def close(self):
+        if self._landmarker is not None:
+            try:
+                self._landmarker.close()
+            except Exception:
+                pass
+            self._landmarker = None
@@ -0,0 +1,208 @@
+# core/llm_router.py
+# Hedged LLM calls across a model list, with adaptive timeouts and a circuit breaker.
+import asyncio
+import threading
+import time
+from collections import deque
+
+
+class CircuitOpenError(RuntimeError):
+    """Every model is cooling down after repeated failures."""
+
+
+class _ModelState:
+    def __init__(self, window):
+        self.latencies = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.successes = 0
+        self.failures = 0
+
+
+class LLMRouter:
+    """
+    Sends one prompt to an ordered list of models and returns the first valid
+    answer.
+
+    - Hedging: the first available model starts at once; if it has not
+      answered after `hedge_delay_sec`, the next one starts too, and so on.
+      Whichever returns valid output first wins and the rest are cancelled.
+      hedge_delay_sec=0 queries every model in parallel, None only fails
+      over (the next model starts when the previous one fails).
+    - Adaptive timeouts: once a model has `min_samples` successful calls its
+      timeout is `timeout_multiplier` x its p95 latency, clamped to
+      [min_timeout_sec, timeout_sec].
+    - Circuit breaker: `failure_threshold` consecutive failures (errors,
+      timeouts, invalid output) take a model out for `cooldown_sec`. After
+      the cooldown one call is let through; success closes the circuit.
+
+    generate() takes `call(model, timeout)`, an async function returning the
+    raw text, and `validate(text)`, which raises on unusable output. `on_attempt(model, seconds,
+    outcome)` observes every attempt (outcome: ok | error | cancelled).
+    """
+
+    def __init__(self, models, hedge_delay_sec=None, timeout_sec=120.0,
+                 min_timeout_sec=5.0, timeout_multiplier=3.0, min_samples=5, window=50,
+                 failure_threshold=3, cooldown_sec=60.0, on_attempt=None):
+        if not models:
+            raise ValueError("at least one model is required")
+        self.models = list(models)
+        self.hedge_delay_sec = hedge_delay_sec
+        self.timeout_sec = timeout_sec
+        self.min_timeout_sec = min_timeout_sec
+        self.timeout_multiplier = timeout_multiplier
+        self.min_samples = min_samples
+        self.failure_threshold = failure_threshold
+        self.cooldown_sec = cooldown_sec
+        self.on_attempt = on_attempt
+        self._state = {m: _ModelState(window) for m in self.models}
+        self._lock = threading.Lock()
+        self.hedges = 0
+        self.failovers = 0
+        self.short_circuits = 0
+
+    # ── per-model bookkeeping ────────────────────────────────────────────────
+
+    def timeout_for(self, model) -> float:
+        with self._lock:
+            samples = sorted(self._state[model].latencies)
+        if len(samples) < self.min_samples:
+            return self.timeout_sec
+        p95 = samples[int(0.95 * (len(samples) - 1))]
+        return max(self.min_timeout_sec, min(self.timeout_sec, p95 * self.timeout_multiplier))
+
+    def _acquire(self, model) -> bool:
+        """
+        May `model` be called now? A closed circuit always answers yes. Once
+        an open circuit's cooldown has passed, the first caller gets the
+        trial call and the circuit stays open for everyone else until that
+        call succeeds (closing it) or fails (restarting the cooldown).
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self._state[model]
+            if not state.open_until:
+                return True
+            if now < state.open_until:
+                return False
+            state.open_until = now + self.cooldown_sec
+            return True
+
+    def _record_success(self, model, elapsed):
+        with self._lock:
+            state = self._state[model]
+            state.latencies.append(elapsed)
+            state.consecutive_failures = 0
+            state.open_until = 0.0
+            state.successes += 1
+
+    def _record_failure(self, model):
+        with self._lock:
+            state = self._state[model]
+            state.consecutive_failures += 1
+            state.failures += 1
+            if state.consecutive_failures >= self.failure_threshold:
+                state.open_until = time.monotonic() + self.cooldown_sec
+
+    def _observe(self, model, elapsed, outcome):
+        if self.on_attempt is not None:
+            self.on_attempt(model, elapsed, outcome)
+
+    # ── calls ────────────────────────────────────────────────────────────────
+
+    async def _attempt(self, call, model, validate):
+        timeout = self.timeout_for(model)
+        t0 = time.perf_counter()
+        try:
+            text = await asyncio.wait_for(call(model, timeout), timeout)
+            if validate is not None:
+                validate(text)
+        except asyncio.CancelledError:
+            self._observe(model, time.perf_counter() - t0, "cancelled")
+            raise
+        except Exception:
+            self._record_failure(model)
+            self._observe(model, time.perf_counter() - t0, "error")
+            raise
+        elapsed = time.perf_counter() - t0
+        self._record_success(model, elapsed)
+        self._observe(model, elapsed, "ok")
+        return text
+
+    async def generate(self, call, validate=None):
+        """
+        Run the hedged call; returns (text, model) of the winner. Raises the
+        last model error, or CircuitOpenError when every circuit is open.
+        """
+        queue = deque(self.models)
+        running = {}
+        last_err = None
+
+        def launch():
+            # Next model whose circuit lets a call through; False if none is left.
+            while queue:
+                model = queue.popleft()
+                if self._acquire(model):
+                    running[asyncio.create_task(self._attempt(call, model, validate))] = model
+                    return True
+            return False
+
+        if not launch():
+            with self._lock:
+                self.short_circuits += 1
+            raise CircuitOpenError("all LLM models are cooling down after failures")
+        try:
+            while running:
+                hedge = self.hedge_delay_sec is not None and queue
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=self.hedge_delay_sec if hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    if launch():
+                        with self._lock:
+                            self.hedges += 1
+                    continue
+                for task in done:
+                    model = running.pop(task)
+                    if task.exception() is None:
+                        return task.result(), model
+                    last_err = task.exception()
+                    print(f"[LLM] model {model} failed: {last_err!r}")
+                if not running and launch():
+                    with self._lock:
+                        self.failovers += 1
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+        raise last_err if last_err else RuntimeError("LLM call failed")
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        models = {}
+        for model in self.models:
+            with self._lock:
+                state = self._state[model]
+                samples = sorted(state.latencies)
+                entry = {
+                    "circuit": (
+                        "closed" if not state.open_until
+                        else "open" if now < state.open_until else "half-open"
+                    ),
+                    "consecutive_failures": state.consecutive_failures,
+                    "successes": state.successes,
+                    "failures": state.failures,
+                }
+            entry["p50_sec"] = round(samples[len(samples) // 2], 3) if samples else None
+            entry["timeout_sec"] = round(self.timeout_for(model), 2)
+            models[model] = entry
+        return {
+            "hedge_delay_sec": self.hedge_delay_sec,
+            "hedges": self.hedges,
+            "failovers": self.failovers,
+            "short_circuits": self.short_circuits,
+            "models": models,
+        }
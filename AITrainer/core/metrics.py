@@ -0,0 +1,141 @@
+# core/metrics.py
+# Prometheus metrics (prometheus_client) and per-request stage timings.
+import contextvars
+import math
+import re
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Histogram,
+    disable_created_metrics,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily
+from prometheus_client.registry import Collector
+
+# No *_created series: they double the exposition and nothing here reads them.
+disable_created_metrics()
+
+# The API's own registry, served on GET /metrics.
+REGISTRY = CollectorRegistry()
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# Seconds; covers a cache hit (~1 ms) up to a slow LLM call.
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+
+class FunctionCounter(Collector):
+    """
+    Counter read from callables at scrape time, for counts another object
+    already keeps (llm_router.hedges, admission.rejected). prometheus_client
+    only offers set_function() on gauges, which would lose the counter type.
+
+        FALLBACKS = FunctionCounter("x_fallbacks", "...", ("kind",))
+        FALLBACKS.labels("hedge").set_function(lambda: router.hedges)
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._functions = {}
+        registry.register(self)
+
+    def labels(self, *values):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        return _FunctionSample(self._functions, tuple(str(v) for v in values))
+
+    def set_function(self, fn):
+        self.labels().set_function(fn)
+
+    def describe(self):
+        yield CounterMetricFamily(self.name, self.documentation, labels=self.labelnames)
+
+    def collect(self):
+        family = CounterMetricFamily(self.name, self.documentation, labels=self.labelnames)
+        for values, fn in sorted(self._functions.items()):
+            try:
+                value = float(fn())
+            except Exception:
+                value = math.nan
+            family.add_metric(values, value)
+        yield family
+
+
+class _FunctionSample:
+    def __init__(self, functions, key):
+        self._functions = functions
+        self._key = key
+
+    def set_function(self, fn):
+        """Read the value from `fn()` at scrape time (NaN if it raises)."""
+        self._functions[self._key] = fn
+
+
+def render() -> bytes:
+    """Text exposition of every metric in REGISTRY."""
+    return generate_latest(REGISTRY)
+
+
+STAGE_SECONDS = Histogram(
+    "aitrainer_stage_duration_seconds",
+    "Time spent in each analysis stage.",
+    ("stage",),
+    buckets=DEFAULT_BUCKETS,
+    registry=REGISTRY,
+)
+
+
+# ─── Per-request timings ─────────────────────────────────────────────────────
+# A request that wants a Server-Timing header installs a list in this context
+# variable; timed() appends (stage, seconds) to it. run_blocking copies the
+# context into worker threads, so stages timed there land in the same list.
+
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def start_request_timings():
+    """Collect stage timings for the current request; returns (timings, reset token)."""
+    timings = []
+    return timings, _request_timings.set(timings)
+
+
+def stop_request_timings(token):
+    _request_timings.reset(token)
+
+
+def record_stage(stage: str, seconds: float, histogram: Histogram = None, labels=()):
+    (histogram or STAGE_SECONDS).labels(*(labels or (stage,))).observe(seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage: str):
+    """Observe the duration of the block as `stage` (also on failure)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - t0)
+
+
+def server_timing_header(timings) -> str:
+    """[(stage, seconds)] -> 'decode;dur=12.3, detect;dur=80.1' (ms, repeats summed)."""
+    totals = {}
+    for stage, seconds in timings:
+        name = _NON_TOKEN.sub("_", stage)
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+
+# Server-Timing metric names are HTTP tokens.
+_NON_TOKEN = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
@@ -0,0 +1,100 @@
+# core/model_tiers.py
+# BlazePose model tiers, per-request quality modes and SLO-driven fallback.
+import threading
+import time
+from collections import deque
+
+# Lightest first. Model files are downloaded next to api.py.
+TIERS = ("lite", "full", "heavy")
+MODEL_FILES = {tier: f"pose_landmarker_{tier}.task" for tier in TIERS}
+
+# Request-facing quality mode -> preferred tier.
+QUALITY_TIERS = {"fast": "lite", "balanced": "full", "accurate": "heavy"}
+DEFAULT_QUALITY = "accurate"
+
+
+def parse_tiers(value: str):
+    """'lite,heavy' -> ('lite', 'heavy') in TIERS order; raises on unknown names."""
+    names = {t.strip().lower() for t in (value or "").split(",") if t.strip()}
+    unknown = names - set(TIERS)
+    if unknown:
+        raise ValueError(f"unknown pose tier(s): {', '.join(sorted(unknown))}")
+    return tuple(t for t in TIERS if t in names)
+
+
+class TierRouter:
+    """
+    Picks which tier's landmarker pool serves a request.
+
+    The requested quality maps to a tier. If that tier's p90 latency over
+    the last `window_sec` exceeds `slo_ms` (or it is not loaded), the next
+    lighter loaded tier answers instead. Latency samples include the wait
+    for a free landmarker, so the fallback kicks in under load; once the
+    window drains of slow samples, requests go back to the preferred tier.
+    """
+
+    def __init__(self, pools: dict, slo_ms: float = None, window_sec: float = 30.0,
+                 min_samples: int = 5):
+        self.pools = pools
+        self.slo_ms = slo_ms
+        self.window_sec = window_sec
+        self.min_samples = min_samples
+        self._samples = {tier: deque() for tier in pools}
+        self._lock = threading.Lock()
+        self.fallbacks = 0
+
+    def tier_for(self, quality: str) -> str:
+        """Raises ValueError for an unknown quality mode."""
+        if quality not in QUALITY_TIERS:
+            raise ValueError(
+                f"quality must be one of {', '.join(QUALITY_TIERS)}, got {quality!r}"
+            )
+        preferred = QUALITY_TIERS[quality]
+        configured = [t for t in reversed(TIERS) if t in self.pools]  # heaviest first
+        # The preferred tier, then lighter ones. If none of those is
+        # configured, the lightest configured tier stands in.
+        candidates = [t for t in configured if TIERS.index(t) <= TIERS.index(preferred)]
+        candidates = candidates or configured[::-1]
+
+        usable = [t for t in candidates if self.pools[t].state not in ("failed", "closed")]
+        usable = usable or candidates
+        chosen = next((t for t in usable if not self._over_slo(t)), usable[-1])
+        if chosen != candidates[0]:
+            with self._lock:
+                self.fallbacks += 1
+        return chosen
+
+    def record(self, tier: str, elapsed_ms: float):
+        now = time.monotonic()
+        with self._lock:
+            samples = self._samples[tier]
+            samples.append((now, elapsed_ms))
+            self._expire(samples, now)
+
+    def _expire(self, samples, now):
+        while samples and now - samples[0][0] > self.window_sec:
+            samples.popleft()
+
+    def _p90(self, tier):
+        with self._lock:
+            samples = self._samples[tier]
+            self._expire(samples, time.monotonic())
+            if len(samples) < self.min_samples:
+                return None
+            ordered = sorted(ms for _, ms in samples)
+        return ordered[int(0.9 * (len(ordered) - 1))]
+
+    def _over_slo(self, tier) -> bool:
+        if not self.slo_ms:
+            return False
+        p90 = self._p90(tier)
+        return p90 is not None and p90 > self.slo_ms
+
+    def stats(self) -> dict:
+        p90 = {tier: self._p90(tier) for tier in self.pools}
+        return {
+            "slo_ms": self.slo_ms,
+            "window_sec": self.window_sec,
+            "p90_ms": {t: round(v, 1) if v is not None else None for t, v in p90.items()},
+            "fallbacks": self.fallbacks,
+        }
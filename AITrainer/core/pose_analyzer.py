@@ -7,6 +7,19 @@ import mediapipe as mp
 from mediapipe.tasks import python as mp_python
 from mediapipe.tasks.python import vision as mp_vision
 
+from core.image_io import fit_max_side
+from core.metrics import timed
+from core.model_tiers import MODEL_FILES
+from core.render import OVERLAY_COLOR, overlay_segmentation
+from core.silhouette import Silhouette, measure_widths
+
+# Cách ước lượng độ rộng vai / eo / hông.
+WIDTH_METHODS = ("landmarks", "silhouette")
+
+
+# Màu overlay segmentation cho từng người (người đầu tiên giữ màu mặc định).
+PERSON_COLORS = (OVERLAY_COLOR, (60, 180, 75), (48, 130, 245), (180, 30, 145), (0, 200, 200))
+
 
 # PoseLandmark indices (BlazePose 33 keypoints)
 class PoseLandmark:
@@ -61,13 +74,19 @@ POSE_CONNECTIONS = [
 ]
 
 
-def load_pose_model():
-    """Tạo đối tượng MediaPipe PoseLandmarker (Tasks API)."""
-    print("Khởi tạo mô hình MediaPipe PoseLandmarker (Tasks API)...")
+def load_pose_model(running_mode=mp_vision.RunningMode.IMAGE, tier="heavy", segmentation=True,
+                    num_poses=1):
+    """
+    Tạo đối tượng MediaPipe PoseLandmarker (Tasks API).
+    running_mode=VIDEO bật tracking giữa các frame liên tiếp: chỉ chạy lại
+    detector khi mất dấu người, frame còn lại chỉ tốn phần landmark.
+    tier: "lite" | "full" | "heavy" — nhẹ hơn thì nhanh hơn nhưng kém chính xác hơn.
+    segmentation=False: model không sinh segmentation mask (chỉ cần landmarks).
+    num_poses: số người tối đa phát hiện trong một lần chạy (mỗi người một mask).
+    """
+    print(f"Khởi tạo mô hình MediaPipe PoseLandmarker ({tier}, Tasks API)...")
 
-    model_path = os.path.join(
-        os.path.dirname(__file__), "..", "pose_landmarker_heavy.task"
-    )
+    model_path = os.path.join(os.path.dirname(__file__), "..", MODEL_FILES[tier])
     model_path = os.path.abspath(model_path)
 
     if not os.path.exists(model_path):
@@ -77,38 +96,96 @@ def load_pose_model():
     base_options = mp_python.BaseOptions(model_asset_path=model_path)
     options = mp_vision.PoseLandmarkerOptions(
         base_options=base_options,
-        output_segmentation_masks=True,
-        num_poses=1,
+        output_segmentation_masks=segmentation,
+        num_poses=num_poses,
         min_pose_detection_confidence=0.5,
         min_pose_presence_confidence=0.5,
         min_tracking_confidence=0.5,
-        running_mode=mp_vision.RunningMode.IMAGE,
+        running_mode=running_mode,
     )
     landmarker = mp_vision.PoseLandmarker.create_from_options(options)
     print("✓ PoseLandmarker khởi tạo thành công")
     return landmarker
 
 
+def warm_up_pose_model(pose_model, size=256):
+    """Chạy một lần detect trên ảnh trống để khởi tạo graph trước request đầu tiên."""
+    blank = np.zeros((size, size, 3), dtype=np.uint8)
+    pose_model.detect(mp.Image(image_format=mp.ImageFormat.SRGB, data=blank))
+
+
 def _euclidean_distance(p1, p2):
     return np.sqrt((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2)
 
 
+def _classify_measurements(pixel_measurements, width_source=None):
+    """
+    Phân loại vóc dáng (shape_type, somatotype) từ số đo pixel.
+    width_source: measurements["width_source"]; "Oval" chỉ xét khi eo và hông
+    đều đo trên silhouette.
+    """
+    shp = pixel_measurements.get("shoulder_hip_ratio")
+    whr = pixel_measurements.get("waist_hip_ratio")
+    h_px = pixel_measurements.get("height", 0)
+    leg_px = pixel_measurements.get("leg_length", 0)
+    s_px = pixel_measurements.get("shoulder_width", 0)
+    source = width_source or {}
+    waist_measured = source.get("waist_width") == source.get("hip_width") == "silhouette"
+
+    def get_shape(s_h_r, w_h_r):
+        if not s_h_r or not w_h_r:
+            return None
+        # Eo rộng hơn hông: mỡ tập trung ở vùng bụng (dáng quả táo). Eo ước
+        # lượng từ landmark nội suy theo vai nên vai rộng cũng cho w_h_r > 1;
+        # chỉ tin eo đo trên silhouette, với vai xấp xỉ hông.
+        if waist_measured and w_h_r > 1.05 and abs(s_h_r - 1.0) <= 0.1:
+            return "Oval"
+        if s_h_r > 1.15 and w_h_r < 0.9:
+            return "Inverted Triangle"
+        if s_h_r < 0.9 and w_h_r >= 0.9:
+            return "Triangle"
+        if abs(s_h_r - 1.0) <= 0.1 and 0.9 <= w_h_r <= 1.05:
+            return "Rectangle"
+        return "Hourglass" if w_h_r < 0.85 else "Rectangle"
+
+    def get_soma(s, h, leg, w_h_r):
+        if not h:
+            return None
+        s_h = s / h
+        l_h = leg / h
+        if s_h < 0.23 and l_h > 0.53:
+            return "Ectomorph"
+        if 0.23 <= s_h <= 0.27 and 0.49 <= l_h <= 0.53:
+            return "Mesomorph"
+        return "Endomorph"
+
+    return {
+        "shape_type": get_shape(shp, whr),
+        "somatotype": get_soma(s_px, h_px, leg_px, whr),
+    }
+
+
 def _calculate_measurements_from_landmarks(
     landmarks_px,
     image_width,
     image_height,
     segmentation_mask=None,
     known_height_cm=None,
+    width_method="landmarks",
 ):
     """
     Tính toán số đo cơ thể từ danh sách tọa độ pixel.
     landmarks_px: list 33 tuple (x_px, y_px, visibility)
+    width_method="silhouette" đo độ rộng vai / eo / hông trên segmentation mask
+    (mp.Image hoặc mảng float, có thể nhỏ hơn ảnh gốc); mức nào không đo được
+    trên mask thì giữ ước lượng từ landmark.
     """
     measurements = {
         "pixel_measurements": {},
         "cm_measurements": {},
         "scale_cm_per_px": None,
         "confidence_flags": {},
+        "width_source": {},
     }
 
     try:
@@ -179,6 +256,23 @@ def _calculate_measurements_from_landmarks(
         else:
             measurements["confidence_flags"]["waist_width"] = False
 
+        for key in ("shoulder_width", "hip_width", "waist_width"):
+            if measurements["confidence_flags"][key]:
+                measurements["width_source"][key] = "landmarks"
+
+        # 3b. Độ rộng thật theo silhouette
+        if width_method == "silhouette" and segmentation_mask is not None:
+            mask = (
+                segmentation_mask.numpy_view()
+                if hasattr(segmentation_mask, "numpy_view")
+                else segmentation_mask
+            )
+            silhouette = Silhouette(mask, image_width, image_height)
+            for key, (width_px, points) in measure_widths(silhouette, landmarks_px).items():
+                measurements["pixel_measurements"][key] = width_px
+                measurements["draw_points"][key.split("_")[0]] = points
+                measurements["width_source"][key] = "silhouette"
+
         # 4. Height
         all_ys = [(lm_pt[1], lm_pt[2]) for lm_pt in landmarks_px]
         valid_ys = [y for y, vis in all_ys if vis > 0.5]
@@ -237,38 +331,9 @@ def _calculate_measurements_from_landmarks(
 
         # 8. Phân loại vóc dáng
         try:
-            shp = measurements["pixel_measurements"].get("shoulder_hip_ratio")
-            whr = measurements["pixel_measurements"].get("waist_hip_ratio")
-            h_px = measurements["pixel_measurements"].get("height", 0)
-            leg_px = measurements["pixel_measurements"].get("leg_length", 0)
-            s_px = measurements["pixel_measurements"].get("shoulder_width", 0)
-
-            def get_shape(s_h_r, w_h_r):
-                if not s_h_r or not w_h_r:
-                    return None
-                if s_h_r > 1.15 and w_h_r < 0.9:
-                    return "Inverted Triangle"
-                if s_h_r < 0.9 and w_h_r >= 0.9:
-                    return "Triangle"
-                if abs(s_h_r - 1.0) <= 0.1 and 0.9 <= w_h_r <= 1.05:
-                    return "Rectangle"
-                return "Hourglass" if w_h_r < 0.85 else "Rectangle"
-
-            def get_soma(s, h, leg, w_h_r):
-                if not h:
-                    return None
-                s_h = s / h
-                l_h = leg / h
-                if s_h < 0.23 and l_h > 0.53:
-                    return "Ectomorph"
-                if 0.23 <= s_h <= 0.27 and 0.49 <= l_h <= 0.53:
-                    return "Mesomorph"
-                return "Endomorph"
-
-            measurements["classifications"] = {
-                "shape_type": get_shape(shp, whr),
-                "somatotype": get_soma(s_px, h_px, leg_px, whr),
-            }
+            measurements["classifications"] = _classify_measurements(
+                measurements["pixel_measurements"], measurements["width_source"]
+            )
         except Exception:
             measurements["classifications"] = {}
 
@@ -303,12 +368,21 @@ def _draw_skeleton(image, landmarks_px):
     return image
 
 
-def draw_measurements_on_image(image, measurements, landmarks_px):
-    """Vẽ skeleton + các đường đo lên ảnh."""
-    annotated_img = image.copy()
+def draw_measurements_on_image(image, measurements, landmarks_px, scale=1.0, inplace=False):
+    """
+    Vẽ skeleton + các đường đo lên ảnh.
+    scale: tỉ lệ giữa ảnh vẽ và hệ tọa độ của landmarks (ảnh vẽ nhỏ hơn ảnh gốc).
+    inplace: vẽ thẳng lên `image` thay vì lên bản sao.
+    """
+    annotated_img = image if inplace else image.copy()
+
+    def to_px(pt):
+        return (int(pt[0] * scale), int(pt[1] * scale))
 
     # 1. Vẽ bộ xương 33 điểm (thay thế mp_drawing.draw_landmarks)
     if landmarks_px:
+        if scale != 1.0:
+            landmarks_px = [(x * scale, y * scale, vis) for x, y, vis in landmarks_px]
         _draw_skeleton(annotated_img, landmarks_px)
 
     # 2. Vẽ các đường đo kích thước
@@ -322,76 +396,210 @@ def draw_measurements_on_image(image, measurements, landmarks_px):
 
     for key, color in colors.items():
         if key in draw_pts:
-            pts = draw_pts[key]
-            cv2.line(
-                annotated_img,
-                (int(pts[0][0]), int(pts[0][1])),
-                (int(pts[1][0]), int(pts[1][1])),
-                color,
-                3,
-            )
+            p0, p1 = to_px(draw_pts[key][0]), to_px(draw_pts[key][1])
+            cv2.line(annotated_img, p0, p1, color, 3)
             if key in ["shoulder", "hip", "waist"]:
-                cv2.circle(
-                    annotated_img, (int(pts[0][0]), int(pts[0][1])), 6, color, -1
-                )
-                cv2.circle(
-                    annotated_img, (int(pts[1][0]), int(pts[1][1])), 6, color, -1
-                )
+                cv2.circle(annotated_img, p0, 6, color, -1)
+                cv2.circle(annotated_img, p1, 6, color, -1)
 
     return annotated_img
 
 
-def analyze_pose_with_model(pose_model, image, known_height_cm=None):
-    """Phân tích ảnh bằng MediaPipe PoseLandmarker (Tasks API)."""
-    height, width = image.shape[:2]
+def detect_poses(pose_model, image, timestamp_ms=None, output_size=None):
+    """
+    Chạy PoseLandmarker trên ảnh BGR.
+    Với landmarker ở chế độ VIDEO, truyền timestamp_ms (tăng dần) để dùng
+    detect_for_video và tận dụng tracking giữa các frame.
+    output_size=(width, height): hệ tọa độ pixel của landmarks trả về, dùng khi
+    `image` là bản thu nhỏ của ảnh gốc (mặc định là kích thước của `image`).
+    Trả về (people, result): landmarks_px của mọi người phát hiện được (list
+    rỗng nếu không thấy ai), cùng thứ tự với result.segmentation_masks.
+    """
+    width, height = output_size or (image.shape[1], image.shape[0])
 
     image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
     mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=image_rgb)
 
-    result = pose_model.detect(mp_image)
-
-    if not result.pose_landmarks or len(result.pose_landmarks) == 0:
-        return None, None, None
+    with timed("detect"):
+        if timestamp_ms is None:
+            result = pose_model.detect(mp_image)
+        else:
+            result = pose_model.detect_for_video(mp_image, int(timestamp_ms))
 
     # Chuyển normalized landmarks sang pixel coordinates
-    pose_lms = result.pose_landmarks[0]
-    landmarks_px = [
-        (
-            lm.x * width,
-            lm.y * height,
-            lm.visibility if hasattr(lm, "visibility") else 0.9,
-        )
-        for lm in pose_lms
+    people = [
+        [
+            (
+                lm.x * width,
+                lm.y * height,
+                lm.visibility if hasattr(lm, "visibility") else 0.9,
+            )
+            for lm in pose_lms
+        ]
+        for pose_lms in result.pose_landmarks or []
     ]
+    return people, result
 
-    # Tính số đo
-    measurements = _calculate_measurements_from_landmarks(
-        landmarks_px,
-        width,
-        height,
-        segmentation_mask=result.segmentation_masks[0]
-        if result.segmentation_masks
-        else None,
-        known_height_cm=known_height_cm,
+
+def rank_people(people):
+    """
+    Thứ tự người trong ảnh, người có khung bao (landmark nhìn thấy) lớn nhất
+    đứng đầu, cùng khung bao của từng người.
+    Trả về (order, bboxes): order là chỉ số trong `people`; bboxes[i] là
+    [x0, y0, x1, y1] của people[i], None nếu không có landmark nào nhìn thấy.
+    """
+    lm = np.asarray(people, dtype=np.float64).reshape(len(people), -1, 3)
+    visible = lm[..., 2] > 0.5
+    x0 = np.where(visible, lm[..., 0], np.inf).min(axis=1)
+    x1 = np.where(visible, lm[..., 0], -np.inf).max(axis=1)
+    y0 = np.where(visible, lm[..., 1], np.inf).min(axis=1)
+    y1 = np.where(visible, lm[..., 1], -np.inf).max(axis=1)
+    area = np.where(visible.any(axis=1), (x1 - x0) * (y1 - y0), 0.0)
+    order = [int(i) for i in np.argsort(-area, kind="stable")]
+    bboxes = [
+        [round(float(v), 1) for v in (x0[i], y0[i], x1[i], y1[i])]
+        if np.isfinite(x0[i]) else None
+        for i in range(len(people))
+    ]
+    return order, bboxes
+
+
+def detect_pose(pose_model, image, timestamp_ms=None, output_size=None):
+    """
+    detect_poses() cho một người: trả về (landmarks_px, result) của người lớn
+    nhất (rank_people), landmarks_px là None nếu không thấy người.
+    """
+    people, result = detect_poses(pose_model, image, timestamp_ms, output_size)
+    if not people:
+        return None, result
+    return people[rank_people(people)[0][0]], result
+
+
+def _measure_people(people, masks, width, height, known_height_cm=None,
+                    width_method="landmarks"):
+    """
+    Số đo cho nhiều người trong cùng một ảnh, tính vector hóa trên (N, 33, 3).
+    Người lớn nhất (rank_people) đứng đầu và là người được gán
+    known_height_cm; những người khác chỉ có số đo pixel.
+    Trả về (measurements, people, masks) đã sắp theo thứ tự đó; mỗi
+    measurements có thêm "bbox" [x0, y0, x1, y1].
+    """
+    from core.batch import calculate_measurements_batch  # core.batch imports this module
+
+    order, bboxes = rank_people(people)
+    lm = np.asarray(people, dtype=np.float64)[order]
+    people = [people[i] for i in order]
+    masks = [masks[i] for i in order] if masks else []
+
+    width_overrides = None
+    if width_method == "silhouette" and masks:
+        width_overrides = [
+            measure_widths(
+                Silhouette(
+                    mask.numpy_view() if hasattr(mask, "numpy_view") else mask, width, height
+                ),
+                landmarks_px,
+            )
+            for mask, landmarks_px in zip(masks, people)
+        ]
+    heights = [known_height_cm] + [None] * (len(people) - 1)
+    everyone = calculate_measurements_batch(lm, heights, width_overrides)
+
+    for m, i in zip(everyone, order):
+        m["bbox"] = bboxes[i]
+    return everyone, people, masks
+
+
+def analyze_pose_with_model(
+    pose_model,
+    image,
+    known_height_cm=None,
+    original_size=None,
+    inference_max_side=None,
+    output_max_side=None,
+    render_inplace=False,
+    render="overlay",
+    width_method="landmarks",
+):
+    """
+    Phân tích ảnh bằng MediaPipe PoseLandmarker (Tasks API).
+
+    `image` có thể đã được giải mã ở độ phân giải thấp hơn ảnh gốc; khi đó
+    original_size=(width, height) của ảnh gốc để số đo vẫn tính theo pixel gốc.
+    Model chạy trên bản thu nhỏ còn `inference_max_side`, ảnh kết quả được vẽ ở
+    `output_max_side` (None = giữ nguyên kích thước `image`).
+    render_inplace=True cho phép vẽ thẳng lên `image` khi caller không cần giữ ảnh.
+    render: "overlay" (skeleton + segmentation), "skeleton" (không overlay) hoặc
+    "none" (chỉ số đo, annotated_image là None).
+    width_method: xem _calculate_measurements_from_landmarks; "silhouette" cần
+    model có bật segmentation.
+
+    Mọi người trong ảnh được đo từ cùng một lần chạy model: measurements là
+    của người lớn nhất (xem rank_people), kèm measurements["bbox"] và
+    measurements["people"] = số đo từng người (không có draw_points), luôn có
+    mặt kể cả khi chỉ có một người.
+    """
+    width, height = original_size or (image.shape[1], image.shape[0])
+
+    people, result = detect_poses(
+        pose_model, fit_max_side(image, inference_max_side), output_size=(width, height)
     )
+    if not people:
+        return None, None, None
+    masks = result.segmentation_masks or []
 
-    # Vẽ ảnh với skeleton + đường đo
-    annotated_image = draw_measurements_on_image(image, measurements, landmarks_px)
-
-    # Overlay segmentation mask
-    if result.segmentation_masks:
-        seg_mask = result.segmentation_masks[0].numpy_view().squeeze()
-        condition = np.stack((seg_mask,) * 3, axis=-1) > 0.3
-        bg_image = np.zeros(image.shape, dtype=np.uint8)
-        bg_image[:] = (200, 150, 50)
-        annotated_image = np.where(
-            condition,
-            cv2.addWeighted(annotated_image, 0.7, bg_image, 0.3, 0),
-            annotated_image,
-        )
+    # Tính số đo
+    with timed("measure"):
+        if len(people) == 1:
+            everyone = [_calculate_measurements_from_landmarks(
+                people[0],
+                width,
+                height,
+                segmentation_mask=masks[0] if masks else None,
+                known_height_cm=known_height_cm,
+                width_method=width_method,
+            )]
+            everyone[0]["bbox"] = rank_people(people)[1][0]
+        else:
+            everyone, people, masks = _measure_people(
+                people, masks, width, height, known_height_cm, width_method
+            )
+        measurements = dict(everyone[0])
+        measurements["people"] = [
+            {k: v for k, v in m.items() if k != "draw_points"} for m in everyone
+        ]
 
     ratio = None
     if measurements["confidence_flags"].get("shoulder_hip_ratio"):
         ratio = measurements["pixel_measurements"]["shoulder_hip_ratio"]
 
+    if render == "none":
+        return None, ratio, measurements
+
+    # Vẽ ảnh với skeleton + đường đo
+    # fit_max_side trả về ảnh mới khi phải thu nhỏ, khi đó không cần copy nữa.
+    with timed("draw"):
+        canvas = fit_max_side(image, output_max_side)
+        scale = canvas.shape[1] / width
+        annotated_image = draw_measurements_on_image(
+            canvas,
+            everyone[0],
+            people[0],
+            scale=scale,
+            inplace=render_inplace or canvas is not image,
+        )
+        for person_measurements, landmarks_px in zip(everyone[1:], people[1:]):
+            draw_measurements_on_image(
+                annotated_image, person_measurements, landmarks_px, scale=scale, inplace=True
+            )
+
+    # Overlay segmentation mask, một màu cho mỗi người
+    if render == "overlay" and masks:
+        with timed("overlay"):
+            for i, mask in enumerate(masks):
+                overlay_segmentation(
+                    annotated_image, mask.numpy_view().squeeze(),
+                    color=PERSON_COLORS[i % len(PERSON_COLORS)],
+                )
+
     return annotated_image, ratio, measurements
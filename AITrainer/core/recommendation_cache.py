@@ -0,0 +1,66 @@
+# core/recommendation_cache.py
+# Reuse validated LLM recommendations across bodies with near-identical proportions.
+import copy
+
+from core.cache import LRUCache
+
+
+def _quantize(value, step):
+    if value is None:
+        return None
+    return round(round(float(value) / step) * step, 4)
+
+
+class RecommendationCache:
+    """
+    TTL + LRU cache of recommendation dicts.
+
+    The key is (shoulder_hip_ratio, waist_hip_ratio) snapped to a grid of
+    `step`, plus the shape/somatotype classification and the unit. Bodies that
+    land in the same cell get the same validated recommendation. Per-request
+    fields (`measurements`, `unit`, `llm_usage`) are stripped before storing;
+    the caller re-attaches measurements and unit.
+    """
+
+    REQUEST_FIELDS = ("measurements", "unit", "llm_usage")
+
+    def __init__(self, max_entries: int, ttl: float, step: float = 0.05):
+        self.step = step
+        self._lru = LRUCache(max_entries=max_entries, ttl=ttl)
+
+    def key_for(self, measurements_data: dict, unit: str):
+        """Return the cache key, or None when the ratios needed for it are missing."""
+        px = measurements_data.get("pixel_measurements") or {}
+        shr = px.get("shoulder_hip_ratio")
+        whr = px.get("waist_hip_ratio")
+        if shr is None or whr is None:
+            return None
+        classes = measurements_data.get("classifications") or {}
+        return (
+            _quantize(shr, self.step),
+            _quantize(whr, self.step),
+            classes.get("shape_type"),
+            classes.get("somatotype"),
+            unit,
+        )
+
+    def get(self, key):
+        if key is None:
+            return None
+        cached = self._lru.get(key)
+        return copy.deepcopy(cached) if cached is not None else None
+
+    def put(self, key, recommendations: dict):
+        if key is None:
+            return
+        stored = {
+            k: copy.deepcopy(v)
+            for k, v in recommendations.items()
+            if k not in self.REQUEST_FIELDS
+        }
+        self._lru.put(key, stored)
+
+    def stats(self) -> dict:
+        stats = self._lru.stats()
+        stats["step"] = self.step
+        return stats
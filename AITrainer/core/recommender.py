@@ -0,0 +1,238 @@
+# core/recommender.py
+# Rule-based exercise recommender: deterministic, in-process, no network.
+from core.catalog import BUILTIN
+
+RECOMMENDATION_COUNT = 6
+
+# Focus weights per muscle group for each body shape. Groups that are missing
+# get DEFAULT_GROUP_WEIGHT.
+SHAPE_FOCUS = {
+    # Broad shoulders, narrow hips: build the lower body, hold back on delts.
+    "Inverted Triangle": {
+        "glutes": 1.0, "quads": 0.9, "hamstrings": 0.85, "core": 0.6,
+        "calves": 0.45, "back": 0.4, "chest": 0.3, "shoulders": 0.1, "traps": 0.05,
+    },
+    # Hips wider than shoulders: widen the upper body.
+    "Triangle": {
+        "shoulders": 1.0, "back": 0.95, "chest": 0.75, "core": 0.5,
+        "triceps": 0.4, "biceps": 0.35, "glutes": 0.25, "quads": 0.2,
+    },
+    # Straight silhouette: shoulders + glutes + obliques to create a waist.
+    "Rectangle": {
+        "shoulders": 0.85, "glutes": 0.85, "back": 0.7, "core": 0.7,
+        "chest": 0.6, "quads": 0.55, "hamstrings": 0.5,
+    },
+    # Balanced proportions: keep it balanced.
+    "Hourglass": {
+        "quads": 0.8, "back": 0.8, "glutes": 0.75, "shoulders": 0.7,
+        "chest": 0.65, "hamstrings": 0.6, "core": 0.5,
+    },
+    # Weight around the midsection: conditioning + big muscle groups.
+    "Oval": {
+        "full-body": 1.0, "core": 0.9, "quads": 0.8, "glutes": 0.7,
+        "back": 0.7, "hamstrings": 0.6, "chest": 0.5,
+    },
+}
+
+BALANCED_FOCUS = {
+    "quads": 0.8, "back": 0.8, "chest": 0.75, "shoulders": 0.65,
+    "glutes": 0.65, "hamstrings": 0.6, "core": 0.55,
+}
+
+DEFAULT_GROUP_WEIGHT = 0.15
+
+# Multipliers applied on top of the shape focus.
+SOMATOTYPE_MODIFIERS = {
+    # Hard gainers: heavy compound work on large groups, little conditioning.
+    "Ectomorph": {
+        "chest": 1.2, "back": 1.2, "quads": 1.2, "hamstrings": 1.15,
+        "full-body": 0.5, "calves": 0.7, "forearms": 0.7,
+    },
+    "Mesomorph": {},
+    # Favour calorie-hungry conditioning and large muscle groups.
+    "Endomorph": {
+        "full-body": 1.4, "core": 1.1, "quads": 1.1, "glutes": 1.1,
+        "forearms": 0.6, "calves": 0.7, "biceps": 0.8,
+    },
+}
+
+# Each pick from the same muscle group multiplies that group's next score by
+# this factor, so a plan covers several groups instead of six chest moves.
+REPEAT_PENALTY = 0.45
+
+# With an equipment list, exercises needing anything else are scaled by this
+# weight: they only come up when too few matching ones are left. 0 drops them.
+# Body-weight moves and untagged ones are always available.
+MISSING_EQUIPMENT_WEIGHT = 0.05
+ALWAYS_AVAILABLE = {None, "body-weight"}
+
+
+def parse_equipment(value):
+    """
+    'dumbbell, cable' -> frozenset({'dumbbell', 'cable'}); empty/None -> None
+    (no filter). A frozenset is taken as already parsed.
+    """
+    if isinstance(value, frozenset):
+        return value
+    if not value:
+        return None
+    items = value.split(",") if isinstance(value, str) else value
+    slugs = frozenset(item.strip().lower() for item in items if item and item.strip())
+    return slugs or None
+
+
+def known_equipment(value, catalog=BUILTIN):
+    """
+    parse_equipment() limited to the slugs `catalog` tags exercises with;
+    the others cannot match anything. Use it before equipment becomes part
+    of a memo or cache key, so client input cannot grow them. A list of only
+    unknown slugs gives frozenset(): body-weight moves only.
+    """
+    equipment = parse_equipment(value)
+    return None if equipment is None else equipment & catalog.equipment
+
+
+def rank_exercises(shape_type=None, somatotype=None, catalog=BUILTIN, equipment=None,
+                   equipment_weight=MISSING_EQUIPMENT_WEIGHT):
+    """
+    Return every exercise ID of `catalog` with its base score, best first.
+    `equipment` (equipment slugs as for parse_equipment, None = everything)
+    down-weights exercises that need anything else by `equipment_weight`.
+    """
+    equipment = parse_equipment(equipment)
+    focus = SHAPE_FOCUS.get(shape_type, BALANCED_FOCUS)
+    modifiers = SOMATOTYPE_MODIFIERS.get(somatotype, {})
+    scored = []
+    for order, (eid, _, _) in enumerate(catalog.rows):
+        group, needs = catalog.tags[eid]
+        score = focus.get(group, DEFAULT_GROUP_WEIGHT) * modifiers.get(group, 1.0)
+        if equipment is not None and needs not in ALWAYS_AVAILABLE and needs not in equipment:
+            if not equipment_weight:
+                continue
+            score *= equipment_weight
+        # Earlier rows are the more established exercises; tiny tie-breaker.
+        scored.append((score - order * 1e-6, eid, group))
+    scored.sort(reverse=True)
+    return scored
+
+
+def recommend_exercise_ids(shape_type=None, somatotype=None, count=RECOMMENDATION_COUNT,
+                           catalog=BUILTIN, equipment=None,
+                           equipment_weight=MISSING_EQUIPMENT_WEIGHT):
+    """Pick `count` exercise IDs, spreading them across muscle groups."""
+    candidates = rank_exercises(shape_type, somatotype, catalog, equipment, equipment_weight)
+    picked = []
+    group_counts = {}
+    while candidates and len(picked) < count:
+        best_idx = max(
+            range(len(candidates)),
+            key=lambda i: candidates[i][0] * REPEAT_PENALTY ** group_counts.get(candidates[i][2], 0),
+        )
+        _, eid, group = candidates.pop(best_idx)
+        picked.append(eid)
+        group_counts[group] = group_counts.get(group, 0) + 1
+    return picked
+
+
+def shortlist_exercise_ids(shape_type=None, somatotype=None, size=24, catalog=BUILTIN,
+                           equipment=None):
+    """
+    The `size` best-scoring exercise IDs for a classification, in catalogue
+    order: the candidates offered to the LLM instead of the whole catalogue.
+    Always contains the local picks. size <= 0 returns every ID (every ID
+    the equipment allows, when given). Cached on the catalogue snapshot.
+    """
+    equipment = known_equipment(equipment, catalog)
+
+    def build():
+        if equipment is None and (size <= 0 or size >= len(catalog)):
+            return tuple(row[0] for row in catalog.rows)
+        chosen = set(recommend_exercise_ids(
+            shape_type, somatotype, catalog=catalog, equipment=equipment,
+        ))
+        ranked = rank_exercises(shape_type, somatotype, catalog, equipment, equipment_weight=0)
+        for _, eid, _ in ranked:
+            if 0 < size <= len(chosen):
+                break
+            chosen.add(eid)
+        return tuple(row[0] for row in catalog.rows if row[0] in chosen)
+
+    return catalog.memo(("shortlist", shape_type, somatotype, size, equipment), build)
+
+
+# ─── Narrative templates ─────────────────────────────────────────────────────
+
+SHAPE_LABELS_VI = {
+    "Inverted Triangle": "Dáng tam giác ngược",
+    "Triangle": "Dáng tam giác (quả lê)",
+    "Rectangle": "Dáng chữ nhật",
+    "Hourglass": "Dáng đồng hồ cát",
+    "Oval": "Dáng tròn (quả táo)",
+}
+
+SHAPE_ANALYSIS_VI = {
+    "Inverted Triangle": "Vai rộng hơn hông đáng kể, phần thân trên chiếm ưu thế. Nên tập trung phát triển thân dưới để cân đối tỷ lệ cơ thể.",
+    "Triangle": "Hông rộng hơn vai, phần thân dưới chiếm ưu thế. Nên tăng cường vai và lưng để mở rộng thân trên.",
+    "Rectangle": "Vai, eo và hông có độ rộng tương đương nhau. Nên phát triển vai và mông đồng thời siết cơ bụng để tạo đường cong eo.",
+    "Hourglass": "Vai và hông cân đối, eo thon rõ rệt. Nên duy trì chương trình tập toàn thân cân bằng.",
+    "Oval": "Vòng eo là vùng tích mỡ chính. Nên ưu tiên các bài tập đốt năng lượng cao kết hợp nhóm cơ lớn.",
+}
+
+SOMATOTYPE_NUTRITION_VI = {
+    "Ectomorph": "Ăn dư khoảng 300-500 kcal mỗi ngày, ưu tiên tinh bột phức và 1.6-2 g protein/kg cân nặng.",
+    "Mesomorph": "Ăn ở mức duy trì, chia đều protein, tinh bột và chất béo tốt trong các bữa.",
+    "Endomorph": "Thâm hụt nhẹ 300-500 kcal mỗi ngày, giảm tinh bột tinh chế, tăng rau xanh và protein nạc.",
+}
+
+SOMATOTYPE_LIFESTYLE_VI = {
+    "Ectomorph": "Ngủ đủ 7-9 tiếng, hạn chế cardio cường độ cao để giữ năng lượng cho việc tăng cơ.",
+    "Mesomorph": "Tập đều đặn 4-5 buổi mỗi tuần và theo dõi tiến độ để tăng dần mức tạ.",
+    "Endomorph": "Đi bộ 8.000-10.000 bước mỗi ngày, kết hợp 2-3 buổi cardio nhẹ mỗi tuần.",
+}
+
+SOMATOTYPE_TIMELINE = {
+    "Ectomorph": "12-16 tuần",
+    "Mesomorph": "8-12 tuần",
+    "Endomorph": "12-16 tuần",
+}
+
+
+def local_narrative(shape_type=None, somatotype=None) -> dict:
+    """Vietnamese text fields matching the LLM response schema."""
+    label = SHAPE_LABELS_VI.get(shape_type, "Vóc dáng cân đối")
+    return {
+        "body_type": label,
+        "body_analysis": SHAPE_ANALYSIS_VI.get(
+            shape_type, "Các số đo cơ thể tương đối cân đối. Nên tập luyện toàn thân để duy trì vóc dáng."
+        ),
+        "title": f"Kế hoạch tập luyện cho {label.lower()}",
+        "nutrition_advice": SOMATOTYPE_NUTRITION_VI.get(
+            somatotype, "Ăn đủ protein, nhiều rau xanh và uống đủ nước mỗi ngày."
+        ),
+        "lifestyle_tips": SOMATOTYPE_LIFESTYLE_VI.get(
+            somatotype, "Ngủ đủ giấc và duy trì lịch tập đều đặn."
+        ),
+        "estimated_timeline": SOMATOTYPE_TIMELINE.get(somatotype, "8-12 tuần"),
+    }
+
+
+def local_recommendations(measurements_data: dict, catalog=BUILTIN, equipment=None,
+                          equipment_weight=MISSING_EQUIPMENT_WEIGHT) -> dict:
+    """
+    Full recommendation dict (same shape as the LLM output) built from the
+    classification computed by _calculate_measurements_from_landmarks.
+    `equipment` lists what the user has (see parse_equipment).
+    """
+    classes = measurements_data.get("classifications") or {}
+    shape_type = classes.get("shape_type")
+    somatotype = classes.get("somatotype")
+    recommendations = {
+        "shape_type": shape_type,
+        "somatotype": somatotype,
+        "exercise_ids": recommend_exercise_ids(
+            shape_type, somatotype, catalog=catalog, equipment=equipment,
+            equipment_weight=equipment_weight,
+        ),
+    }
+    recommendations.update(local_narrative(shape_type, somatotype))
+    return recommendations
@@ -0,0 +1,98 @@
+# core/recording.py
+# Pose detections saved for offline replay: landmarks and masks in one .npz.
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+class Recording:
+    """One recorded detection: what _calculate_measurements_from_landmarks needs."""
+
+    __slots__ = ("name", "landmarks", "size", "mask", "known_height_cm")
+
+    def __init__(self, name, landmarks, size, mask=None, known_height_cm=None):
+        self.name = name
+        self.landmarks = landmarks          # (33, 3) float32: x_px, y_px, visibility
+        self.size = size                    # (width, height) of the original image
+        self.mask = mask                    # (H, W) uint8, 0-255, or None
+        self.known_height_cm = known_height_cm
+
+    def landmarks_px(self):
+        return [tuple(map(float, point)) for point in self.landmarks]
+
+    def segmentation_mask(self):
+        """Float32 mask in [0, 1] like MediaPipe's, or None."""
+        return None if self.mask is None else self.mask.astype(np.float32) / 255.0
+
+
+class RecordingWriter:
+    """
+    Collects detections and writes them as one compressed .npz:
+
+        names (N,) str, landmarks (N, 33, 3) float32, sizes (N, 2) int32,
+        known_height_cm (N,) float32 (NaN = unknown), mask_shapes (N, 2) int32
+        ((0, 0) = no mask) and masks: every mask as uint8, concatenated.
+
+    Masks are quantized to 8 bits; that is below the threshold noise of the
+    silhouette widths, and mostly-binary masks compress to a few kB each.
+    """
+
+    def __init__(self):
+        self._names = []
+        self._landmarks = []
+        self._sizes = []
+        self._heights = []
+        self._shapes = []
+        self._masks = []
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name, landmarks_px, size, segmentation_mask=None, known_height_cm=None):
+        """segmentation_mask: mp.Image or float array in [0, 1], any resolution."""
+        if segmentation_mask is not None:
+            if hasattr(segmentation_mask, "numpy_view"):
+                segmentation_mask = segmentation_mask.numpy_view()
+            mask = np.asarray(segmentation_mask, dtype=np.float32).squeeze()
+            mask = (np.clip(mask, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+            self._shapes.append(mask.shape)
+            self._masks.append(mask.ravel())
+        else:
+            self._shapes.append((0, 0))
+        self._names.append(str(name))
+        self._landmarks.append(np.asarray(landmarks_px, dtype=np.float32).reshape(33, 3))
+        self._sizes.append(tuple(size))
+        self._heights.append(np.nan if known_height_cm is None else known_height_cm)
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            version=np.int32(FORMAT_VERSION),
+            names=np.array(self._names),
+            landmarks=np.stack(self._landmarks) if self._landmarks else np.empty((0, 33, 3), np.float32),
+            sizes=np.array(self._sizes, dtype=np.int32).reshape(-1, 2),
+            known_height_cm=np.array(self._heights, dtype=np.float32),
+            mask_shapes=np.array(self._shapes, dtype=np.int32).reshape(-1, 2),
+            masks=np.concatenate(self._masks) if self._masks else np.empty(0, np.uint8),
+        )
+
+
+def load_recordings(path):
+    """Recordings from a RecordingWriter file; masks are views into one buffer."""
+    with np.load(path, allow_pickle=False) as data:
+        version = int(data["version"])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path}: recording format {version}, expected {FORMAT_VERSION}")
+        names, landmarks, sizes = data["names"], data["landmarks"], data["sizes"]
+        heights, shapes, masks = data["known_height_cm"], data["mask_shapes"], data["masks"]
+
+    ends = np.cumsum(shapes[:, 0].astype(np.int64) * shapes[:, 1])
+    recordings = []
+    for i in range(len(names)):
+        h, w = shapes[i]
+        mask = masks[ends[i] - h * w:ends[i]].reshape(h, w) if h and w else None
+        recordings.append(Recording(
+            str(names[i]), landmarks[i], (int(sizes[i, 0]), int(sizes[i, 1])), mask,
+            None if np.isnan(heights[i]) else float(heights[i]),
+        ))
+    return recordings
@@ -0,0 +1,77 @@
+# core/render.py
+# Segmentation overlay composited in place, bounded to the mask's bounding box.
+import threading
+
+import cv2
+import numpy as np
+
+OVERLAY_COLOR = (200, 150, 50)
+OVERLAY_ALPHA = 0.3
+MASK_THRESHOLD = 0.3
+
+_scratch = threading.local()
+
+
+def _scratch_view(name: str, shape):
+    """
+    Per-thread reusable uint8 buffer viewed as `shape`. Grows on demand, so
+    after the first few requests the overlay allocates nothing full-frame.
+    """
+    size = int(np.prod(shape))
+    buf = getattr(_scratch, name, None)
+    if buf is None or buf.size < size:
+        buf = np.empty(size, dtype=np.uint8)
+        setattr(_scratch, name, buf)
+    return buf[:size].reshape(shape)
+
+
+def _mask_roi(seg_mask, canvas_shape, threshold):
+    """
+    Threshold the float mask to a 0/1 uint8 mask and return
+    (mask, (x0, y0, x1, y1)) in canvas coordinates, with `mask` covering only
+    that box. When the mask is
+    smaller than the canvas only the box is resized. Returns (None, None)
+    when nothing is above the threshold.
+    """
+    mask = np.greater(seg_mask, threshold).view(np.uint8)
+    x, y, w, h = cv2.boundingRect(mask)
+    if w == 0 or h == 0:
+        return None, None
+
+    canvas_h, canvas_w = canvas_shape[:2]
+    mask_h, mask_w = mask.shape[:2]
+    if (mask_h, mask_w) == (canvas_h, canvas_w):
+        return mask[y:y + h, x:x + w], (x, y, x + w, y + h)
+
+    sx, sy = canvas_w / mask_w, canvas_h / mask_h
+    x0, y0 = int(x * sx), int(y * sy)
+    x1 = min(canvas_w, int(np.ceil((x + w) * sx)))
+    y1 = min(canvas_h, int(np.ceil((y + h) * sy)))
+    # Resize 0/255 and re-threshold: same edge as resizing the float mask.
+    roi = cv2.resize(mask[y:y + h, x:x + w] * 255, (x1 - x0, y1 - y0),
+                     interpolation=cv2.INTER_LINEAR)
+    return (roi >= 128).view(np.uint8), (x0, y0, x1, y1)
+
+
+def overlay_segmentation(image, seg_mask, color=OVERLAY_COLOR, alpha=OVERLAY_ALPHA,
+                         threshold=MASK_THRESHOLD):
+    """
+    Tint the pixels where seg_mask > threshold, in place:
+    image = image * (1 - alpha) + color * alpha inside the mask.
+
+    Pixel-identical to the former np.where/addWeighted composite for a
+    same-size mask, but only the mask's bounding box is touched and the
+    temporaries are per-thread scratch buffers. Returns `image`.
+    """
+    mask, box = _mask_roi(seg_mask, image.shape, threshold)
+    if mask is None:
+        return image
+    x0, y0, x1, y1 = box
+    roi = image[y0:y1, x0:x1]
+
+    tint = _scratch_view("tint", roi.shape)
+    tint[:] = color
+    blended = _scratch_view("blend", roi.shape)
+    cv2.addWeighted(roi, 1.0 - alpha, tint, alpha, 0, dst=blended)
+    np.copyto(roi, blended, where=mask.view(np.bool_)[..., None])
+    return image
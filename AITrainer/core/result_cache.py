@@ -0,0 +1,178 @@
+# core/result_cache.py
+# Content-addressed cache of pose analysis results for repeated uploads.
+import copy
+import hashlib
+import json
+import os
+import threading
+
+from core.cache import LRUCache
+
+
+def content_key(contents: bytes, *params) -> str:
+    """sha256 of the uploaded bytes, suffixed with the analysis parameters."""
+    digest = hashlib.sha256(contents).hexdigest()
+    suffix = ":".join("" if p is None else str(p) for p in params)
+    return f"{digest}:{suffix}" if params else digest
+
+
+# Pruning goes down to this share of disk_max_bytes, so a full cache is not
+# rescanned on every following write.
+DISK_PRUNE_TARGET = 0.9
+
+
+def _file_size(path) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _entry_size(entry) -> int:
+    measurements, annotated = entry
+    # measurements dict is tiny next to the image; measurements-only entries have none
+    return (annotated.nbytes if annotated is not None else 0) + 4096
+
+
+class ResultCache:
+    """
+    Maps content_key -> (measurements, annotated_image). annotated_image may
+    be None for measurements-only analyses.
+
+    The memory tier is an LRU bounded by total image bytes. When `disk_dir` is
+    set, entries are also written there as `<hash>.json` + `<hash>.png` and
+    looked up on a memory miss, so results survive restarts. Writes keep a
+    running total of the disk tier's size (one directory scan, on the first
+    write); only when it passes `disk_max_bytes` is the directory scanned and
+    pruned oldest-first, down to DISK_PRUNE_TARGET of the limit.
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: str = None, disk_max_bytes: int = None):
+        self._memory = LRUCache(max_bytes=max_bytes, sizeof=_entry_size)
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._disk_lock = threading.Lock()
+        self._disk_bytes = None  # unknown until the first write
+        self.disk_hits = 0
+        self.disk_writes = 0
+        self.disk_prunes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_paths(self, key):
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return (
+            os.path.join(self.disk_dir, name + ".json"),
+            os.path.join(self.disk_dir, name + ".png"),
+        )
+
+    def get(self, key):
+        """Return (measurements, annotated_image) or None. May touch disk."""
+        entry = self._memory.get(key)
+        if entry is None and self.disk_dir:
+            entry = self._read_disk(key)
+            if entry is not None:
+                self.disk_hits += 1
+                self._memory.put(key, entry)
+        if entry is None:
+            return None
+        measurements, annotated = entry
+        return copy.deepcopy(measurements), annotated
+
+    def put(self, key, measurements, annotated_image):
+        entry = (copy.deepcopy(measurements), annotated_image)
+        self._memory.put(key, entry)
+        if self.disk_dir:
+            self._write_disk(key, entry)
+
+    def _read_disk(self, key):
+        import cv2  # only needed for the disk tier; keeps `import api` light
+
+        json_path, png_path = self._disk_paths(key)
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                measurements = json.load(f)
+            annotated = None
+            if measurements.pop("_has_image", True):
+                annotated = cv2.imread(png_path, cv2.IMREAD_COLOR)
+                if annotated is None:
+                    return None
+        except (OSError, ValueError):
+            return None
+        for path in (json_path, png_path) if annotated is not None else (json_path,):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return measurements, annotated
+
+    def _write_disk(self, key, entry):
+        import cv2
+
+        measurements, annotated = entry
+        json_path, png_path = self._disk_paths(key)
+        payload = json.dumps(
+            {**measurements, "_has_image": annotated is not None}, ensure_ascii=False
+        ).encode("utf-8")
+        replaced = _file_size(json_path) + _file_size(png_path)
+        written = len(payload)
+        try:
+            if annotated is not None:
+                ok, buf = cv2.imencode(".png", annotated)
+                if not ok:
+                    return
+                # Image first: a JSON file without its PNG is treated as a miss.
+                with open(png_path, "wb") as f:
+                    f.write(buf.tobytes())
+                written += buf.nbytes
+            with open(json_path, "wb") as f:
+                f.write(payload)
+        except OSError as e:
+            print(f"[Cache] disk write failed: {e}")
+            return
+        self.disk_writes += 1
+        if not self.disk_max_bytes:
+            return
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._scan_disk())
+            else:
+                self._disk_bytes += written - replaced
+            due = self._disk_bytes > self.disk_max_bytes
+        if due:
+            self._prune_disk()
+
+    def _scan_disk(self):
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.is_file():
+                st = entry.stat()
+                files.append((st.st_mtime, st.st_size, entry.path))
+        return files
+
+    def _prune_disk(self):
+        with self._disk_lock:
+            files = sorted(self._scan_disk())
+            total = sum(size for _, size, _ in files)
+            target = self.disk_max_bytes * DISK_PRUNE_TARGET
+            for _, size, path in files:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            self._disk_bytes = total
+            self.disk_prunes += 1
+
+    def stats(self) -> dict:
+        stats = self._memory.stats()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + self.disk_hits) / lookups, 4) if lookups else 0.0
+        stats["disk_enabled"] = bool(self.disk_dir)
+        stats["disk_hits"] = self.disk_hits
+        stats["disk_writes"] = self.disk_writes
+        stats["disk_bytes"] = self._disk_bytes
+        stats["disk_prunes"] = self.disk_prunes
+        return stats
@@ -0,0 +1,105 @@
+# core/silhouette.py
+# Body widths measured on the segmentation mask instead of landmark fudge factors.
+import numpy as np
+
+LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP = 11, 12, 23, 24
+WAIST_RATIO = 0.45  # same interpolation as _calculate_measurements_from_landmarks
+
+# A silhouette width is trusted only within these bounds relative to the
+# landmark-to-landmark distance; outside them (arm merged into the torso,
+# mask hole at the centre) the landmark estimate is kept.
+MIN_WIDTH_FACTOR = 1.0
+MAX_WIDTH_FACTOR = 2.0
+
+
+class Silhouette:
+    """
+    Row-run lookup table over a segmentation mask.
+
+    For every mask pixel it precomputes the nearest background column to the
+    left and to the right (two vectorized accumulate passes), so the width
+    of the body run crossing any point is an O(1) lookup. Coordinates in and
+    out are in image pixels; the mask may be at a lower resolution.
+    """
+
+    def __init__(self, mask, image_width, image_height, threshold=0.5):
+        fg = np.asarray(mask).squeeze() > threshold
+        h, w = fg.shape
+        dtype = np.int16 if w < np.iinfo(np.int16).max else np.int32
+        cols = np.arange(w, dtype=dtype)
+        self._fg = fg
+        self._sx = w / image_width
+        self._sy = h / image_height
+        # Last background column at or before x (-1: none), first at or after x (w: none).
+        self._left_bg = np.maximum.accumulate(np.where(fg, dtype(-1), cols), axis=1)
+        self._right_bg = np.minimum.accumulate(
+            np.where(fg, dtype(w), cols)[:, ::-1], axis=1
+        )[:, ::-1]
+
+    def run_at(self, x, y):
+        """(left_x, right_x) in image pixels of the body run through (x, y), or None."""
+        h, w = self._fg.shape
+        row = int(y * self._sy)
+        col = int(x * self._sx)
+        if not (0 <= row < h and 0 <= col < w) or not self._fg[row, col]:
+            return None
+        left = int(self._left_bg[row, col]) + 1
+        right = int(self._right_bg[row, col])  # exclusive
+        return left / self._sx, right / self._sx
+
+    def width_at(self, x, y, band=2):
+        """
+        Median run (left_x, right_x) over mask rows y-band..y+band, which
+        smooths ragged mask edges. None when no row has body at x.
+        """
+        step = 1 / self._sy
+        runs = [self.run_at(x, y + k * step) for k in range(-band, band + 1)]
+        runs = [r for r in runs if r is not None]
+        if not runs:
+            return None
+        widths = [r[1] - r[0] for r in runs]
+        return runs[int(np.argsort(widths)[len(widths) // 2])]
+
+
+def _level(landmarks_px, a, b, min_conf=0.5):
+    ax, ay, av = landmarks_px[a]
+    bx, by, bv = landmarks_px[b]
+    if min(av, bv) < min_conf:
+        return None
+    return (ax, ay), (bx, by)
+
+
+def measure_widths(silhouette: Silhouette, landmarks_px):
+    """
+    Silhouette widths at the shoulder, waist and hip levels.
+
+    Returns {"shoulder_width" | "hip_width" | "waist_width":
+             (width_px, ((left_x, y), (right_x, y)))} for every level whose
+    landmarks are confident and whose mask width is plausible.
+    """
+    shoulders = _level(landmarks_px, LEFT_SHOULDER, RIGHT_SHOULDER)
+    hips = _level(landmarks_px, LEFT_HIP, RIGHT_HIP)
+    levels = {"shoulder_width": shoulders, "hip_width": hips, "waist_width": None}
+    if shoulders and hips:
+        (lsx, lsy), (rsx, rsy) = shoulders
+        (lhx, lhy), (rhx, rhy) = hips
+        levels["waist_width"] = (
+            (lhx + WAIST_RATIO * (lsx - lhx), lhy + WAIST_RATIO * (lsy - lhy)),
+            (rhx + WAIST_RATIO * (rsx - rhx), rhy + WAIST_RATIO * (rsy - rhy)),
+        )
+
+    widths = {}
+    for key, points in levels.items():
+        if points is None:
+            continue
+        (x1, y1), (x2, y2) = points
+        inner = abs(x1 - x2)
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        run = silhouette.width_at(cx, cy)
+        if run is None or inner <= 0:
+            continue
+        width = run[1] - run[0]
+        if not MIN_WIDTH_FACTOR * inner <= width <= MAX_WIDTH_FACTOR * inner:
+            continue
+        widths[key] = (float(width), ((run[0], cy), (run[1], cy)))
+    return widths
@@ -0,0 +1,78 @@
+# core/single_flight.py
+# Coalesce concurrent identical async computations into one.
+import asyncio
+import copy
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    While a computation for `key` is in flight, further calls with the same
+    key wait for it instead of starting their own, and every caller gets
+    the result (or the exception).
+
+    The computation runs as its own task, so a caller that goes away (client
+    disconnect) does not cancel it for the others; when the last waiting
+    caller goes away the computation is cancelled too. With copy_result=True
+    every caller receives its own deep copy, for results callers mutate.
+    Keys are forgotten as soon as the computation finishes: this is not a
+    cache, only burst deduplication.
+    """
+
+    def __init__(self, name: str = "", copy_result: bool = False):
+        self.name = name
+        self.copy_result = copy_result
+        self._flights = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def run(self, key, fn, *args, **kwargs):
+        """Await `fn(*args, **kwargs)`, shared with concurrent calls for `key`."""
+        if key is None:
+            return await fn(*args, **kwargs)
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+        else:
+            flight = _Flight(asyncio.ensure_future(fn(*args, **kwargs)))
+            self._flights[key] = flight
+            self.leaders += 1
+            flight.task.add_done_callback(lambda t: self._finish(key, flight))
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                # Nobody is waiting any more: stop the work and let the next
+                # caller for this key start afresh.
+                self._forget(key, flight)
+                flight.task.cancel()
+        return copy.deepcopy(result) if self.copy_result else result
+
+    def _forget(self, key, flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def _finish(self, key, flight):
+        self._forget(key, flight)
+        if not flight.task.cancelled():
+            flight.task.exception()  # retrieved: no "never retrieved" warning if every caller left
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,38 @@
+"""
+Shared setup for the AITrainer tests.
+
+Everything runs without model files or network: pose detection goes through
+benchmarks/fixtures.py (synthetic photos, SyntheticPoseModel) and the LLM
+through benchmarks/llm_stub.py or a test-local client. `api` reads its
+configuration at import time, so the environment for it is set here, before
+any test imports it.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+_TMP = tempfile.mkdtemp(prefix="aitrainer-tests-")
+for _name, _value in {
+    "MODEL_LOADING": "lazy",
+    "MEASUREMENT_HISTORY": os.path.join(_TMP, "history.db"),
+    "PROCESSED_DIR": os.path.join(_TMP, "processed"),
+    "GROQ_API_KEY": "",
+    "RECOMMENDER_MODE": "llm",
+    "LLM_HEDGE_DELAY_SEC": "off",
+    "AI_SERVICE_TOKEN": "test-service-token",
+}.items():
+    os.environ[_name] = _value
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def fixtures():
+    """The benchmarks' fixture module: Fixture, make_corpus, SyntheticPoseModel."""
+    import fixtures as module
+
+    return module
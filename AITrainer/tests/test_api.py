@@ -0,0 +1,256 @@
+import asyncio
+import contextlib
+import json
+import threading
+import types
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from core.pose_analyzer import _calculate_measurements_from_landmarks
+
+
+class _ProbeClient:
+    """StubLLMClient that also records the admission state when it is called."""
+
+    def __init__(self, api):
+        from llm_stub import StubLLMClient
+
+        self._api = api
+        self._stub = StubLLMClient()
+        self.active_during_call = []
+        self.chat = type("Chat", (), {"completions": self})()
+
+    async def create(self, messages, model, **kwargs):
+        self.active_during_call.append(self._api.admission.active)
+        return await self._stub.chat.completions.create(messages=messages, model=model, **kwargs)
+
+
+@pytest.fixture
+def api(monkeypatch, fixtures):
+    import api as module
+
+    fixture = fixtures.Fixture(7, photo=False)
+    measurements = _calculate_measurements_from_landmarks(fixture.landmarks_px(), *fixture.size)
+    active_during_pose = []
+
+    async def read_upload(file):
+        return b"image bytes"
+
+    async def pose_stage(contents, known_height_cm, tier, render="overlay"):
+        active_during_pose.append(module.admission.active)
+        return dict(measurements), None, "key"
+
+    monkeypatch.setattr(module, "_read_upload", read_upload)
+    monkeypatch.setattr(module, "_pose_stage", pose_stage)
+    monkeypatch.setattr(module, "recommendation_cache", None)
+    probe = _ProbeClient(module)
+    module.set_llm_client(probe)
+    module.active_during_pose = active_during_pose
+    yield module
+    module.set_llm_client(None)
+    del module.active_during_pose
+
+
+def _post(client, path):
+    return client.post(path, files={"file": ("a.jpg", b"x", "image/jpeg")},
+                       data={"render": "none"})
+
+
+def test_admission_slot_is_released_before_the_llm_call(api):
+    response = _post(TestClient(api.app), "/analyze-image/")
+    assert response.status_code == 200
+    assert response.json()["analysis_data"]["source"] == "llm"
+    assert api.active_during_pose == [1]
+    assert api._groq_client.active_during_call == [0]
+    assert api.admission.active == 0
+
+
+def test_stream_releases_the_slot_after_the_pose_stage(api):
+    response = _post(TestClient(api.app), "/analyze-image/stream")
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [e["event"] for e in events] == ["measurements", "analysis", "done"]
+    assert api.active_during_pose == [1]
+    assert api._groq_client.active_during_call == [0]
+    assert api.admission.active == 0
+
+
+async def _disconnect_before_the_body(api, path, files, data=None):
+    """
+    Drive one POST through ASGI with a client that is gone when the headers
+    are sent. Returns the messages sent and admission.active right after the
+    app returns: later, the event loop would finalize an abandoned admit()
+    generator and hide the leak.
+    """
+    request = httpx.Request("POST", f"http://test{path}", files=files, data=data)
+    body = request.read()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(k.lower(), v) for k, v in request.headers.raw],
+        "client": ("testclient", 50000), "server": ("test", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message["type"])
+        if message["type"] == "http.response.start":
+            raise OSError("client disconnected")
+
+    with contextlib.suppress(Exception):
+        await api.app(scope, receive, send)
+    return sent, api.admission.active
+
+
+@pytest.mark.parametrize("path, field", [
+    ("/analyze-image/stream", "file"),
+    ("/analyze-batch/", "files"),
+])
+def test_disconnect_before_the_body_releases_the_slot(api, path, field):
+    sent, active = asyncio.run(_disconnect_before_the_body(
+        api, path, files=[(field, ("a.jpg", b"x", "image/jpeg"))], data={"render": "none"},
+    ))
+    assert sent == ["http.response.start"]  # the slot was taken, then the body never ran
+    assert active == 0
+
+
+def test_unknown_equipment_is_rejected(api):
+    response = TestClient(api.app).post(
+        "/analyze-image/", files={"file": ("a.jpg", b"x", "image/jpeg")},
+        data={"render": "none", "equipment": "dumbbell, hoverboard"},
+    )
+    assert response.status_code == 400
+    assert "hoverboard" in response.json()["detail"]
+    assert api.active_during_pose == []
+
+
+def test_history_is_for_the_backend_only(api):
+    client = TestClient(api.app)
+    backend = {"X-Service-Token": "test-service-token"}
+    for path in ("/history/u1", "/history/u1/trends"):
+        assert client.get(path).status_code == 403
+        assert client.get(path, headers={"X-Service-Token": "guess"}).status_code == 403
+        assert client.get(path, headers=backend).status_code == 200
+
+    form = {"render": "none", "user_id": "u1"}
+    upload = {"file": ("a.jpg", b"x", "image/jpeg")}
+    for path in ("/analyze-image/", "/analyze-image/stream"):
+        assert client.post(path, files=upload, data=form).status_code == 403
+    assert api.active_during_pose == []  # refused before any work
+    assert client.post("/analyze-image/", files=upload, data=form, headers=backend).status_code == 200
+
+    # A browser page cannot send the token.
+    preflight = client.options("/history/u1", headers={
+        "Origin": "https://example.com",
+        "Access-Control-Request-Method": "GET",
+        "Access-Control-Request-Headers": "x-service-token",
+    })
+    assert preflight.status_code == 400
+
+
+class _HangingClient:
+    """LLM client whose call never returns until it is cancelled."""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.cancelled = asyncio.Event()
+        self.chat = type("Chat", (), {"completions": self})()
+
+    async def create(self, messages, model, **kwargs):
+        self.started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+
+
+def test_stream_disconnect_cancels_the_llm_call(api):
+    async def main():
+        client = _HangingClient()
+        api.set_llm_client(client)
+        events = api._analysis_events(b"image bytes", None, "heavy", "none")
+        assert (await events.__anext__())["event"] == "measurements"
+        reader = asyncio.create_task(events.__anext__())
+        await asyncio.wait_for(client.started.wait(), 1)
+        reader.cancel()  # what the server does when the client disconnects
+        with pytest.raises(asyncio.CancelledError):
+            await reader
+        await asyncio.wait_for(client.cancelled.wait(), 1)
+        return api.recommendation_flights.in_flight
+
+    assert asyncio.run(main()) == 0
+
+
+class _TwoPeople:
+    """Landmarker stand-in seeing a small person first and a large one second."""
+
+    def __init__(self, fixtures, api):
+        self.small = fixtures.Fixture(3, 360, 640, photo=False)
+        self.large = fixtures.Fixture(4, 360, 640, photo=False)
+        self.small.landmarks = self.small.landmarks * [0.5, 0.5, 1.0]
+        self._api = api
+        self.seen = []
+
+    def detect(self, mp_image):
+        self.seen.append((self._api.admission.active, threading.current_thread().name))
+        people = [
+            [types.SimpleNamespace(x=x, y=y, visibility=v) for x, y, v in f.landmarks]
+            for f in (self.small, self.large)
+        ]
+        return types.SimpleNamespace(pose_landmarks=people, segmentation_masks=None)
+
+
+class _Pool:
+    def __init__(self, model):
+        self.model = model
+
+    def lease(self):
+        return contextlib.nullcontext(self.model)
+
+
+def test_batch_runs_on_its_own_pool_and_measures_the_largest_person(api, fixtures, monkeypatch):
+    model = _TwoPeople(fixtures, api)
+    monkeypatch.setattr(api, "mask_free_pools", {tier: _Pool(model) for tier in api.TIERS})
+    monkeypatch.setattr(api, "BATCH_CHUNK_SIZE", 2)
+    photo = fixtures.Fixture(4, 360, 640).contents
+    files = [("files", (f"{i}.jpg", photo, "image/jpeg")) for i in range(3)]
+
+    response = TestClient(api.app).post("/analyze-batch/", files=files)
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert all(line["success"] for line in lines)
+
+    single = _calculate_measurements_from_landmarks(model.large.landmarks_px(), 360, 640)
+    for line in lines:
+        px = line["measurements"]["pixel_measurements"]
+        assert px["hip_width"] == pytest.approx(single["pixel_measurements"]["hip_width"])
+    # One slot per chunk, never more; work stays off the pose workers.
+    assert {active for active, _ in model.seen} == {1}
+    assert all(name.startswith("batch") for _, name in model.seen)
+    assert api.admission.active == 0
+
+
+class _ReadyPool:
+    state = "ready"
+
+    def health(self):
+        return {"ready": True, "state": "ready"}
+
+
+def test_health_reports_unconfigured_tiers_as_absent(monkeypatch):
+    import api
+
+    assert api.POSE_TIERS == ("heavy",)  # lite and full are opt-in
+    monkeypatch.setattr(api, "pose_pools", {"heavy": _ReadyPool()})
+    body = TestClient(api.app).get("/health").json()
+    assert body["status"] == "ok"
+    assert body["pose_pools"]["heavy"]["state"] == "ready"
+    assert body["pose_pools"]["lite"] == {"state": "absent", "ready": False}
+    assert body["mask_free_pools"]["full"]["state"] == "absent"
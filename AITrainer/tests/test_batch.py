@@ -0,0 +1,134 @@
+import contextlib
+
+import numpy as np
+import pytest
+
+from core.batch import analyze_batch, calculate_measurements_batch, measure_chunk
+from core.pose_analyzer import _calculate_measurements_from_landmarks, _classify_measurements
+from core.silhouette import Silhouette, measure_widths
+
+COMPARED = ("pixel_measurements", "cm_measurements", "scale_cm_per_px", "classifications")
+
+
+def _assert_same(batch, single):
+    for key in COMPARED:
+        a, b = batch.get(key), single.get(key)
+        if isinstance(b, dict):
+            assert a.keys() == b.keys(), key
+            for metric in b:
+                assert a[metric] == pytest.approx(b[metric], rel=1e-9, abs=1e-9), f"{key}.{metric}"
+        elif b is None:
+            assert a is None, key
+        else:
+            assert a == pytest.approx(b, rel=1e-9), key
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    import fixtures
+
+    return [fixtures.Fixture(seed, photo=False) for seed in range(12)]
+
+
+@pytest.mark.parametrize("heights", [None, 172.0, "mixed"])
+def test_batch_matches_single(corpus, heights):
+    if heights == "mixed":
+        heights = [None if i % 3 else 150.0 + i for i in range(len(corpus))]
+    landmarks = np.stack([np.asarray(f.landmarks_px(), dtype=np.float64) for f in corpus])
+    batch = calculate_measurements_batch(landmarks, heights)
+    for i, fixture in enumerate(corpus):
+        known = heights[i] if isinstance(heights, list) else heights
+        single = _calculate_measurements_from_landmarks(
+            fixture.landmarks_px(), *fixture.size, known_height_cm=known,
+        )
+        _assert_same(batch[i], single)
+
+
+def test_batch_matches_single_with_silhouette_widths(corpus):
+    landmarks, overrides, singles = [], [], []
+    for fixture in corpus:
+        width, height = fixture.size
+        mask = fixture.mask(width // 4, height // 4)
+        lm = fixture.landmarks_px()
+        landmarks.append(np.asarray(lm, dtype=np.float64))
+        overrides.append(measure_widths(Silhouette(mask, width, height), lm))
+        singles.append(_calculate_measurements_from_landmarks(
+            lm, width, height, segmentation_mask=mask, width_method="silhouette",
+        ))
+    assert any(overrides), "fixtures should produce silhouette widths"
+    batch = calculate_measurements_batch(np.stack(landmarks), width_overrides=overrides)
+    for measured, single in zip(batch, singles):
+        _assert_same(measured, single)
+
+
+def test_rejects_wrong_shape():
+    with pytest.raises(ValueError):
+        calculate_measurements_batch(np.zeros((2, 17, 3)))
+    assert calculate_measurements_batch(np.zeros((0, 33, 3))) == []
+
+
+def test_measure_chunk_keeps_order_and_errors(corpus):
+    lm = np.asarray(corpus[0].landmarks_px(), dtype=np.float64)
+    detected = [
+        ("a", (lm, corpus[0].size), None),
+        ("b", None, "Lỗi file ảnh."),
+        ("c", (None, (640, 480)), None),
+    ]
+    results = measure_chunk(detected)
+    assert [r["key"] for r in results] == ["a", "b", "c"]
+    assert [r["success"] for r in results] == [True, False, False]
+    assert results[0]["image_size"] == list(corpus[0].size)
+    assert results[1]["message"] == "Lỗi file ảnh."
+
+
+class _Pool:
+    """LandmarkerPool stand-in handing out one SyntheticPoseModel."""
+
+    def __init__(self, model):
+        self.model = model
+
+    @contextlib.contextmanager
+    def lease(self):
+        yield self.model
+
+
+def test_analyze_batch_end_to_end_matches_single():
+    import fixtures
+
+    corpus = [fixtures.Fixture(seed, 360, 640) for seed in range(3)]
+    model = fixtures.SyntheticPoseModel(segmentation=False)
+    pool = _Pool(model)
+
+    class _Serial:
+        """Executor stand-in: the synthetic model answers for one fixture at a time."""
+
+        @staticmethod
+        def map(fn, items):
+            for item in items:
+                model.fixture = next(f for f in corpus if f.name == item[0])
+                yield fn(item)
+
+    sources = [(f.name, lambda f=f: f.contents) for f in corpus]
+    results = list(analyze_batch(sources, pool, _Serial(), known_height_cm=170.0, chunk_size=2))
+    assert [r["key"] for r in results] == [f.name for f in corpus]
+    for fixture, result in zip(corpus, results):
+        assert result["success"] and result["image_size"] == [360, 640]
+        single = _calculate_measurements_from_landmarks(
+            fixture.landmarks_px(), 360, 640, known_height_cm=170.0,
+        )
+        _assert_same(result["measurements"], single)
+
+
+def test_batch_uses_the_single_image_classifier(corpus):
+    lm = np.asarray(corpus[0].landmarks_px(), dtype=np.float64)
+    shoulders = calculate_measurements_batch(lm[None])[0]["pixel_measurements"]["shoulder_width"]
+    # Silhouette hips as wide as the shoulders and a waist wider than both.
+    apple = {
+        "hip_width": (shoulders, ((0.0, 0.0), (shoulders, 0.0))),
+        "waist_width": (shoulders * 1.2, ((0.0, 0.0), (shoulders * 1.2, 0.0))),
+    }
+    measured = calculate_measurements_batch(lm[None], width_overrides=[apple])[0]
+    assert measured["classifications"]["shape_type"] == "Oval"
+    assert measured["classifications"] == _classify_measurements(
+        measured["pixel_measurements"], measured["width_source"]
+    )
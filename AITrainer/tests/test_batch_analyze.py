@@ -0,0 +1,33 @@
+import asyncio
+import io
+import json
+
+from batch_analyze import write_results
+
+
+def _results(n):
+    return ({"key": f"img{i}.jpg", "success": i % 2 == 0, "measurements": {"i": i}}
+            for i in range(n))
+
+
+def test_async_recommendations_share_one_event_loop():
+    loops = []
+
+    async def recommend(measurements):
+        loops.append(asyncio.get_running_loop())
+        await asyncio.sleep(0)
+        return {"source": "llm", "i": measurements["i"]}
+
+    out = io.StringIO()
+    assert asyncio.run(write_results(_results(6), out, recommend)) == (6, 3)
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [line["file"] for line in lines] == [f"img{i}.jpg" for i in range(6)]
+    assert [line.get("analysis_data", {}).get("i") for line in lines] == [0, None, 2, None, 4, None]
+    assert len(loops) == 3 and len(set(map(id, loops))) == 1
+
+
+def test_sync_recommendations():
+    out = io.StringIO()
+    asyncio.run(write_results(_results(2), out, lambda m: {"source": "local"}))
+    assert json.loads(out.getvalue().splitlines()[0])["analysis_data"] == {"source": "local"}
+
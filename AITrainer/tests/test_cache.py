@@ -0,0 +1,62 @@
+import pytest
+
+from core import cache
+from core.cache import LRUCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_evicts_least_recently_used_entry():
+    lru = LRUCache(max_entries=2)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1  # a is now the most recent
+    lru.put("c", 3)
+    assert "b" not in lru
+    assert lru.get("a") == 1 and lru.get("c") == 3
+    assert lru.stats()["evictions"] == 1
+
+
+def test_byte_bound():
+    lru = LRUCache(max_bytes=10, sizeof=len)
+    assert lru.put("a", "xxxx")
+    assert lru.put("b", "yyyy")
+    assert lru.put("c", "zzzz")  # 12 bytes: a goes
+    assert "a" not in lru
+    assert lru.stats()["bytes"] == 8
+    assert not lru.put("big", "x" * 11)  # never fits
+    assert "big" not in lru and len(lru) == 2
+    lru.put("b", "y")  # replacing an entry replaces its size
+    assert lru.stats()["bytes"] == 5
+    assert lru.pop("c") == "zzzz"
+    assert lru.stats()["bytes"] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    lru = LRUCache(ttl=10)
+    lru.put("a", 1)
+    clock[0] += 9.9
+    assert lru.get("a") == 1  # reading does not extend the TTL
+    clock[0] += 0.1
+    assert lru.get("a") is None
+    assert len(lru) == 0
+    lru.put("a", 2)
+    clock[0] += 5
+    lru.put("a", 3)  # re-putting does
+    clock[0] += 9
+    assert lru.get("a") == 3
+    stats = lru.stats()
+    assert stats["expirations"] == 1
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def test_membership_does_not_count_as_lookup():
+    lru = LRUCache()
+    lru.put("a", 1)
+    assert "a" in lru and "b" not in lru
+    assert lru.stats()["hits"] == 0 and lru.stats()["misses"] == 0
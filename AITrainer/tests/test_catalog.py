@@ -0,0 +1,134 @@
+import sqlite3
+import sys
+
+import pytest
+
+from core.catalog import (
+    BUILTIN,
+    ExerciseCatalog,
+    SqlDumpSource,
+    read_sql_dump,
+    source_from_spec,
+    write_sqlite,
+)
+
+DUMP = """\
+--
+-- PostgreSQL database dump
+--
+
+COPY public.muscle_groups (muscle_group_id, name, slug, parent_id) FROM stdin;
+1\tNgực\tmid-chest\t\\N
+2\tXô\tlats\t\\N
+3\tĐùi trước\tquads\t\\N
+\\.
+
+COPY public.exercises (exercise_id, name, name_en, slug, equipment_needed, is_public, updated_at) FROM stdin;
+1\tĐẩy Ngực Ngang Thanh Đòn\tBarbell Bench Press\tbench\tbarbell\tt\t2025-01-01 00:00:00
+900\tKéo Tạ Đơn\tDumbbell Row\tdb-row\tdumbbell, bench\tt\t2025-01-02 00:00:00
+901\tBài Nháp\tDraft\tdraft\t\\N\tf\t2025-01-03 00:00:00
+902\tTên\\tCó Tab\t\\N\tsquat\t\\N\tt\t2025-01-04 00:00:00
+\\.
+
+COPY public.exercise_muscle_group (id, exercise_id, muscle_group_id, impact_level) FROM stdin;
+1\t1\t1\tprimary
+2\t900\t3\tsecondary
+3\t900\t2\tprimary
+4\t902\t3\tprimary
+\\.
+"""
+
+
+@pytest.fixture
+def dump_path(tmp_path):
+    path = tmp_path / "dump.sql"
+    path.write_text(DUMP, encoding="utf-8")
+    return str(path)
+
+
+def test_reads_copy_blocks(dump_path):
+    data = read_sql_dump(dump_path)
+    assert [r["slug"] for r in data["muscle_groups"]] == ["mid-chest", "lats", "quads"]
+    assert data["muscle_groups"][0]["parent_id"] is None
+    assert data["exercises"][3]["name"] == "Tên\tCó Tab"
+    assert len(data["exercise_muscle_group"]) == 4
+
+
+def test_dump_source_builds_rows_and_tags(dump_path):
+    rows, tags = SqlDumpSource(dump_path).load()
+    # Private exercises are left out; a missing English name falls back to the name.
+    assert rows == [
+        (1, "Đẩy Ngực Ngang Thanh Đòn", "Barbell Bench Press"),
+        (900, "Kéo Tạ Đơn", "Dumbbell Row"),
+        (902, "Tên\tCó Tab", "Tên\tCó Tab"),
+    ]
+    # Curated tags win; others take the first primary muscle and the first equipment.
+    assert tags[1] == ("chest", "barbell")
+    assert tags[900] == ("back", "dumbbell")
+    assert tags[902] == ("quads", None)
+
+
+def test_sqlite_stand_in_matches_the_dump(dump_path, tmp_path):
+    db = str(tmp_path / "catalog.db")
+    write_sqlite(dump_path, db)
+    assert source_from_spec(f"sqlite:///{db}").load() == SqlDumpSource(dump_path).load()
+
+
+def test_indexes(dump_path):
+    catalog = ExerciseCatalog(SqlDumpSource(dump_path))
+    assert catalog.refresh()
+    snapshot = catalog.snapshot
+    assert snapshot.get(900)[2] == "Dumbbell Row"
+    assert snapshot.find("dumbbell row") == 900
+    assert snapshot.find("Kéo Tạ Đơn") == 900
+    assert snapshot.ids_for_group("back") == (900,)
+    assert 901 not in snapshot
+
+
+def test_reload_on_version_bump(dump_path, tmp_path):
+    db = str(tmp_path / "catalog.db")
+    write_sqlite(dump_path, db)
+    catalog = ExerciseCatalog(source_from_spec(f"sqlite:///{db}"))
+    assert catalog.snapshot is BUILTIN
+    assert catalog.refresh()
+    first = catalog.snapshot
+    assert not catalog.refresh()  # same version: nothing reloaded
+    assert catalog.snapshot is first
+
+    with sqlite3.connect(db) as conn:
+        conn.execute(
+            "UPDATE exercises SET name_en = 'One Arm Row', updated_at = '2025-02-01 00:00:00' "
+            "WHERE exercise_id = 900"
+        )
+    assert catalog.refresh()
+    assert catalog.snapshot.get(900)[2] == "One Arm Row"
+    assert catalog.snapshot.version != first.version
+    # Readers holding the old snapshot keep a consistent view.
+    assert first.get(900)[2] == "Dumbbell Row"
+    assert catalog.reloads == 2
+
+
+def test_dump_reload_and_failed_load_keeps_snapshot(dump_path):
+    catalog = ExerciseCatalog(SqlDumpSource(dump_path))
+    assert catalog.refresh()
+    with open(dump_path, "a", encoding="utf-8") as f:
+        f.write("\n-- touched\n")
+    assert catalog.refresh()
+
+    good = catalog.snapshot
+    with open(dump_path, "w", encoding="utf-8") as f:
+        f.write("-- no COPY blocks\n")
+    assert not catalog.refresh()
+    assert catalog.snapshot is good
+    assert catalog.errors == 1 and catalog.last_error
+
+
+def test_unknown_spec():
+    with pytest.raises(ValueError):
+        source_from_spec("mysql://localhost/db")
+
+
+def test_postgres_spec_without_psycopg_fails_at_startup(monkeypatch):
+    monkeypatch.setitem(sys.modules, "psycopg", None)  # import psycopg -> ImportError
+    with pytest.raises(ValueError, match="psycopg"):
+        source_from_spec("postgresql://user@localhost/aitrainer")
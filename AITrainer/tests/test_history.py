@@ -0,0 +1,89 @@
+import calendar
+
+import pytest
+
+from core.history import MeasurementHistory
+
+
+def _ts(year, month, day, hour=12):
+    return float(calendar.timegm((year, month, day, hour, 0, 0)))
+
+
+def _measurements(waist_hip, hip_cm=None, shape="Rectangle"):
+    px = {"hip_width": 200.0, "waist_width": 200.0 * waist_hip, "shoulder_hip_ratio": 1.2,
+          "waist_hip_ratio": waist_hip}
+    return {
+        "pixel_measurements": px,
+        "cm_measurements": {"hip_width": hip_cm} if hip_cm else {},
+        "scale_cm_per_px": hip_cm / 200.0 if hip_cm else None,
+        "classifications": {"shape_type": shape, "somatotype": "Mesomorph"},
+        "model_tier": "heavy",
+    }
+
+
+@pytest.fixture
+def history(tmp_path):
+    h = MeasurementHistory(str(tmp_path / "history.db"))
+    yield h
+    h.close()
+
+
+def test_duplicate_image_key_is_ignored(history):
+    first = history.append("u1", _measurements(0.9), image_key="abc", ts=_ts(2026, 1, 5))
+    assert first is not None
+    assert history.append("u1", _measurements(0.8), image_key="abc", ts=_ts(2026, 1, 6)) is None
+    # Same photo for another user, and rows without a key, are separate points.
+    assert history.append("u2", _measurements(0.9), image_key="abc") is not None
+    assert history.append("u1", _measurements(0.85), ts=_ts(2026, 1, 7)) is not None
+    assert history.append("u1", _measurements(0.85), ts=_ts(2026, 1, 8)) is not None
+
+    entries = history.entries("u1")
+    assert [e["pixel_measurements"]["waist_hip_ratio"] for e in entries] == [0.9, 0.85, 0.85]
+    assert entries[0]["classifications"] == {"shape_type": "Rectangle", "somatotype": "Mesomorph"}
+    assert history.stats()["duplicates"] == 1
+
+
+def test_entries_range_and_limit(history):
+    for day in range(1, 6):
+        history.append("u1", _measurements(0.8 + day / 100), ts=_ts(2026, 3, day))
+    window = history.entries("u1", since=_ts(2026, 3, 2), until=_ts(2026, 3, 4))
+    assert [e["ts"] for e in window] == [_ts(2026, 3, 2), _ts(2026, 3, 3)]
+    newest = history.entries("u1", limit=2)
+    assert [e["ts"] for e in newest] == [_ts(2026, 3, 4), _ts(2026, 3, 5)]
+
+
+def test_trend_buckets(history):
+    # Two photos on Mon 2026-01-05, one on Wed 2026-01-07 (same week), one on Mon 2026-02-02.
+    history.append("u1", _measurements(0.90, hip_cm=100), ts=_ts(2026, 1, 5, 8))
+    history.append("u1", _measurements(0.80, hip_cm=98), ts=_ts(2026, 1, 5, 20))
+    history.append("u1", _measurements(0.70), ts=_ts(2026, 1, 7))
+    history.append("u1", _measurements(0.60, hip_cm=94), ts=_ts(2026, 2, 2))
+
+    raw = history.trends("u1", ["waist_hip_ratio"])
+    assert [p["value"] for p in raw["waist_hip_ratio"]] == [0.9, 0.8, 0.7, 0.6]
+
+    daily = history.trends("u1", ["waist_hip_ratio", "hip_width_cm"], bucket="day")
+    assert daily["waist_hip_ratio"] == [
+        {"t": "2026-01-05", "value": 0.85, "n": 2},
+        {"t": "2026-01-07", "value": 0.7, "n": 1},
+        {"t": "2026-02-02", "value": 0.6, "n": 1},
+    ]
+    # Rows without a cm value are skipped for cm metrics.
+    assert daily["hip_width_cm"] == [
+        {"t": "2026-01-05", "value": 99.0, "n": 2},
+        {"t": "2026-02-02", "value": 94.0, "n": 1},
+    ]
+
+    weekly = history.trends("u1", ["waist_hip_ratio"], bucket="week")["waist_hip_ratio"]
+    assert [(p["t"], p["n"]) for p in weekly] == [("2026-W01", 3), ("2026-W05", 1)]
+    assert weekly[0]["value"] == pytest.approx(0.8)
+
+    monthly = history.trends("u1", ["waist_hip_ratio"], bucket="month")["waist_hip_ratio"]
+    assert [p["t"] for p in monthly] == ["2026-01", "2026-02"]
+
+
+def test_trends_reject_unknown_metric_and_bucket(history):
+    with pytest.raises(ValueError):
+        history.trends("u1", ["shoulder_width"])  # pixel lengths do not trend
+    with pytest.raises(ValueError):
+        history.trends("u1", ["waist_hip_ratio"], bucket="year")
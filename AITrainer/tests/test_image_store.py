@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from core.image_store import ProcessedImageStore
+
+
+def _store(tmp_path, **settings):
+    return ProcessedImageStore(str(tmp_path / "out"), "http://x/processed", None, **settings)
+
+
+def test_names_depend_on_every_encoding_setting(tmp_path):
+    base = _store(tmp_path).name_for("key")
+    assert _store(tmp_path).name_for("key") == base
+    for settings in ({"fmt": "jpeg"}, {"quality": 70}, {"thumbnail_max_side": 320},
+                     {"variant": "1280"}):
+        assert _store(tmp_path, **settings).name_for("key") != base, settings
+    thumbs = {_store(tmp_path, thumbnail_max_side=side).name_for("key", thumbnail=True)
+              for side in (240, 320)}
+    assert len(thumbs) == 2
+
+
+def test_directory_is_created_on_first_write(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(1) as executor:
+        store = ProcessedImageStore(str(tmp_path / "out"), "http://x", executor, max_bytes=10**6)
+        assert not (tmp_path / "out").exists()
+        assert store.prune() == 0
+        urls = store.save("key", np.zeros((8, 8, 3), dtype=np.uint8))
+    assert (tmp_path / "out" / urls["url"].rsplit("/", 1)[1]).is_file()
+
+
+def test_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        _store(tmp_path, fmt="gif")
@@ -0,0 +1,101 @@
+import io
+
+import cv2
+import numpy as np
+import pytest
+
+from core.ingest import UploadRejected, image_size, read_upload, sniff_format
+
+MB = 1024 * 1024
+
+
+def _encoded(ext, width=64, height=48):
+    image = np.full((height, width, 3), 128, dtype=np.uint8)
+    ok, buf = cv2.imencode(ext, image)
+    assert ok
+    return buf.tobytes()
+
+
+class _Chunked:
+    """File object without readinto() that returns at most `step` bytes per read."""
+
+    def __init__(self, data, step):
+        self._data, self._pos, self._step = data, 0, step
+
+    def read(self, n=-1):
+        n = self._step if n < 0 else min(n, self._step)
+        chunk = self._data[self._pos:self._pos + n]
+        self._pos += len(chunk)
+        return chunk
+
+
+@pytest.mark.parametrize("ext,fmt", [(".jpg", "jpeg"), (".png", "png"), (".webp", "webp"), (".bmp", "bmp")])
+def test_reads_supported_formats(ext, fmt):
+    data = _encoded(ext)
+    upload = read_upload(io.BytesIO(data), MB, size_hint=len(data))
+    assert upload.format == fmt
+    assert upload.size == (64, 48)
+    assert bytes(upload.data) == data
+
+
+def test_small_chunks_without_hint_give_the_same_bytes():
+    data = _encoded(".jpg", 300, 200)
+    upload = read_upload(_Chunked(data, 7), MB, chunk_size=16)
+    assert bytes(upload.data) == data
+    assert upload.size == (300, 200)
+
+
+def test_unsupported_format_is_415():
+    gif = b"GIF89a" + b"\x00" * 64
+    with pytest.raises(UploadRejected) as err:
+        read_upload(io.BytesIO(gif), MB)
+    assert err.value.status_code == 415
+
+
+def test_truncated_header_is_400():
+    data = _encoded(".png")[:20]  # signature, IHDR never completes
+    with pytest.raises(UploadRejected) as err:
+        read_upload(io.BytesIO(data), MB)
+    assert err.value.status_code == 400
+
+
+def test_zero_size_header_is_400():
+    data = bytearray(_encoded(".png"))
+    data[16:24] = b"\x00" * 8  # IHDR width and height
+    with pytest.raises(UploadRejected) as err:
+        read_upload(io.BytesIO(bytes(data)), MB)
+    assert err.value.status_code == 400
+
+
+def test_byte_cap_is_413_before_reading_everything():
+    data = _encoded(".bmp", 512, 512)  # ~768 kB, uncompressed
+    stream = io.BytesIO(data)
+    with pytest.raises(UploadRejected) as err:
+        read_upload(stream, 100_000, chunk_size=4096)
+    assert err.value.status_code == 413
+    assert stream.tell() <= 100_000 + 4096
+
+
+def test_declared_size_over_cap_is_413_without_reading():
+    stream = io.BytesIO(_encoded(".jpg"))
+    with pytest.raises(UploadRejected) as err:
+        read_upload(stream, 1000, size_hint=5000)
+    assert err.value.status_code == 413
+    assert stream.tell() == 0
+
+
+@pytest.mark.parametrize("ext", [".jpg", ".png", ".webp", ".bmp"])
+def test_pixel_budget_is_checked_from_the_header(ext):
+    data = _encoded(ext, 400, 300)
+    with pytest.raises(UploadRejected) as err:
+        read_upload(io.BytesIO(data), 10 * MB, max_pixels=100_000)
+    assert err.value.status_code == 413
+    assert read_upload(io.BytesIO(data), 10 * MB, max_pixels=120_000).size == (400, 300)
+
+
+def test_sniff_and_size_need_enough_bytes():
+    data = _encoded(".jpg")
+    assert sniff_format(data[:2]) is None
+    assert sniff_format(data) == "jpeg"
+    assert image_size(data, 20, "jpeg") is None
+    assert image_size(data, len(data), "jpeg") == (64, 48)
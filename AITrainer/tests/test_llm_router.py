@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from core import llm_router
+from core.llm_router import CircuitOpenError, LLMRouter
+
+
+class _Clock:
+    """Stands in for time.monotonic in core.llm_router so cooldowns pass instantly."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    monkeypatch.setattr(llm_router.time, "monotonic", fake)
+    return fake
+
+
+def _scripted(behaviour=None, **by_model):
+    """
+    call(model, timeout) that sleeps then answers or raises, per model, and
+    records the calls. Pass a dict to change the behaviour between calls.
+    """
+    behaviour = by_model if behaviour is None else behaviour
+    calls, cancelled = [], []
+
+    async def call(model, timeout):
+        calls.append(model)
+        delay, outcome = behaviour[model]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return call, calls, cancelled
+
+
+def test_hedge_starts_the_next_model_and_cancels_the_loser():
+    call, calls, cancelled = _scripted(slow=(5.0, "slow"), fast=(0.01, "fast"))
+    router = LLMRouter(["slow", "fast"], hedge_delay_sec=0.02)
+    text, model = asyncio.run(router.generate(call))
+    assert (text, model) == ("fast", "fast")
+    assert calls == ["slow", "fast"]
+    assert cancelled == ["slow"]
+    assert router.hedges == 1 and router.failovers == 0
+
+
+def test_no_hedge_when_the_first_model_is_quick():
+    call, calls, _ = _scripted(a=(0.0, "a"), b=(0.0, "b"))
+    router = LLMRouter(["a", "b"], hedge_delay_sec=1.0)
+    assert asyncio.run(router.generate(call)) == ("a", "a")
+    assert calls == ["a"]
+    assert router.hedges == 0
+
+
+def test_failover_on_error_and_invalid_output():
+    call, calls, _ = _scripted(a=(0.0, RuntimeError("down")), b=(0.0, "not json"), c=(0.0, "{}"))
+
+    def validate(text):
+        if not text.startswith("{"):
+            raise ValueError("invalid")
+
+    router = LLMRouter(["a", "b", "c"], hedge_delay_sec=None)
+    assert asyncio.run(router.generate(call, validate)) == ("{}", "c")
+    assert calls == ["a", "b", "c"]
+    assert router.failovers == 2
+    stats = router.stats()["models"]
+    assert stats["a"]["failures"] == 1 and stats["b"]["failures"] == 1
+    assert stats["c"]["successes"] == 1
+
+
+def test_last_error_is_raised_when_every_model_fails():
+    call, _, _ = _scripted(a=(0.0, RuntimeError("a")), b=(0.0, KeyError("b")))
+    router = LLMRouter(["a", "b"])
+    with pytest.raises(KeyError):
+        asyncio.run(router.generate(call))
+
+
+def test_breaker_opens_then_half_open_trial_closes_it(clock):
+    outcomes = {"a": (0.0, RuntimeError("down"))}
+    call, calls, _ = _scripted(outcomes)
+    seen = []
+    router = LLMRouter(["a"], failure_threshold=2, cooldown_sec=30.0,
+                       on_attempt=lambda m, s, outcome: seen.append(outcome))
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            asyncio.run(router.generate(call))
+    assert router.stats()["models"]["a"]["circuit"] == "open"
+
+    # Open: no call is made at all.
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(router.generate(call))
+    assert calls == ["a", "a"]
+    assert router.short_circuits == 1
+
+    # Cooldown over: exactly one trial call goes through.
+    clock.now += 31
+    assert router.stats()["models"]["a"]["circuit"] == "half-open"
+    assert router._acquire("a")
+    assert not router._acquire("a")  # the others still see it open
+    clock.now += 31
+
+    outcomes["a"] = (0.0, "ok")
+    assert asyncio.run(router.generate(call)) == ("ok", "a")
+    assert router.stats()["models"]["a"]["circuit"] == "closed"
+    assert seen == ["error", "error", "ok"]
+
+
+def test_failed_trial_restarts_the_cooldown(clock):
+    call, calls, _ = _scripted(a=(0.0, RuntimeError("down")), b=(0.0, "b"))
+    router = LLMRouter(["a", "b"], failure_threshold=1, cooldown_sec=30.0)
+    assert asyncio.run(router.generate(call)) == ("b", "b")  # a opens, b answers
+    assert asyncio.run(router.generate(call)) == ("b", "b")  # a skipped while open
+    assert calls == ["a", "b", "b"]
+
+    clock.now += 31
+    assert asyncio.run(router.generate(call)) == ("b", "b")  # trial of a fails
+    assert calls[-2:] == ["a", "b"]
+    clock.now += 10
+    assert router.stats()["models"]["a"]["circuit"] == "open"
+
+
+def test_adaptive_timeout_follows_p95():
+    router = LLMRouter(["a"], timeout_sec=60.0, min_timeout_sec=2.0, timeout_multiplier=3.0,
+                       min_samples=3)
+    assert router.timeout_for("a") == 60.0
+    for elapsed in (1.0, 1.0, 4.0):
+        router._record_success("a", elapsed)
+    assert router.timeout_for("a") == 3.0  # p95 index of 3 samples is the middle one
+    router._record_success("a", 0.1)
+    router._record_success("a", 0.1)
+    assert router.timeout_for("a") == 3.0
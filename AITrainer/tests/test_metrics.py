@@ -0,0 +1,128 @@
+import math
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core.metrics import server_timing_header, start_request_timings, stop_request_timings, timed
+
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_exposition(text):
+    """Text format -> ({family: type}, {family: help}, [(name, labels, value)]), strictly."""
+    types, helps, samples = {}, {}, []
+    for line in text.splitlines():
+        if not line:
+            continue
+        if line.startswith("# HELP "):
+            name, _, doc = line[7:].partition(" ")
+            helps[name] = doc
+        elif line.startswith("# TYPE "):
+            name, _, kind = line[7:].partition(" ")
+            assert kind in ("counter", "gauge", "histogram", "summary", "untyped"), line
+            assert name not in types, f"{name} declared twice"
+            types[name] = kind
+        elif line.startswith("#"):
+            continue
+        else:
+            match = _SAMPLE.match(line)
+            assert match, f"malformed sample line: {line!r}"
+            name, labels, value = match.groups()
+            samples.append((name, dict(_LABEL.findall(labels or "")), float(value)))
+    return types, helps, samples
+
+
+def _family(name, types):
+    for suffix in ("_total", "_bucket", "_sum", "_count", "_created"):
+        if name.endswith(suffix) and name[: -len(suffix)] in types:
+            return name[: -len(suffix)]
+    return name
+
+
+def _get_metrics(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    return parse_exposition(response.text)
+
+
+def _value(samples, name, labels):
+    return sum(v for n, l, v in samples if n == name and l == labels)
+
+
+@pytest.fixture(scope="module")
+def scrapes():
+    """Scrapes before and after two GET /health (other tests may have counted some already)."""
+    import api
+
+    client = TestClient(api.app)
+    before = _get_metrics(client)
+    client.get("/health")
+    client.get("/health")
+    return before, _get_metrics(client)
+
+
+@pytest.fixture(scope="module")
+def scrape(scrapes):
+    return scrapes[1]
+
+
+def test_every_sample_belongs_to_a_declared_family(scrape):
+    types, helps, samples = scrape
+    assert samples
+    for name, _, _ in samples:
+        family = _family(name, types)
+        assert family in types, f"{name} has no # TYPE"
+        assert family in helps, f"{name} has no # HELP"
+        if types[family] == "counter":
+            assert name.endswith(("_total", "_created")), name
+
+
+def test_http_request_counter(scrapes):
+    (_, _, before), (types, _, after) = scrapes
+    assert types["aitrainer_http_requests_total"] == "counter"
+    labels = {"method": "GET", "route": "/health", "status": "200"}
+    name = "aitrainer_http_requests_total"
+    assert _value(after, name, labels) - _value(before, name, labels) == 2.0
+
+
+def test_histogram_buckets_are_cumulative(scrapes):
+    (_, _, before), (types, _, samples) = scrapes
+    assert types["aitrainer_http_request_duration_seconds"] == "histogram"
+    series = [(labels, v) for name, labels, v in samples
+              if name == "aitrainer_http_request_duration_seconds_bucket"
+              and labels.get("route") == "/health"]
+    bounds = [float(labels["le"]) for labels, _ in series]
+    counts = [v for _, v in series]
+    assert bounds == sorted(bounds) and math.isinf(bounds[-1])
+    assert counts == sorted(counts)
+    route = {"route": "/health"}
+    count = _value(samples, "aitrainer_http_request_duration_seconds_count", route)
+    earlier = _value(before, "aitrainer_http_request_duration_seconds_count", route)
+    assert count - earlier == 2.0 and counts[-1] == count
+    assert _value(samples, "aitrainer_http_request_duration_seconds_sum", route) > 0
+
+
+def test_function_backed_metrics_are_scraped(scrape):
+    types, _, samples = scrape
+    names = {name for name, _, _ in samples}
+    assert types["aitrainer_analyses"] == "gauge"
+    assert "aitrainer_analyses_rejected_total" in names
+
+
+def test_server_timing_sums_repeated_stages():
+    timings, token = start_request_timings()
+    try:
+        with timed("decode"):
+            pass
+        with timed("pose detect"):
+            pass
+        with timed("decode"):
+            pass
+    finally:
+        stop_request_timings(token)
+    assert [stage for stage, _ in timings] == ["decode", "pose detect", "decode"]
+    header = server_timing_header([("decode", 0.010), ("pose detect", 0.080), ("decode", 0.0025)])
+    assert header == "decode;dur=12.5, pose_detect;dur=80.0"
@@ -0,0 +1,91 @@
+import types
+
+import numpy as np
+import pytest
+
+from core.pose_analyzer import (
+    _calculate_measurements_from_landmarks,
+    _classify_measurements,
+    analyze_pose_with_model,
+    detect_pose,
+    rank_people,
+)
+
+
+class _People:
+    """Landmarker stand-in seeing every given fixture in one pass, in that order."""
+
+    def __init__(self, *people):
+        self.people = people
+
+    def detect(self, mp_image):
+        lms = [
+            [types.SimpleNamespace(x=x, y=y, visibility=v) for x, y, v in f.landmarks]
+            for f in self.people
+        ]
+        return types.SimpleNamespace(pose_landmarks=lms, segmentation_masks=None)
+
+
+@pytest.fixture
+def image():
+    return np.zeros((640, 360, 3), np.uint8)
+
+
+@pytest.fixture
+def small_and_large(fixtures):
+    small = fixtures.Fixture(3, 360, 640, photo=False)
+    small.landmarks = small.landmarks * [0.5, 0.5, 1.0]
+    return small, fixtures.Fixture(4, 360, 640, photo=False)
+
+
+def test_single_person_has_people_and_bbox(fixtures, image):
+    person = fixtures.Fixture(5, 360, 640, photo=False)
+    _, _, measurements = analyze_pose_with_model(_People(person), image, render="none")
+
+    bbox = rank_people([person.landmarks_px()])[1][0]
+    assert measurements["bbox"] == bbox
+    assert len(measurements["people"]) == 1
+    assert measurements["people"][0]["bbox"] == bbox
+    assert "draw_points" not in measurements["people"][0]
+    assert measurements["people"][0]["pixel_measurements"] == measurements["pixel_measurements"]
+
+
+def test_largest_person_is_primary(small_and_large, image):
+    small, large = small_and_large
+    _, _, measurements = analyze_pose_with_model(_People(small, large), image, render="none")
+
+    order, bboxes = rank_people([small.landmarks_px(), large.landmarks_px()])
+    assert order == [1, 0]
+    assert measurements["bbox"] == bboxes[1]
+    assert [p["bbox"] for p in measurements["people"]] == [bboxes[1], bboxes[0]]
+
+
+def test_detect_pose_picks_the_same_person(small_and_large, image):
+    # batch and live measure whoever detect_pose returns.
+    small, large = small_and_large
+    landmarks_px, _ = detect_pose(_People(small, large), image)
+    assert np.allclose(landmarks_px, large.landmarks_px())
+
+
+def test_broad_shoulders_are_not_oval(fixtures):
+    # Shoulder/hip joints 144/104 px: the landmark waist leans toward the
+    # shoulders, so waist_hip_ratio ~1.06 without any belly.
+    landmarks = [list(p) for p in fixtures.Fixture(5, 360, 640, photo=False).landmarks_px()]
+    for (left, right), half in (((11, 12), 72), ((23, 24), 52)):
+        landmarks[left][0], landmarks[right][0] = 180 + half, 180 - half
+    measured = _calculate_measurements_from_landmarks(landmarks, 360, 640)
+    assert measured["pixel_measurements"]["waist_hip_ratio"] > 1.05
+    assert measured["classifications"]["shape_type"] != "Oval"
+
+
+def test_oval_needs_a_silhouette_waist_and_level_shoulders():
+    px = {"shoulder_hip_ratio": 1.0, "waist_hip_ratio": 1.1, "height": 1000,
+          "leg_length": 500, "shoulder_width": 250}
+    silhouette = {"shoulder_width": "silhouette", "waist_width": "silhouette",
+                  "hip_width": "silhouette"}
+    assert _classify_measurements(px, silhouette)["shape_type"] == "Oval"
+    assert _classify_measurements(px)["shape_type"] != "Oval"
+    assert _classify_measurements(px, {**silhouette, "hip_width": "landmarks"})[
+        "shape_type"] != "Oval"
+    px["shoulder_hip_ratio"] = 1.3
+    assert _classify_measurements(px, silhouette)["shape_type"] != "Oval"
@@ -0,0 +1,63 @@
+from core.catalog import BUILTIN
+from core.recommender import (
+    known_equipment,
+    local_recommendations,
+    parse_equipment,
+    rank_exercises,
+    recommend_exercise_ids,
+    shortlist_exercise_ids,
+)
+
+
+def _equipment(eid):
+    return BUILTIN.tags[eid][1]
+
+
+def test_parse_equipment():
+    assert parse_equipment(None) is None
+    assert parse_equipment(" , ") is None
+    assert parse_equipment("Dumbbell, cable") == frozenset({"dumbbell", "cable"})
+    assert parse_equipment(["kettlebell"]) == frozenset({"kettlebell"})
+
+
+def test_equipment_filter_prefers_available_exercises():
+    picks = recommend_exercise_ids("Triangle", "Mesomorph", equipment="dumbbell")
+    assert len(picks) == 6
+    assert {_equipment(eid) for eid in picks} <= {"dumbbell", "body-weight"}
+    # Without a list nothing changes.
+    assert recommend_exercise_ids("Triangle", "Mesomorph", equipment=None) == \
+        recommend_exercise_ids("Triangle", "Mesomorph")
+
+
+def test_missing_equipment_is_weighted_not_dropped():
+    ranked = rank_exercises("Rectangle", None, equipment="kettlebell")
+    by_id = {eid: score for score, eid, _ in ranked}
+    assert len(ranked) == len(BUILTIN)
+    barbell = next(eid for eid in by_id if _equipment(eid) == "barbell")
+    plain = {eid: score for score, eid, _ in rank_exercises("Rectangle", None)}
+    assert by_id[barbell] < plain[barbell] * 0.1
+    dropped = rank_exercises("Rectangle", None, equipment="kettlebell", equipment_weight=0)
+    assert {_equipment(eid) for _, eid, _ in dropped} <= {"kettlebell", "body-weight"}
+
+
+def test_shortlist_and_local_recommendations_take_equipment():
+    ids = shortlist_exercise_ids("Hourglass", "Endomorph", size=0, equipment="cable")
+    assert ids and {_equipment(eid) for eid in ids} <= {"cable", "body-weight"}
+    recommendations = local_recommendations(
+        {"classifications": {"shape_type": "Oval", "somatotype": "Endomorph"}},
+        equipment="body-weight",
+    )
+    assert {_equipment(eid) for eid in recommendations["exercise_ids"]} == {"body-weight"}
+    assert recommendations["body_type"] == "Dáng tròn (quả táo)"
+
+
+
+def test_unknown_equipment_does_not_grow_the_memo():
+    assert known_equipment("Dumbbell, hoverboard") == frozenset({"dumbbell"})
+    assert known_equipment("hoverboard") == frozenset()
+    ids = shortlist_exercise_ids("Triangle", "Mesomorph", size=0, equipment="hoverboard")
+    assert {_equipment(eid) for eid in ids} == {"body-weight"}
+    before = len(BUILTIN._memo)
+    for i in range(50):
+        shortlist_exercise_ids("Triangle", "Mesomorph", equipment=f"dumbbell, junk-{i}")
+    assert len(BUILTIN._memo) <= before + 1
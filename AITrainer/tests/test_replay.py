@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+import replay
+from core import pose_analyzer
+from core.recording import RecordingWriter, load_recordings
+
+
+def test_record_images_from_encoded_photos(fixtures, monkeypatch, tmp_path):
+    fixture = fixtures.Fixture(2, 720, 1280)
+    (tmp_path / "a.jpg").write_bytes(fixture.contents)
+    (tmp_path / "notes.png").write_bytes(b"not an image")
+    model = fixtures.SyntheticPoseModel()
+    model.fixture = fixture
+    monkeypatch.setattr(pose_analyzer, "load_pose_model", lambda tier: model)
+
+    writer = RecordingWriter()
+    replay.record_images(writer, [str(tmp_path)], "heavy", 172.0, pose_max_side=640)
+    writer.save(str(tmp_path / "rec.npz"))
+
+    [rec] = load_recordings(str(tmp_path / "rec.npz"))
+    assert rec.name == "a.jpg"
+    # Landmarks are in original pixels even though detection ran at 640 px.
+    assert rec.size == (720, 1280)
+    assert np.allclose(rec.landmarks_px(), fixture.landmarks_px(), atol=0.01)
+    assert rec.mask is not None
+    assert rec.known_height_cm == pytest.approx(172.0)
@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+
+from core import result_cache
+from core.result_cache import ResultCache, content_key
+
+
+def _entry(i):
+    image = np.full((32, 32, 3), i, dtype=np.uint8)
+    return {"pixel_measurements": {"hip_width": float(i)}}, image
+
+
+def test_memory_and_disk_round_trip(tmp_path):
+    cache = ResultCache(10**6, disk_dir=str(tmp_path))
+    measurements, image = _entry(1)
+    cache.put("a", measurements, image)
+    got, got_image = cache.get("a")
+    assert got == measurements and got is not measurements
+
+    fresh = ResultCache(10**6, disk_dir=str(tmp_path))
+    got, got_image = fresh.get("a")
+    assert got == measurements
+    assert np.array_equal(got_image, image)
+    assert fresh.stats()["disk_hits"] == 1
+
+    fresh.put("b", measurements, None)
+    assert ResultCache(10**6, disk_dir=str(tmp_path)).get("b") == (measurements, None)
+
+
+def test_disk_is_scanned_only_when_the_total_crosses_the_limit(tmp_path, monkeypatch):
+    scans = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(result_cache.os, "scandir", lambda path: scans.append(path) or real_scandir(path))
+
+    cache = ResultCache(10**6, disk_dir=str(tmp_path), disk_max_bytes=6000)
+    for i in range(3):
+        cache.put(f"k{i}", *_entry(i))
+    assert len(scans) == 1  # the first write learns the directory size
+    total = cache.stats()["disk_bytes"]
+    assert total == sum(e.stat().st_size for e in real_scandir(tmp_path))
+    cache.put("k0", *_entry(0))  # rewriting an entry does not grow the total
+    assert cache.stats()["disk_bytes"] == total
+
+    for i in range(3, 40):
+        cache.put(f"k{i}", *_entry(i))
+    stats = cache.stats()
+    on_disk = sum(e.stat().st_size for e in real_scandir(tmp_path))
+    assert stats["disk_prunes"] >= 1
+    assert stats["disk_bytes"] == on_disk <= 6000
+    # Scans: the first write plus one per prune, not one per write.
+    assert len(scans) == 1 + stats["disk_prunes"] < 40
+
+
+def test_content_key_covers_parameters():
+    assert content_key(b"x") != content_key(b"x", "heavy")
+    assert content_key(b"x", None, 170) == content_key(b"x", None, 170)
+    assert content_key(b"x", "lite") != content_key(b"x", "heavy")
+
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from core.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    calls = []
+
+    async def compute(x):
+        calls.append(x)
+        await asyncio.sleep(0.01)
+        return {"x": x}
+
+    async def main():
+        flight = SingleFlight(copy_result=True)
+        results = await asyncio.gather(*(flight.run("k", compute, 1) for _ in range(5)))
+        return flight, results
+
+    flight, results = asyncio.run(main())
+    assert calls == [1]
+    assert results == [{"x": 1}] * 5
+    assert len({id(r) for r in results}) == 5  # every caller has its own copy
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4}
+
+
+def test_keys_are_forgotten_after_the_flight():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        flight = SingleFlight()
+        return [await flight.run("k", compute), await flight.run("k", compute),
+                await flight.run(None, compute)]
+
+    assert asyncio.run(main()) == [1, 2, 3]
+
+
+def test_exception_reaches_every_caller():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        flight = SingleFlight()
+        return await asyncio.gather(*(flight.run("k", fail) for _ in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_a_caller_leaving_does_not_cancel_the_others():
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        flight = SingleFlight()
+        leaving = asyncio.create_task(flight.run("k", compute))
+        staying = asyncio.create_task(flight.run("k", compute))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        return await staying
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_the_last_caller_leaving_cancels_the_computation():
+    started, cancelled = asyncio.Event(), asyncio.Event()
+
+    async def compute():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def main():
+        flight = SingleFlight()
+        callers = [asyncio.create_task(flight.run("k", compute)) for _ in range(2)]
+        await started.wait()
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), 1)
+        return flight
+
+    flight = asyncio.run(main())
+    assert flight.in_flight == 0
@@ -0,0 +1,14 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def test_importing_api_writes_nothing_to_the_working_directory(tmp_path):
+    env = {k: v for k, v in os.environ.items()
+           if k not in ("MEASUREMENT_HISTORY", "PROCESSED_DIR")}
+    env["PYTHONPATH"] = ROOT
+    subprocess.run([sys.executable, "-c", "import api"], cwd=tmp_path, env=env, check=True,
+                   capture_output=True)
+    assert os.listdir(tmp_path) == []
@@ -33,6 +33,8 @@ export const FRONTEND_RESET_URL = getEnv("FRONTEND_RESET_URL", {
 export const AI_API_URL = getEnv("AI_API_URL", {
   fallback: "http://127.0.0.1:8000/analyze-image/",
 });
+// Sent as X-Service-Token; the AI service only keeps history for requests carrying it
+export const AI_SERVICE_TOKEN = getEnv("AI_SERVICE_TOKEN");
 export const ADDITIONAL_CORS_ORIGINS = getEnv("ADDITIONAL_CORS_ORIGINS", {
   fallback: "",
 });
@@ -9,7 +9,7 @@ import { fileURLToPath } from "url";
 import authOrSession from "../middleware/authOrSession.guard.js";
 import permissionGuard from "../middleware/permission.guard.js";
 import aiQuota from "../middleware/ai.quota.js";
-import { AI_API_URL } from "../config/env.js";
+import { AI_API_URL, AI_SERVICE_TOKEN } from "../config/env.js";
 const router = Router();
 // Resolve a stable uploads directory next to backend root
 const __filename = fileURLToPath(import.meta.url);
@@ -76,9 +76,16 @@ router.post(
       if (height) {
         try { formData.append("known_height_cm", String(height)); } catch (_) {}
       }
+      // Lets the AI service keep this user's measurement history; it only
+      // accepts user_id together with the shared service token.
+      const headers = { ...formData.getHeaders() };
+      if (req.userId && AI_SERVICE_TOKEN) {
+        formData.append("user_id", String(req.userId));
+        headers["X-Service-Token"] = AI_SERVICE_TOKEN;
+      }
 
       const response = await axios.post(AI_API_URL, formData, {
-        headers: { ...formData.getHeaders() },
+        headers,
         timeout: 180000,
       });
       return res.status(200).json({